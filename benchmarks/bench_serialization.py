@@ -0,0 +1,69 @@
+"""
+Benchmark of the outbound serialization paths of `WSConnection`.
+
+Compares the historical `send_text(Event)` path (orjson bytes decoded to str through `__dict__`)
+with `send_json`, `send_model` and the slotted `TypedEvent`. The ASGI `send` callable is a no-op,
+so the numbers are the per-message cost of building the frame.
+
+Run from the repository root with: python -m benchmarks.bench_serialization
+"""
+import asyncio
+import time
+import pydantic
+from eventum_asgi import WSConnection, Event
+from eventum_asgi.events import TypedEvent
+
+ITERATIONS = 200_000
+PAYLOAD = {'user_id': 42, 'name': 'alice', 'tags': ['a', 'b', 'c'], 'score': 12.5}
+
+
+class Update(TypedEvent):
+    event: str = 'update'
+    user_id: int
+    name: str
+    tags: list
+    score: float
+
+
+class UpdateModel(pydantic.BaseModel):
+    event: str = 'update'
+    user_id: int
+    name: str
+    tags: list
+    score: float
+
+
+async def noop_send(message):
+    pass
+
+
+async def noop_receive():
+    return {'type': 'websocket.disconnect'}
+
+
+async def measure(name, factory):
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        await factory()
+    elapsed = time.perf_counter() - start
+    print(f'{name:<44} {elapsed / ITERATIONS * 1e9:8.0f} ns/msg')
+
+
+async def main():
+    connection = WSConnection(scope={'type': 'websocket', 'headers': [], 'path': '/'},
+                              receive=noop_receive, send=noop_send)
+    model = UpdateModel(**PAYLOAD)
+    typed = Update(**PAYLOAD)
+    await measure('send_text(Event(...))', lambda: connection.send_text(Event(event='update', **PAYLOAD)))
+    await measure('send_text(TypedEvent(...))', lambda: connection.send_text(Update(**PAYLOAD)))
+    await measure('send_json(dict)', lambda: connection.send_json({'event': 'update', **PAYLOAD}))
+    await measure('send_json(dict, binary=True)', lambda: connection.send_json({'event': 'update', **PAYLOAD}, binary=True))
+    await measure('send_json(TypedEvent(...), binary=True)', lambda: connection.send_json(Update(**PAYLOAD), binary=True))
+    await measure('send_json(prebuilt TypedEvent, binary=True)', lambda: connection.send_json(typed, binary=True))
+    await measure('send_json(model.model_dump())', lambda: connection.send_json(model.model_dump()))
+    await measure('send_model(model)', lambda: connection.send_model(model))
+    await measure('send_model(model, binary=True)', lambda: connection.send_model(model, binary=True))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,111 @@
+"""
+Benchmark of the pre-fork runner scaling across cores.
+
+Starts `eventum` with 1, 2, 4, ... workers (up to the number of CPUs) on a local port and drives
+it with client processes, each keeping a few connections busy with request/response round trips.
+The handler serializes a small document per event so that the workers are CPU bound. The
+throughput should grow with the number of workers until the clients or the cores saturate.
+
+Run from the repository root with: python -m benchmarks.bench_workers
+"""
+import asyncio
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+import orjson
+from eventum_asgi import Eventum, WSConnection
+
+DURATION = 5.0
+CONNECTIONS_PER_CLIENT = 16
+DOCUMENT = {'items': [{'id': i, 'name': f'item-{i}', 'tags': ['a', 'b', 'c']} for i in range(200)]}
+
+app = Eventum()
+
+
+@app.handshake_route('/')
+async def index(connection: WSConnection):
+    await connection.accept()
+
+
+@app.event('echo')
+async def echo(connection: WSConnection, event: dict):
+    for _ in range(20):
+        orjson.loads(orjson.dumps(DOCUMENT))
+    await connection.send_json({'event': 'echo', 'n': event['n']})
+
+
+async def client_connection(port: int, deadline: float) -> int:
+    import websockets
+    count = 0
+    async with websockets.connect(f'ws://127.0.0.1:{port}/') as ws:
+        while time.monotonic() < deadline:
+            await ws.send(orjson.dumps({'event': 'echo', 'n': count}).decode('utf-8'))
+            await ws.recv()
+            count += 1
+    return count
+
+
+def client_process(port: int, deadline: float, results: multiprocessing.Queue) -> None:
+    async def run() -> int:
+        counts = await asyncio.gather(*(client_connection(port, deadline) for _ in range(CONNECTIONS_PER_CLIENT)))
+        return sum(counts)
+    results.put(asyncio.run(run()))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'Server did not start on port {port}')
+
+
+def measure(workers: int, clients: int) -> float:
+    port = free_port()
+    server = subprocess.Popen([sys.executable, '-m', 'eventum_asgi.cli', 'benchmarks.bench_workers:app',
+                               '--port', str(port), '--workers', str(workers), '--log-level', 'warning'])
+    try:
+        wait_for_port(port)
+        time.sleep(0.5)
+        deadline = time.monotonic() + DURATION
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=client_process, args=(port, deadline, results)) for _ in range(clients)]
+        for process in processes:
+            process.start()
+        total = sum(results.get() for _ in processes)
+        for process in processes:
+            process.join()
+        return total / DURATION
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    clients = max(1, cpus)
+    counts = [1]
+    while counts[-1] * 2 <= cpus:
+        counts.append(counts[-1] * 2)
+    print(f'{cpus} CPUs, {clients} client processes x {CONNECTIONS_PER_CLIENT} connections, {DURATION:.0f}s per run')
+    baseline = None
+    for workers in counts:
+        rate = measure(workers, clients)
+        baseline = baseline or rate
+        print(f'{workers:>3} worker(s) {rate:10.0f} round trips/s  x{rate / baseline:.2f}')
+
+
+if __name__ == '__main__':
+    main()
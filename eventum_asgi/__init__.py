@@ -2,4 +2,8 @@ from.app import Eventum
 from .connection import WSConnection
 from .events import Event
 from .http_eventum import HttpResponse
-from .events import Event
\ No newline at end of file
+from .events import Event
+from .dependencies import Depends
+from .state import State
+from .auth import HandshakeAuthenticator
+from .middleware.auth_middleware import HandshakeAuthMiddleware
@@ -0,0 +1,126 @@
+import time
+import typing
+from eventum_asgi.load import LoopMonitor
+from eventum_asgi.metrics import Metrics
+from eventum_asgi.types import Send
+
+
+class AdmissionController:
+    """
+    Connection caps and handshake rate limiting applied before any per-connection object exists.
+
+    `admit` only looks at the scope path and a few integers: the global cap, the cap of the path
+    and a token bucket refilled at `handshake_rate` tokens per second up to `handshake_burst`.
+    Rejected handshakes are answered with HTTP 503 messages built once in the constructor, so a
+    reconnect storm against a saturated node costs neither a `WSConnection` nor a middleware run.
+    """
+    def __init__(self,
+                 max_connections: typing.Optional[int] = None,
+                 max_connections_per_path: typing.Optional[typing.Dict[str, int]] = None,
+                 handshake_rate: typing.Optional[float] = None,
+                 handshake_burst: typing.Optional[int] = None,
+                 retry_after: int = 1,
+                 metrics: typing.Optional[Metrics] = None,
+                 load_monitor: typing.Optional[LoopMonitor] = None,
+                 clock: typing.Callable[[], float] = time.monotonic):
+        """
+        Initialize the controller. Every limit is disabled when left to None.
+
+        Parameters:
+        - max_connections (Optional[int]): Maximum number of concurrent connections.
+        - max_connections_per_path (Optional[Dict[str, int]]): Maximum number of concurrent
+          connections per request path.
+        - handshake_rate (Optional[float]): Sustained number of handshakes admitted per second.
+        - handshake_burst (Optional[int]): Number of handshakes admitted at once after an idle
+          period. Defaults to `handshake_rate`.
+        - retry_after (int): Value in seconds of the `Retry-After` header of rejections.
+        - metrics (Optional[Metrics]): Registry receiving the admission counters.
+        - load_monitor (Optional[LoopMonitor]): Every handshake is rejected while it sheds load.
+        - clock (Callable[[], float]): Monotonic clock in seconds refilling the token bucket.
+        """
+        self.max_connections = max_connections
+        self.max_connections_per_path = max_connections_per_path or {}
+        self.handshake_rate = handshake_rate
+        self.handshake_burst = handshake_burst if handshake_burst is not None else max(1, int(handshake_rate or 1))
+        self.metrics = metrics
+        self.load_monitor = load_monitor
+        self.clock = clock
+        self.live = 0
+        self.live_per_path: typing.Dict[str, int] = {}
+        self.__tokens = float(self.handshake_burst)
+        self.__refilled_at = clock()
+        self.__rejection_start = {
+            'type': 'websocket.http.response.start',
+            'status': 503,
+            'headers': [(b'retry-after', str(retry_after).encode()), (b'content-type', b'text/plain')],
+        }
+        self.__rejection_body = {
+            'type': 'websocket.http.response.body',
+            'body': b'Server is at capacity',
+        }
+        if metrics is not None:
+            metrics.register_gauge('admission.live', lambda: self.live)
+
+    def admit(self, path: str) -> bool:
+        """
+        Decide whether a handshake on `path` is admitted and, if so, count it as live
+        until `release` is called.
+
+        Parameters:
+        - path (str): The request path of the handshake.
+
+        Returns:
+        - bool: True if admitted.
+        """
+        if self.load_monitor is not None and self.load_monitor.shedding:
+            return self.__rejected('admission.rejected_overload')
+        if self.max_connections is not None and self.live >= self.max_connections:
+            return self.__rejected('admission.rejected_capacity')
+        path_cap = self.max_connections_per_path.get(path)
+        if path_cap is not None and self.live_per_path.get(path, 0) >= path_cap:
+            return self.__rejected('admission.rejected_capacity')
+        if self.handshake_rate is not None:
+            now = self.clock()
+            self.__tokens = min(self.handshake_burst, self.__tokens + (now - self.__refilled_at) * self.handshake_rate)
+            self.__refilled_at = now
+            if self.__tokens < 1:
+                return self.__rejected('admission.rejected_rate')
+            self.__tokens -= 1
+
+        self.live += 1
+        if path_cap is not None:
+            self.live_per_path[path] = self.live_per_path.get(path, 0) + 1
+        if self.metrics is not None:
+            self.metrics.increment('admission.admitted')
+        return True
+
+    def release(self, path: str) -> None:
+        """
+        Stop counting a connection admitted on `path`.
+
+        Parameters:
+        - path (str): The request path the connection was admitted on.
+        """
+        self.live -= 1
+        count = self.live_per_path.get(path)
+        if count is not None:
+            if count > 1:
+                self.live_per_path[path] = count - 1
+            else:
+                del self.live_per_path[path]
+
+    async def reject(self, send: Send) -> None:
+        """
+        Answer the handshake with the precomputed HTTP 503 response.
+
+        Parameters:
+        - send (Send): The ASGI send callable of the handshake.
+        """
+        await send(self.__rejection_start)
+        await send(self.__rejection_body)
+
+    def __rejected(self, reason: str) -> bool:
+        if self.metrics is not None:
+            self.metrics.increment('admission.rejected')
+            self.metrics.increment(reason)
+        return False
@@ -1,30 +1,240 @@
 import typing
 from typing import Callable, Any, Literal
 import pydantic
+from eventum_asgi.admission import AdmissionController
 from eventum_asgi.connection import WSConnection
+from eventum_asgi.dedupe import Deduplicator
+from eventum_asgi.dependencies import DependencyInjector
+from eventum_asgi.drain import ConnectionDrainer
 from eventum_asgi.handshake_router import HandshakeRouter
-from eventum_asgi.lifespan import Lifespan
+from eventum_asgi.lifespan import Lifespan, LifespanContext
+from eventum_asgi.load import LoopMonitor
 from eventum_asgi.middleware_chain import HandshakeMiddlewareConstructor
-from eventum_asgi.types import Scope, Receive, Send, Handler
+from eventum_asgi.middleware import Middleware, MiddlewareClass
+from eventum_asgi.metrics import Metrics
+from eventum_asgi.presence import Presence
+from eventum_asgi.response_cache import ResponseCache
+from eventum_asgi.scheduler import Scheduler, MissedTickPolicy, Job
+from eventum_asgi.offload import ThreadOffloader, ProcessOffloader
+from eventum_asgi.sessions import SessionManager
+from eventum_asgi.state import State
+from eventum_asgi.streams import ConnectionStreams, CREDIT_EVENT
+from eventum_asgi.sync import SyncHub, ACK_EVENT
+from eventum_asgi.types import Scope, Receive, Send, Handler, Offload, Priority
 from eventum_asgi.event_loop import EventLoop
 from eventum_asgi.event_router import EventRouter
 from eventum_asgi.http_eventum import http_bad_request
 
 
 class Eventum:
-    def __init__(self):
+    def __init__(self,
+                 lifespan: typing.Optional[LifespanContext] = None,
+                 state: typing.Optional[State] = None,
+                 thread_pool_size: typing.Optional[int] = None,
+                 thread_pool_max_pending: typing.Optional[int] = None,
+                 process_pool_size: typing.Optional[int] = None,
+                 shared_memory_threshold: int = 64 * 1024,
+                 process_stream_max_bytes: int = 64 * 1024 * 1024,
+                 drain_batch_size: int = 100,
+                 drain_batch_interval: float = 0.1,
+                 drain_timeout: float = 30.0,
+                 drain_handler_grace: typing.Optional[float] = None,
+                 drain_retry_after: int = 5,
+                 session_max_events: int = 1000,
+                 session_max_bytes: int = 1024 * 1024,
+                 session_ttl: float = 60.0,
+                 session_sweep_interval: typing.Optional[float] = None,
+                 presence_identity_flag: typing.Any = 'user_id',
+                 presence_batch_interval: float = 0.05,
+                 max_connections: typing.Optional[int] = None,
+                 max_connections_per_path: typing.Optional[typing.Dict[str, int]] = None,
+                 handshake_rate: typing.Optional[float] = None,
+                 handshake_burst: typing.Optional[int] = None,
+                 admission_retry_after: int = 1,
+                 sync_history: int = 64,
+                 sync_max_unacked: int = 32,
+                 dedupe_id_field: str = 'id',
+                 dedupe_window: int = 256,
+                 dedupe_ttl: float = 60.0,
+                 dedupe_identity_flag: typing.Any = None,
+                 priority_lanes: bool = False,
+                 lane_capacity: int = 256,
+                 event_timeout: typing.Optional[float] = None,
+                 lag_sample_interval: float = 0.1,
+                 shed_lag: typing.Optional[float] = None,
+                 recover_lag: typing.Optional[float] = None,
+                 broadcast_slowdown: float = 4.0,
+                 response_cache_size: int = 1024,
+                 response_cache_ttl: float = 5.0,
+                 cancel_on_disconnect: bool = True):
         """
         Initializes the Eventum application.
 
         This constructor sets up the necessary components for handling WebSocket connections and lifecycle events.
-        It initializes the handshake router, middleware constructor, middleware stack, event router, event loop, and lifespan manager.
+        It initializes the application state, metrics registry, loop lag monitor, admission controller, dependency injector, handshake router, middleware constructor, middleware stack,
+        thread and process pools, response cache, event router, event loop, connection drainer, session manager, presence tracker, state-sync channels, scheduler and lifespan manager.
+
+        Parameters:
+        -----------
+        lifespan : typing.Optional[LifespanContext]
+            An async-context-manager factory called with the application: the code before its `yield`
+            runs on startup, the code after it on shutdown, and a yielded mapping is merged into `state`.
+        state : typing.Optional[State]
+            The application state holding shared resources such as connection pools. Pass an instance
+            of an annotated `State` subclass to get a typed `app.state`.
+        thread_pool_size : typing.Optional[int]
+            Number of worker threads running synchronous and `offload='thread'` event handlers.
+        thread_pool_max_pending : typing.Optional[int]
+            Number of offloaded calls allowed to queue for a free worker thread.
+        process_pool_size : typing.Optional[int]
+            Number of worker processes running `offload='process'` event handlers.
+        shared_memory_threshold : int
+            Minimum size in bytes of a binary argument handed to the process pool through shared memory.
+        process_stream_max_bytes : int
+            Maximum size in bytes of a stream handed to an `offload='process'` route registered with `stream=True`.
+        drain_batch_size : int
+            Number of connections closed with code 1001 per batch during the shutdown drain phase.
+        drain_batch_interval : float
+            Delay in seconds between two drain batches.
+        drain_timeout : float
+            Upper bound in seconds of the drain phase, including waiting for in-flight handlers.
+        drain_handler_grace : typing.Optional[float]
+            Seconds a connection still running a handler is given before it is closed anyway.
+            Defaults to `drain_timeout`. Idle connections are closed without waiting for busy ones.
+        drain_retry_after : int
+            Value in seconds of the `Retry-After` header of handshakes rejected while draining.
+        session_max_events : int
+            Number of events kept per resumable session for replay on reconnect.
+        session_max_bytes : int
+            Size in bytes of the events kept per resumable session.
+        session_ttl : float
+            Seconds a resumable session survives after its connection closed.
+        session_sweep_interval : typing.Optional[float]
+            Seconds between two sweeps freeing the expired sessions. Defaults to `session_ttl`.
+        presence_identity_flag : typing.Any
+            Name of the connection flag identifying the user of a connection in `app.presence`.
+        presence_batch_interval : float
+            Seconds during which presence changes are collected into one diff per topic.
+        max_connections : typing.Optional[int]
+            Maximum number of concurrent connections, handshakes included. Unlimited by default.
+        max_connections_per_path : typing.Optional[typing.Dict[str, int]]
+            Maximum number of concurrent connections per request path.
+        handshake_rate : typing.Optional[float]
+            Number of handshakes admitted per second, enforced with a token bucket. Unlimited by default.
+        handshake_burst : typing.Optional[int]
+            Capacity of the handshake token bucket. Defaults to `handshake_rate`.
+        admission_retry_after : int
+            Value of the `Retry-After` header of handshakes rejected by admission control.
+        sync_history : int
+            Number of past JSON patches kept per `app.sync` channel to catch lagging subscribers up.
+        sync_max_unacked : int
+            Number of state versions sent to a subscriber ahead of its last `sync.ack`.
+        dedupe_id_field : str
+            The event field holding the message id of the events routed with `dedupe=True`.
+        dedupe_window : int
+            Number of message ids remembered per connection (or per user) for deduplication.
+        dedupe_ttl : float
+            Seconds a message id and its reply are remembered.
+        dedupe_identity_flag : typing.Any
+            Connection flag identifying the user, to deduplicate retries across reconnects.
+        priority_lanes : bool
+            Enable outbound priority lanes on every accepted connection, so that frames sent with
+            `priority='high'` overtake queued bulk traffic.
+        lane_capacity : int
+            Maximum number of frames queued per lane and connection.
+        event_timeout : typing.Optional[float]
+            Default number of seconds an event handler may run before it is cancelled and a
+            `timeout_error` event is sent. None lets handlers run unbounded.
+        lag_sample_interval : float
+            Seconds between two event loop lag samples of `app.load_monitor`.
+        shed_lag : typing.Optional[float]
+            Smoothed loop lag in seconds above which load is shed: new handshakes are rejected,
+            events of `priority='low'` routes are dropped and fan-outs are slowed down. None
+            only measures the lag.
+        recover_lag : typing.Optional[float]
+            Smoothed loop lag in seconds below which shedding stops. Defaults to half of `shed_lag`.
+        broadcast_slowdown : float
+            Factor applied to the presence batch interval and the scheduler intervals while shedding.
+        response_cache_size : int
+            Number of replies memoized per route registered with `cache=True`.
+        response_cache_ttl : float
+            Seconds a memoized reply is served.
+        cancel_on_disconnect : bool
+            Cancel a running event handler as soon as its client disconnects. Sends to a
+            disconnected client raise `DisconnectedException` either way.
         """
-        self.handshake = HandshakeRouter()
+        self.state = state if state is not None else State()
+        self.metrics = Metrics()
+        self.load_monitor = LoopMonitor(interval=lag_sample_interval,
+                                        shed_lag=shed_lag,
+                                        recover_lag=recover_lag,
+                                        broadcast_slowdown=broadcast_slowdown,
+                                        metrics=self.metrics)
+        self.admission = AdmissionController(max_connections=max_connections,
+                                             max_connections_per_path=max_connections_per_path,
+                                             handshake_rate=handshake_rate,
+                                             handshake_burst=handshake_burst,
+                                             retry_after=admission_retry_after,
+                                             metrics=self.metrics,
+                                             load_monitor=self.load_monitor)
+        self.dependencies = DependencyInjector()
+        self.handshake = HandshakeRouter(injector=self.dependencies)
         self.middleware_constructor = HandshakeMiddlewareConstructor(router=self.handshake)
         self.middleware_stack: typing.Optional[typing.Callable[[WSConnection], typing.Any]] = None
-        self.event_router = EventRouter()
-        self.event_loop = EventLoop(router=self.event_router)
-        self.lifespan = Lifespan()
+        self.thread_offloader = ThreadOffloader(max_workers=thread_pool_size,
+                                                max_pending=thread_pool_max_pending,
+                                                metrics=self.metrics)
+        self.process_offloader = ProcessOffloader(max_workers=process_pool_size,
+                                                  shared_memory_threshold=shared_memory_threshold,
+                                                  max_stream_bytes=process_stream_max_bytes,
+                                                  metrics=self.metrics)
+        self.deduplicator = Deduplicator(id_field=dedupe_id_field,
+                                         window=dedupe_window,
+                                         ttl=dedupe_ttl,
+                                         identity_flag=dedupe_identity_flag,
+                                         metrics=self.metrics)
+        self.response_cache = ResponseCache(maxsize=response_cache_size, ttl=response_cache_ttl, metrics=self.metrics)
+        self.event_router = EventRouter(thread_offloader=self.thread_offloader,
+                                        process_offloader=self.process_offloader,
+                                        injector=self.dependencies,
+                                        deduplicator=self.deduplicator,
+                                        default_timeout=event_timeout,
+                                        load_monitor=self.load_monitor,
+                                        response_cache=self.response_cache)
+        self.sync = SyncHub(history=sync_history, max_unacked=sync_max_unacked, metrics=self.metrics)
+        self.event_router.add_event(CREDIT_EVENT, ConnectionStreams.handle_credit)
+        self.event_router.add_event(ACK_EVENT, self.sync.handle_ack)
+        self.event_loop = EventLoop(router=self.event_router,
+                                    metrics=self.metrics,
+                                    cancel_on_disconnect=cancel_on_disconnect)
+        self.priority_lanes = priority_lanes
+        self.lane_capacity = lane_capacity
+        self.metrics.register_gauge('lanes.depth', self.__lane_depths)
+        self.drainer = ConnectionDrainer(event_loop=self.event_loop,
+                                         batch_size=drain_batch_size,
+                                         batch_interval=drain_batch_interval,
+                                         timeout=drain_timeout,
+                                         handler_grace=drain_handler_grace,
+                                         retry_after=drain_retry_after,
+                                         metrics=self.metrics)
+        self.sessions = SessionManager(max_events=session_max_events,
+                                       max_bytes=session_max_bytes,
+                                       ttl=session_ttl,
+                                       sweep_interval=session_sweep_interval,
+                                       metrics=self.metrics)
+        self.presence = Presence(identity_flag=presence_identity_flag,
+                                 batch_interval=presence_batch_interval,
+                                 metrics=self.metrics,
+                                 load_monitor=self.load_monitor)
+        self.lifespan = Lifespan(drainer=self.drainer, context=lifespan, state=self.state)
+        self.metrics.register_gauge('lifespan.startup_seconds', lambda: dict(self.lifespan.timings))
+        self.lifespan.add_resource(self.load_monitor)
+        self.lifespan.add_resource(self.thread_offloader)
+        self.lifespan.add_resource(self.process_offloader)
+        self.lifespan.add_resource(self.sessions)
+        self.lifespan.add_resource(self.presence)
+        self.scheduler = Scheduler(metrics=self.metrics, load_monitor=self.load_monitor)
+        self.lifespan.add_resource(self.scheduler)
 
     async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """
@@ -51,10 +261,12 @@ class Eventum:
         - Adds the current application instance to the scope.
         - For lifespan events, it delegates to the lifespan handler.
         - For other events (assumed to be WebSocket connections):
+          - Answers HTTP 503 without building a connection if admission control rejects it.
           - Constructs the middleware stack if not already done.
           - Creates a WSConnection instance.
+          - Answers HTTP 503 if the application is draining.
           - Applies the middleware stack to the connection.
-          - Hands over the connection to the event loop for further processing.
+          - Hands over the accepted connection to the event loop for further processing.
         """
         scope["app"] = self
         if scope["type"] == "lifespan":
@@ -62,26 +274,50 @@ class Eventum:
         elif scope["type"] == "http":
             await http_bad_request(send)
         else:
-            if self.middleware_stack is None:
-                self.construct_middleware()
-            connection = WSConnection(scope=scope, receive=receive, send=send)
-            await self.middleware_stack(connection)
-            await self.event_loop.handle_connection(connection)
+            path = scope.get('path')
+            if not self.admission.admit(path):
+                await self.admission.reject(send)
+                return
+            connection: typing.Optional[WSConnection] = None
+            try:
+                if self.middleware_stack is None:
+                    self.construct_middleware()
+                connection = WSConnection(scope=scope, receive=receive, send=send)
+                if self.drainer.draining:
+                    await self.drainer.reject(connection)
+                    return
+                await self.middleware_stack(connection)
+                if connection.accepted:
+                    if self.priority_lanes:
+                        connection.enable_priority_lanes(capacity=self.lane_capacity)
+                    await self.event_loop.handle_connection(connection)
+            finally:
+                try:
+                    if connection is not None:
+                        # Detaches the resumable session of a handshake that failed after `accept`.
+                        # A no-op once the event loop ran the disconnect callbacks.
+                        await connection.run_disconnect_callbacks()
+                finally:
+                    self.admission.release(path)
             
     def lifespan_event(self,
-                       event_type: Literal['startup', 'shutdown']
+                       event_type: Literal['startup', 'shutdown'],
+                       concurrent: bool = False
                        ) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
         """
         Decorator to register a function as a handler for a specified lifecycle event.
+        Any number of handlers can be registered per event.
 
         Args:
             event_type (str): The type of event to handle. Expected values are
                               'startup' or 'shutdown'.
+            concurrent (bool): Run the handler concurrently with the adjacent handlers
+                               also registered with `concurrent=True`.
 
         Returns:
             Callable: A decorator that registers the given function as an event handler.
         """
-        return self.lifespan.on_event(event_type)
+        return self.lifespan.on_event(event_type, concurrent=concurrent)
 
     def handshake_route(self,
                         route: str,
@@ -123,24 +359,63 @@ class Eventum:
 
     def event(self,
               event: str,
-              validator: typing.Optional[typing.Type[pydantic.BaseModel]] = None
+              validator: typing.Optional[typing.Type[pydantic.BaseModel]] = None,
+              offload: Offload = None,
+              dedupe: typing.Union[bool, Deduplicator] = False,
+              timeout: typing.Optional[float] = None,
+              priority: Priority = 'normal',
+              cache: typing.Union[bool, ResponseCache] = False,
+              cache_key: typing.Optional[typing.Sequence[str]] = None,
+              stream: bool = False
               ) -> typing.Callable[[Handler], Handler]:
         """
-        A method to register a WebSocket event handler by directly passing the event name and handler.
+        A decorator that registers a WebSocket event handler for the specified event.
 
         Parameters:
         -----------
         event : str
             The event type to be registered (e.g., "registered", "message_sent").
-        handler : Handler
-            The asynchronous handler function for the event.
+        validator : typing.Optional[typing.Type[pydantic.BaseModel]]
+            A Pydantic model to validate the event data against.
+        offload : Offload
+            Set to 'thread' to run an async handler that wraps blocking code on the thread pool, or
+            'process' to call a picklable function as `handler(event_data)` in the process pool.
+            Other synchronous handlers run on the thread pool. The return value of a handler running
+            off the event loop (synchronous, 'thread' or 'process') is sent back to the client, see
+            `EventRouter.send_handler_result`; an async handler running on the loop sends its replies itself.
+        dedupe : typing.Union[bool, Deduplicator]
+            Set to True to answer a retried event (same message id) with the reply of its first
+            delivery instead of running the handler again.
+        timeout : typing.Optional[float]
+            Seconds the handler may run before it is cancelled. Defaults to `event_timeout`.
+        priority : Priority
+            Set to 'low' for events that may be dropped while the application sheds load (see `shed_lag`).
+        cache : typing.Union[bool, ResponseCache]
+            Set to True for read-only lookups whose reply only depends on their payload: identical
+            events are answered with the memoized frames of `app.response_cache`, and concurrent
+            identical events run the handler once.
+        cache_key : typing.Optional[typing.Sequence[str]]
+            The payload fields the reply depends on. Defaults to the whole payload.
+        stream : bool
+            With offload='process', receive the binary stream announced by the event's 'stream' and
+            'size' fields into shared memory and call the function as `handler(event_data, payload)`,
+            e.g. to make thumbnails of uploaded images. The result is sent once the stream was processed.
         """
-        return self.event_router.route(event=event, validator=validator)
+        return self.event_router.route(event=event, validator=validator, offload=offload, dedupe=dedupe,
+                                       timeout=timeout, priority=priority, cache=cache, cache_key=cache_key,
+                                       stream=stream)
 
     def add_event(self,
                   event: str,
                   handler: Handler,
-                  validator: typing.Optional[typing.Type[pydantic.BaseModel]] = None
+                  validator: typing.Optional[typing.Type[pydantic.BaseModel]] = None,
+                  offload: Offload = None,
+                  dedupe: typing.Union[bool, Deduplicator] = False,
+                  timeout: typing.Optional[float] = None,
+                  priority: Priority = 'normal',
+                  cache: typing.Union[bool, ResponseCache] = False,
+                  cache_key: typing.Optional[typing.Sequence[str]] = None,
+                  stream: bool = False
                   ) -> None:
         """
         A method to register a WebSocket event handler by directly passing the event name and handler.
@@ -150,11 +425,87 @@ class Eventum:
         event : str
             The event type to be registered (e.g., "registered", "message_sent").
         handler : Handler
-            The asynchronous handler function for the event.
+            The handler function for the event. Synchronous functions run on the thread pool.
         validator : typing.Optional[typing.Type[pydantic.BaseModel]]
             A Pydantic model to validate the event data against.
+        offload : Offload
+            Set to 'thread' to run an async handler that wraps blocking code on the thread pool, or
+            'process' to call a picklable function as `handler(event_data)` in the process pool.
+        dedupe : typing.Union[bool, Deduplicator]
+            Set to True to answer a retried event (same message id) with the reply of its first delivery.
+        timeout : typing.Optional[float]
+            Seconds the handler may run before it is cancelled. Defaults to `event_timeout`.
+        priority : Priority
+            Set to 'low' for events that may be dropped while the application sheds load (see `shed_lag`).
+        cache : typing.Union[bool, ResponseCache]
+            Set to True to memoize the replies of a read-only event by payload.
+        cache_key : typing.Optional[typing.Sequence[str]]
+            The payload fields the reply depends on. Defaults to the whole payload.
+        stream : bool
+            With offload='process', hand the binary stream announced by the event to the function
+            through shared memory. See `event`.
+        """
+        self.event_router.add_event(event=event, handler=handler, validator=validator, offload=offload,
+                                    dedupe=dedupe, timeout=timeout, priority=priority, cache=cache, cache_key=cache_key,
+                                    stream=stream)
+
+    def every(self,
+              interval: float,
+              name: typing.Optional[str] = None,
+              jitter: float = 0.0,
+              missed: MissedTickPolicy = 'skip'
+              ) -> typing.Callable[[typing.Callable[[], typing.Any]], Job]:
         """
-        self.event_router.add_event(event=event, handler=handler, validator=validator)
+        A decorator that registers an interval job on `app.scheduler`, run once per tick between
+        the lifespan startup and shutdown. Its result is pushed to the connections subscribed with
+        `job.subscribe(connection)`.
+
+        Parameters:
+        -----------
+        interval : float
+            Seconds between two ticks.
+        name : typing.Optional[str]
+            The job name. Defaults to the function name.
+        jitter : float
+            Upper bound in seconds of the random offset of the first tick, to spread jobs sharing an interval.
+        missed : MissedTickPolicy
+            'skip' to drop the ticks missed while the job was still running or the loop was
+            blocked, 'catch_up' to run them back to back.
+        """
+        return self.scheduler.every(interval, name=name, jitter=jitter, missed=missed)
+
+    async def drain(self) -> None:
+        """
+        Run the drain phase now: reject new handshakes with HTTP 503, close live connections with
+        code 1001 in staggered batches and wait for in-flight handlers. It also runs automatically
+        at the beginning of the lifespan shutdown.
+        """
+        await self.drainer.drain()
+
+    def add_middleware(self, middleware_class: typing.Type[MiddlewareClass], *args: Any, **kwargs: Any) -> None:
+        """
+        Add a handshake middleware, run in registration order between the error handling
+        middleware and the router.
+
+        Parameters:
+        -----------
+        middleware_class : typing.Type[MiddlewareClass]
+            The middleware class, instantiated with `call_next` and the given arguments.
+        args : Any
+            Positional arguments passed to the middleware.
+        kwargs : Any
+            Keyword arguments passed to the middleware, e.g. `authenticator=` for `HandshakeAuthMiddleware`.
+        """
+        self.middleware_constructor.add_user_middleware(Middleware(middleware_class, *args, **kwargs))
+        self.middleware_stack = None
+
+    def __lane_depths(self) -> typing.Dict[str, int]:
+        depths = {'high': 0, 'normal': 0, 'low': 0}
+        for connection in self.event_loop.connections:
+            if connection.lanes is not None:
+                for priority, depth in connection.lanes.depths().items():
+                    depths[priority] += depth
+        return depths
 
     def construct_middleware(self) -> None:
         self.middleware_stack = self.middleware_constructor.construct_middleware()
@@ -0,0 +1,137 @@
+import typing
+from eventum_asgi.cache import TTLCache, SingleFlight
+from eventum_asgi.connection import WSConnection
+from eventum_asgi.exceptions import HttpUnauthorizedException
+from eventum_asgi.metrics import Metrics
+from eventum_asgi.offload import is_async_callable
+
+_MISSING = object()
+_INVALID = object()
+
+
+class HandshakeAuthenticator:
+    """
+    Resolves the bearer token of a handshake to a principal, caching the answers of the
+    auth service so that reconnecting clients do not hit it again.
+
+    Valid tokens are cached for `ttl` seconds and rejected ones for `negative_ttl` seconds, in an
+    LRU cache bounded to `maxsize` tokens. Concurrent handshakes presenting the same uncached
+    token share a single call to `authenticate`. The principal is stored in the connection flag
+    `flag`. Use the authenticator in a handshake handler, as a dependency, or for a whole
+    application through `HandshakeAuthMiddleware`:
+
+        auth = HandshakeAuthenticator(verify_token, metrics=app.metrics)
+
+        @app.handshake_route('/', required_headers=['Authorization'])
+        async def index(connection: WSConnection, principal=Depends(auth)):
+            await connection.accept()
+    """
+    def __init__(self,
+                 authenticate: typing.Callable[[str], typing.Any],
+                 header: str = 'authorization',
+                 scheme: typing.Optional[str] = 'Bearer',
+                 flag: typing.Any = 'principal',
+                 maxsize: int = 10_000,
+                 ttl: float = 60.0,
+                 negative_ttl: float = 5.0,
+                 metrics: typing.Optional[Metrics] = None):
+        """
+        Initialize the authenticator.
+
+        Parameters:
+        - authenticate (Callable[[str], Any]): Sync or async callable returning the principal of
+          a token, or None if the token is invalid. Exceptions are propagated and not cached.
+        - header (str): The request header carrying the token.
+        - scheme (Optional[str]): The scheme prefixing the token in the header, or None.
+        - flag (Any): The connection flag the principal is stored in.
+        - maxsize (int): Maximum number of cached tokens.
+        - ttl (float): Seconds a valid token is cached.
+        - negative_ttl (float): Seconds an invalid token is cached.
+        - metrics (Optional[Metrics]): Registry receiving the auth counters.
+        """
+        self.authenticate = authenticate
+        self.header = header.lower()
+        self.prefix = f'{scheme.lower()} ' if scheme else ''
+        self.flag = flag
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.metrics = metrics
+        self.cache: TTLCache[str, typing.Any] = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.__flights: SingleFlight[str] = SingleFlight()
+        self.__is_async = is_async_callable(authenticate)
+        if metrics is not None:
+            metrics.register_gauge('auth.cache_size', lambda: len(self.cache))
+
+    async def __call__(self, connection: WSConnection) -> typing.Any:
+        """
+        Authenticate the connection and store its principal in the connection flags.
+
+        Parameters:
+        - connection (WSConnection): The connection being handshaken.
+
+        Returns:
+        - Any: The principal.
+
+        Raises:
+        - HttpUnauthorizedException: If the token is missing or invalid.
+        """
+        token = self.token(connection)
+        principal = await self.resolve(token) if token else None
+        if principal is None:
+            self.__count('auth.rejected')
+            raise HttpUnauthorizedException()
+        connection.add_flag(self.flag, principal)
+        return principal
+
+    def token(self, connection: WSConnection) -> typing.Optional[str]:
+        """
+        Extract the token from the request headers.
+
+        Returns:
+        - Optional[str]: The token, or None if the header is missing or has another scheme.
+        """
+        value = (connection.request_headers.model_extra or {}).get(self.header)
+        if not value:
+            return None
+        if self.prefix:
+            if value[:len(self.prefix)].lower() != self.prefix:
+                return None
+            value = value[len(self.prefix):]
+        return value.strip() or None
+
+    async def resolve(self, token: str) -> typing.Any:
+        """
+        Get the principal of a token from the cache, or from `authenticate` on a miss.
+
+        Parameters:
+        - token (str): The token.
+
+        Returns:
+        - Any: The principal, or None if the token is invalid.
+        """
+        principal = self.cache.get(token, _MISSING)
+        if principal is not _MISSING:
+            self.__count('auth.cache_hits')
+            return None if principal is _INVALID else principal
+        self.__count('auth.cache_misses')
+        return await self.__flights.do(token, lambda: self.__lookup(token))
+
+    def invalidate(self, token: str) -> None:
+        """
+        Forget the cached answer for a token, e.g. after it was revoked.
+        """
+        self.cache.pop(token)
+
+    async def __lookup(self, token: str) -> typing.Any:
+        principal = self.authenticate(token)
+        if self.__is_async:
+            principal = await principal
+        if principal is None:
+            self.cache.set(token, _INVALID, ttl=self.negative_ttl)
+        else:
+            self.cache.set(token, principal)
+        return principal
+
+    def __count(self, name: str) -> None:
+        if self.metrics is not None:
+            self.metrics.increment(name)
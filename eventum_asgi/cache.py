@@ -0,0 +1,157 @@
+import asyncio
+import collections
+import time
+import typing
+
+K = typing.TypeVar('K')
+V = typing.TypeVar('V')
+T = typing.TypeVar('T')
+
+
+class TTLCache(typing.Generic[K, V]):
+    """
+    Bounded mapping evicting the least recently used entry, whose entries also expire.
+
+    Entries live in an `OrderedDict` kept in recency order: a hit moves the entry to the end and
+    an insertion beyond `maxsize` pops the front. An expired entry is dropped when it is read or
+    when the cache is measured; the ones never read again are eventually evicted by the size bound.
+    """
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        """
+        Initialize an empty cache.
+
+        Parameters:
+        - maxsize (int): Maximum number of entries.
+        - ttl (float): Default lifetime of an entry in seconds.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.__data: 'collections.OrderedDict[K, typing.Tuple[float, V]]' = collections.OrderedDict()
+
+    def get(self, key: K, default: typing.Any = None) -> typing.Any:
+        """
+        Get the value of a live entry and mark it as recently used.
+
+        Parameters:
+        - key (K): The key.
+        - default (Any): Returned when the key is missing or expired.
+
+        Returns:
+        - Any: The cached value or `default`.
+        """
+        item = self.__data.get(key)
+        if item is None:
+            return default
+        if item[0] <= time.monotonic():
+            del self.__data[key]
+            return default
+        self.__data.move_to_end(key)
+        return item[1]
+
+    def set(self, key: K, value: V, ttl: typing.Optional[float] = None) -> None:
+        """
+        Store a value, evicting the least recently used entry if the cache is full.
+
+        Parameters:
+        - key (K): The key.
+        - value (V): The value.
+        - ttl (Optional[float]): Lifetime of this entry in seconds. Defaults to the cache TTL.
+        """
+        self.__data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self.__data.move_to_end(key)
+        while len(self.__data) > self.maxsize:
+            self.__data.popitem(last=False)
+
+    def pop(self, key: K, default: typing.Any = None) -> typing.Any:
+        """
+        Remove an entry and return its value, or `default` if it is missing.
+        """
+        item = self.__data.pop(key, None)
+        return default if item is None else item[1]
+
+    def values(self) -> typing.List[V]:
+        """
+        Get the values of the live entries, least recently used first.
+        """
+        now = time.monotonic()
+        return [value for expires_at, value in self.__data.values() if expires_at > now]
+
+    def clear(self) -> None:
+        """
+        Remove every entry.
+        """
+        self.__data.clear()
+
+    def purge(self) -> int:
+        """
+        Remove the expired entries.
+
+        Returns:
+        - int: The number of entries removed.
+        """
+        now = time.monotonic()
+        expired = [key for key, (expires_at, _) in self.__data.items() if expires_at <= now]
+        for key in expired:
+            del self.__data[key]
+        return len(expired)
+
+    def __len__(self) -> int:
+        self.purge()
+        return len(self.__data)
+
+    def __contains__(self, key: typing.Any) -> bool:
+        item = self.__data.get(key)
+        return item is not None and item[0] > time.monotonic()
+
+
+class SingleFlight(typing.Generic[K]):
+    """
+    Deduplicates concurrent calls: while a call for a key is in flight, other callers
+    with the same key wait for its result instead of starting their own.
+    """
+    def __init__(self):
+        """
+        Initialize with no call in flight.
+        """
+        self.__calls: typing.Dict[K, asyncio.Future] = {}
+
+    async def do(self, key: K, func: typing.Callable[[], typing.Awaitable[T]]) -> T:
+        """
+        Run `func` unless a call for `key` is already in flight, and return its result.
+
+        Parameters:
+        - key (K): The deduplication key.
+        - func (Callable[[], Awaitable[T]]): Starts the call.
+
+        Returns:
+        - T: The result of the call, shared by every concurrent caller. Exceptions are shared too,
+          except the cancellation of the caller running the call: the next waiting caller runs it instead.
+        """
+        future = self.__calls.get(key)
+        while future is not None:
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # A cancelled leader does not cancel its followers: the next one takes over
+                if not future.cancelled() or asyncio.current_task().cancelling():
+                    raise
+            future = self.__calls.get(key)
+
+        future = self.__calls[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Retrieved here so an unawaited failure is not logged
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self.__calls[key]
+
+    def __len__(self) -> int:
+        return len(self.__calls)
@@ -0,0 +1,195 @@
+import random
+import struct
+import time
+import typing
+import orjson
+from eventum_asgi.connection import WSConnection
+from eventum_asgi.metrics import Metrics
+
+CAPTURE_MAGIC = b'EVCAP\x01'
+"""
+First bytes of a capture log, followed by its records.
+"""
+
+RECORD_HEADER = struct.Struct('!BIdI')
+"""
+Header of a record: kind, connection number, seconds since the capture started and payload length.
+"""
+
+CONNECT, TEXT, BINARY, DISCONNECT = 0, 1, 2, 3
+"""
+Record kinds. The payload of CONNECT is the JSON handshake (path, query string, headers and
+subprotocols), the one of TEXT and BINARY the frame, the one of DISCONNECT the JSON close code.
+"""
+
+
+class CaptureRecord(typing.NamedTuple):
+    """
+    Inbound message of a captured connection.
+    """
+    kind: int
+    connection: int
+    timestamp: float
+    payload: bytes
+
+
+class TrafficCapture:
+    """
+    Recorder of the inbound traffic of sampled connections into a length-prefixed binary log.
+
+    `CaptureMiddleware` records the handshake of a sampled connection and wraps its `receive`,
+    so every message the event loop reads (text and binary frames, then the disconnect) is
+    appended with its timestamp. Records are written to a buffered file: capturing costs a
+    struct pack and a memory copy per message. Values of the `redact_headers` are replaced by
+    'redacted' so that production credentials do not end up in the log. It is a lifespan
+    resource flushing and closing the log on shutdown.
+    """
+    def __init__(self,
+                 file: typing.Union[str, typing.BinaryIO],
+                 sample_rate: float = 1.0,
+                 max_bytes: typing.Optional[int] = None,
+                 redact_headers: typing.Collection[str] = ('authorization', 'cookie'),
+                 metrics: typing.Optional[Metrics] = None):
+        """
+        Open the log and write its header.
+
+        Parameters:
+        - file (Union[str, BinaryIO]): The path of the log or a writable binary file.
+        - sample_rate (float): Fraction of the connections captured, between 0 and 1.
+        - max_bytes (Optional[int]): Size the log never exceeds: it is closed at the first record
+          that would cross it.
+        - redact_headers (Collection[str]): Lowercase names of the headers whose value is not recorded.
+        - metrics (Optional[Metrics]): Registry receiving the capture counters.
+        """
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self.redact_headers = frozenset(name.encode('latin-1') for name in redact_headers)
+        self.metrics = metrics
+        self.size = len(CAPTURE_MAGIC)
+        self.closed = False
+        self.__file: typing.BinaryIO = open(file, 'wb', buffering=64 * 1024) if isinstance(file, str) else file
+        self.__file.write(CAPTURE_MAGIC)
+        self.__started_at = time.monotonic()
+        self.__connections = 0
+
+    def sample(self) -> bool:
+        """
+        Decide whether a new connection is captured.
+        """
+        if self.closed or (self.max_bytes is not None and self.size >= self.max_bytes):
+            return False
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def record_handshake(self, connection: WSConnection) -> int:
+        """
+        Record the handshake of a connection and wrap its `receive` to record the following messages.
+
+        Parameters:
+        - connection (WSConnection): The connection, before it is accepted.
+
+        Returns:
+        - int: The number of the connection in the log.
+        """
+        self.__connections += 1
+        number = self.__connections
+        scope = connection.scope
+        headers = [
+            [name.decode('latin-1'), 'redacted' if name in self.redact_headers else value.decode('latin-1')]
+            for name, value in scope.get('headers', [])
+        ]
+        self.write(CONNECT, number, orjson.dumps({
+            'path': scope.get('path', '/'),
+            'query_string': scope.get('query_string', b'').decode('latin-1'),
+            'headers': headers,
+            'subprotocols': scope.get('subprotocols') or [],
+        }))
+        receive = connection.receive
+
+        async def recording_receive() -> typing.Dict[str, typing.Any]:
+            message = await receive()
+            message_type = message['type']
+            if message_type == 'websocket.receive':
+                text = message.get('text')
+                if text is not None:
+                    self.write(TEXT, number, text.encode('utf-8'))
+                else:
+                    self.write(BINARY, number, message.get('bytes') or b'')
+            elif message_type == 'websocket.disconnect':
+                self.write(DISCONNECT, number, orjson.dumps(message.get('code', 1000)))
+            return message
+
+        connection.receive = recording_receive
+        if self.metrics is not None:
+            self.metrics.increment('capture.connections')
+        return number
+
+    def write(self, kind: int, connection: int, payload: bytes) -> None:
+        """
+        Append a record to the log. Does nothing once the log is closed, and closes it instead of
+        writing a record that would take it over `max_bytes`.
+        """
+        if self.closed:
+            return
+        size = self.size + RECORD_HEADER.size + len(payload)
+        if self.max_bytes is not None and size > self.max_bytes:
+            self.close()
+            if self.metrics is not None:
+                self.metrics.increment('capture.limit_reached')
+            return
+        self.__file.write(RECORD_HEADER.pack(kind, connection, time.monotonic() - self.__started_at, len(payload)))
+        self.__file.write(payload)
+        self.size = size
+        if self.metrics is not None:
+            self.metrics.increment('capture.records')
+
+    def close(self) -> None:
+        """
+        Flush and close the log.
+        """
+        if not self.closed:
+            self.closed = True
+            self.__file.close()
+
+    async def startup(self) -> None:
+        """
+        Nothing to start: the log is opened by the constructor.
+        """
+
+    async def shutdown(self) -> None:
+        """
+        Flush and close the log.
+        """
+        self.close()
+
+
+def read_capture(file: typing.Union[str, typing.BinaryIO]) -> typing.Iterator[CaptureRecord]:
+    """
+    Iterate over the records of a capture log, in the order they were written.
+
+    A record truncated by a crash of the capturing process ends the iteration.
+
+    Parameters:
+    - file (Union[str, BinaryIO]): The path of the log or a readable binary file.
+
+    Yields:
+    - CaptureRecord: The records.
+
+    Raises:
+    - ValueError: If the file is not a capture log.
+    """
+    stream: typing.BinaryIO = open(file, 'rb', buffering=64 * 1024) if isinstance(file, str) else file
+    try:
+        if stream.read(len(CAPTURE_MAGIC)) != CAPTURE_MAGIC:
+            raise ValueError('Not an Eventum capture log')
+        while True:
+            header = stream.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            kind, connection, timestamp, length = RECORD_HEADER.unpack(header)
+            payload = stream.read(length)
+            if len(payload) < length:
+                return
+            yield CaptureRecord(kind, connection, timestamp, payload)
+    finally:
+        if isinstance(file, str):
+            stream.close()
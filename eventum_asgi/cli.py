@@ -0,0 +1,70 @@
+import argparse
+import os
+import sys
+import typing
+from eventum_asgi.server import Supervisor
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Build the parser of the `eventum` command line.
+    """
+    parser = argparse.ArgumentParser(prog='eventum', description='Serve an Eventum application with pre-forked uvicorn workers.')
+    parser.add_argument('app', help="The application as 'module:attribute', e.g. 'main:app'.")
+    parser.add_argument('--host', default='127.0.0.1', help='Address to bind. Default: 127.0.0.1.')
+    parser.add_argument('--port', type=int, default=8000, help='Port to bind. Default: 8000.')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Number of worker processes. Default: the number of CPUs.')
+    parser.add_argument('--backlog', type=int, default=2048, help='Accept queue length of each socket. Default: 2048.')
+    parser.add_argument('--loop', choices=['auto', 'asyncio', 'uvloop'], default='auto',
+                        help='Event loop, auto uses uvloop when it is installed. Default: auto.')
+    parser.add_argument('--http', choices=['auto', 'h11', 'httptools'], default='auto',
+                        help='HTTP parser, auto uses httptools when it is installed. Default: auto.')
+    parser.add_argument('--ws', choices=['auto', 'websockets', 'wsproto'], default='auto',
+                        help='WebSocket implementation. Default: auto.')
+    parser.add_argument('--no-reuse-port', dest='reuse_port', action='store_false',
+                        help='Share a single listening socket instead of one SO_REUSEPORT socket per worker.')
+    parser.add_argument('--cpu-affinity', action='store_true', help='Pin each worker to its own CPU (Linux only).')
+    parser.add_argument('--max-connections', type=int, default=None,
+                        help='Recycle a worker after it accepted this many WebSocket connections.')
+    parser.add_argument('--max-memory', type=int, default=None,
+                        help='Recycle a worker when its resident memory exceeds this many MiB.')
+    parser.add_argument('--graceful-timeout', type=float, default=30.0,
+                        help='Seconds a stopping worker waits for its connections. Default: 30.')
+    parser.add_argument('--log-level', default='info',
+                        choices=['critical', 'error', 'warning', 'info', 'debug', 'trace'], help='Default: info.')
+    parser.add_argument('--app-dir', default='.', help='Directory added to sys.path to import the application. Default: .')
+    return parser
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> int:
+    """
+    Entry point of the `eventum` command.
+
+    Parameters:
+    - argv (Optional[List[str]]): The arguments, defaulting to `sys.argv[1:]`.
+
+    Returns:
+    - int: The exit code.
+    """
+    args = build_parser().parse_args(argv)
+    sys.path.insert(0, os.path.abspath(args.app_dir))
+    supervisor = Supervisor(app=args.app,
+                            host=args.host,
+                            port=args.port,
+                            workers=args.workers,
+                            backlog=args.backlog,
+                            loop=args.loop,
+                            http=args.http,
+                            ws=args.ws,
+                            reuse_port=args.reuse_port,
+                            cpu_affinity=args.cpu_affinity,
+                            max_connections=args.max_connections,
+                            max_memory=args.max_memory * 1024 * 1024 if args.max_memory is not None else None,
+                            graceful_timeout=args.graceful_timeout,
+                            log_level=args.log_level)
+    return supervisor.run()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
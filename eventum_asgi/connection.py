@@ -1,10 +1,25 @@
+import asyncio
+import contextlib
+import inspect
+import traceback
 import uuid
-from typing import Optional, Union, Dict, Callable, List, Any
+from typing import Optional, Union, Dict, Callable, List, Any, AsyncIterator, Coroutine, Iterator, Set, TYPE_CHECKING
+import orjson
+import pydantic
 from eventum_asgi.events.base_event import Event
+from eventum_asgi.events.typed_event import TypedEvent
+from eventum_asgi.events.frozen_event import FrozenEvent
 from eventum_asgi.models.headers import Headers
-from eventum_asgi.types import Scope, Receive, Send
+from eventum_asgi.types import Scope, Receive, Send, Priority
 from eventum_asgi.exceptions import DisconnectedException
 from eventum_asgi.http_eventum import HttpResponse
+from eventum_asgi.lanes import OutboundLanes
+from eventum_asgi.replies import current_recorder, detached_context
+from eventum_asgi.state import State
+from eventum_asgi.streams import ConnectionStreams
+
+if TYPE_CHECKING:
+    from eventum_asgi.sessions import Session
 
 
 class WSConnection:
@@ -26,14 +41,28 @@ class WSConnection:
         self.scope = scope
         self.receive = receive
         self.__flags = {}
-        self.send = send
+        self.__transport: Send = send
         self.__request_headers: Optional[Headers] = self.__create_request_headers_model()
         self.__subprotocols: list = self.scope.get('subprotocols')
         self.__path: str = self.scope.get('path')
+        self.accepted = False
+        self.__state: Optional[State] = None
+        self.dependency_cache: Optional[Dict[Any, Any]] = None
+        self.session: Optional['Session'] = None
+        self.__disconnect_callbacks: List[Callable[['WSConnection'], Any]] = []
+        self.__streams: Optional[ConnectionStreams] = None
+        self.disconnected = False
+        self.lanes: Optional[OutboundLanes] = None
+        self.__pending_receive: Optional[asyncio.Future] = None
+        self.__inbox: Optional[asyncio.Queue] = None
+        self.__reader: Optional[asyncio.Task] = None
+        self.__on_disconnect: Optional[Callable[[], None]] = None
+        self.__tasks: Set[asyncio.Task] = set()
 
     async def accept(self,
                      extra_headers: Optional[Union[Dict[str, str], Headers]] = None,
-                     subprotocol_factory: Callable[[List[str]], str] = lambda subprotocols: subprotocols[0]
+                     subprotocol_factory: Callable[[List[str]], str] = lambda subprotocols: subprotocols[0],
+                     resumable: bool = False
                      ) -> None:
         """
         Accepts the WebSocket connection.
@@ -42,6 +71,10 @@ class WSConnection:
         - extra_headers (Optional[Union[Dict[str, str], Headers]]): Additional headers to include in the response.
         - subprotocol_factory (Callable[[List[str]], str]): A factory function to choose a subprotocol from
          the list of subprotocols offered by the client. Defaults to choosing the first subprotocol.
+        - resumable (bool): Attach the connection to a resumable session of the application's
+          `SessionManager`. The session token is returned in the `X-Eventum-Session` header and in a
+          first `{"event": "session", "token": ..., "resumed": ..., "seq": ...}` message, then the
+          events missed since the client's last sequence number are sent again.
 
         This method sends a `websocket.accept` message to the client,
         indicating that the server accepts the WebSocket connection.
@@ -53,6 +86,14 @@ class WSConnection:
 
         extra_headers_tuples_list = extra_headers.to_tuples()
 
+        missed: List[Union[str, bytes]] = []
+        resumed = False
+        if resumable:
+            sessions = self.app.sessions
+            session, resumed, missed = sessions.attach(self)
+            self.add_disconnect_callback(sessions.detach)
+            extra_headers_tuples_list.append((b'X-Eventum-Session', session.token.encode()))
+
         if self.subprotocols:
             subprotocol = subprotocol_factory(self.subprotocols)
             extra_headers_tuples_list.append((
@@ -65,37 +106,314 @@ class WSConnection:
             "headers": extra_headers_tuples_list
         }
         await self.send(response_dict)
-
-    async def send_text(self, message: Union[str, Event]) -> None:
+        self.accepted = True
+
+        if resumable:
+            await self.send_json({
+                'event': 'session',
+                'token': self.session.token,
+                'resumed': resumed,
+                'seq': self.session.buffer.last_seq
+            })
+            for frame in missed:
+                await self.send({"type": "websocket.send", "text": frame})
+
+    async def send_text(self,
+                        message: Union[str, Event, TypedEvent, FrozenEvent],
+                        priority: Optional[Priority] = None
+                        ) -> None:
         """
         Sends a text message to the client.
 
         Parameters:
-        - message (str): The text message to send.
+        - message (Union[str, Event, TypedEvent, FrozenEvent]): The text message or the event to send.
+          A `FrozenEvent` is sent from its cached JSON without serializing it again.
+        - priority (Optional[Priority]): The outbound lane of the frame when priority lanes are
+          enabled. Defaults to the normal lane.
 
         This method sends a `websocket.send` message with the text data to the client.
         """
-        if isinstance(message, Event):
+        if not isinstance(message, str):
             message = message.to_json()
 
-        await self.send({
+        await self.__send_frame({
             "type": "websocket.send",
             "text": message
-        })
+        }, priority)
     
-    async def send_bytes(self, message: bytes) -> None:
+    async def send_bytes(self, message: bytes, priority: Optional[Priority] = None) -> None:
         """
         Sends a binary message to the client.
 
         Parameters:
         - message (bytes): The binary data to send.
+        - priority (Optional[Priority]): The outbound lane of the frame when priority lanes are
+          enabled. Defaults to the normal lane.
 
         This method sends a `websocket.send` message with the binary data to the client.
         """
-        await self.send({
+        await self.__send_frame({
             "type": "websocket.send",
             "bytes": message
+        }, priority)
+
+    async def send_json(self, data: Any, binary: bool = False, priority: Optional[Priority] = None) -> None:
+        """
+        Serializes data with orjson and sends it to the client.
+
+        Parameters:
+        - data (Any): Any orjson-serializable object, an event or a pydantic model.
+        - binary (bool): Send the JSON bytes as-is in a binary frame. ASGI text frames must be `str`,
+          so the default text frame costs one decode of the serialized bytes.
+        - priority (Optional[Priority]): The outbound lane of the frame when priority lanes are
+          enabled. Defaults to the normal lane.
+
+        This method sends a `websocket.send` message with the JSON data to the client.
+        """
+        if isinstance(data, (dict, list)):
+            payload = orjson.dumps(data)
+        elif isinstance(data, (FrozenEvent, Event, TypedEvent)):
+            payload = data.to_json_bytes()
+        elif isinstance(data, pydantic.BaseModel):
+            payload = data.__pydantic_serializer__.to_json(data)
+        else:
+            payload = orjson.dumps(data)
+        if binary:
+            await self.__send_frame({
+                "type": "websocket.send",
+                "bytes": payload
+            }, priority)
+        else:
+            await self.__send_frame({
+                "type": "websocket.send",
+                "text": payload.decode('utf-8')
+            }, priority)
+
+    async def send_model(self,
+                         model: pydantic.BaseModel,
+                         binary: bool = False,
+                         priority: Optional[Priority] = None
+                         ) -> None:
+        """
+        Serializes a pydantic model with pydantic-core and sends it to the client,
+        without converting it to a dictionary first.
+
+        Parameters:
+        - model (pydantic.BaseModel): The model to send.
+        - binary (bool): Send the JSON bytes in a binary frame instead of a text frame.
+        - priority (Optional[Priority]): The outbound lane of the frame when priority lanes are
+          enabled. Defaults to the normal lane.
+
+        This method sends a `websocket.send` message with the JSON data to the client.
+        """
+        if binary:
+            await self.__send_frame({
+                "type": "websocket.send",
+                "bytes": model.__pydantic_serializer__.to_json(model)
+            }, priority)
+        else:
+            await self.__send_frame({
+                "type": "websocket.send",
+                "text": model.__pydantic_serializer__.to_json(model).decode('utf-8')
+            }, priority)
+
+    async def send(self, message: Dict[str, Any]) -> None:
+        """
+        Sends a raw ASGI message, through the normal lane when priority lanes are enabled.
+
+        Parameters:
+        - message (Dict[str, Any]): The ASGI message, e.g. `{"type": "websocket.send", "text": "..."}`.
+
+        Raises:
+        - DisconnectedException: If the client has disconnected. The message is not handed to the server.
+        """
+        if self.disconnected:
+            raise DisconnectedException(connection_id=self.id)
+        recorder = current_recorder()
+        if recorder is not None:
+            recorder.record(self, message)
+        if self.lanes is not None:
+            await self.lanes.send(message)
+        else:
+            await self.__transport(message)
+
+    async def __transmit(self, message: Dict[str, Any]) -> None:
+        # Write of the lanes: frames still queued when the client disconnects are not handed to the server.
+        if self.disconnected:
+            raise DisconnectedException(connection_id=self.id)
+        await self.__transport(message)
+
+    async def __send_frame(self, message: Dict[str, Any], priority: Optional[Priority]) -> None:
+        if self.disconnected:
+            raise DisconnectedException(connection_id=self.id)
+        if priority is None or self.lanes is None:
+            await self.send(message)
+        else:
+            recorder = current_recorder()
+            if recorder is not None:
+                recorder.record(self, message)
+            await self.lanes.put(message, priority)
+
+    def enable_priority_lanes(self, capacity: int = 256, weights: Optional[Dict[str, int]] = None) -> OutboundLanes:
+        """
+        Route the outbound frames of the connection through priority lanes.
+
+        Frames sent with `priority='high'` then overtake every queued frame, waiting at most for
+        the frame being written. Other frames, including those sent through `connection.send`,
+        go to the normal lane unless sent with `priority='low'`. Call it after `accept`.
+
+        Parameters:
+        - capacity (int): Maximum number of frames queued per lane before senders wait.
+        - weights (Optional[Dict[str, int]]): Share of the normal and low lanes, `{'normal': 4, 'low': 1}` by default.
+
+        Returns:
+        - OutboundLanes: The lanes, also available as `connection.lanes`.
+        """
+        if self.lanes is None:
+            self.lanes = OutboundLanes(self.__transmit, capacity=capacity, weights=weights)
+            self.add_disconnect_callback(
+                lambda connection: self.lanes.close(DisconnectedException(connection_id=self.id))
+            )
+        return self.lanes
+
+    async def send_resumable(self, data: Dict[str, Any]) -> int:
+        """
+        Sends an event that a resuming client receives again if it missed it.
+
+        The event gets the next sequence number of the session in its `seq` field, is serialized
+        once and the resulting frame is kept in the session's replay buffer.
+
+        Parameters:
+        - data (Dict[str, Any]): The event to send. It is not modified.
+
+        Returns:
+        - int: The sequence number of the event.
+
+        Raises:
+        - RuntimeError: If the connection was not accepted with `resumable=True`.
+        """
+        if self.session is None:
+            raise RuntimeError('send_resumable requires a connection accepted with resumable=True')
+        if self.disconnected:
+            raise DisconnectedException(connection_id=self.id)
+        buffer = self.session.buffer
+        seq = buffer.next_seq()
+        frame = orjson.dumps({**data, 'seq': seq}).decode('utf-8')
+        buffer.append(seq, frame)
+        await self.send({
+            "type": "websocket.send",
+            "text": frame
         })
+        return seq
+
+    def __aiter__(self) -> AsyncIterator[Union[str, bytes]]:
+        """
+        Iterate over the frames received from the client.
+
+        `async for message in connection` yields the text or bytes of every frame and ends
+        cleanly when the client disconnects, instead of raising `DisconnectedException`.
+        """
+        return self.__iterate()
+
+    async def __iterate(self) -> AsyncIterator[Union[str, bytes]]:
+        while not self.disconnected:
+            event = await self.__receive_message()
+            if event['type'] == 'websocket.receive':
+                yield event['text'] if event.get('text') is not None else event.get('bytes')
+            elif event['type'] == 'websocket.disconnect':
+                self.disconnected = True
+
+    async def iter_batches(self,
+                           max_items: int = 100,
+                           max_wait: float = 0.0
+                           ) -> AsyncIterator[List[Union[str, bytes]]]:
+        """
+        Iterate over the frames received from the client in batches.
+
+        Each batch waits for one frame, then takes the frames already buffered by the server
+        (or arriving within `max_wait` seconds), up to `max_items`, so the consumer runs once
+        per batch instead of once per frame. The iteration ends cleanly when the client
+        disconnects, after yielding the frames received before the disconnect.
+
+        ASGI `receive` cannot be polled: whether a frame is ready is only known by awaiting it.
+        Every frame after the first of a batch is therefore read by a task of its own, given one
+        event loop iteration (or what is left of `max_wait`) to complete. A receive still pending
+        when the batch ends is kept for the next call, not cancelled.
+
+        Parameters:
+        - max_items (int): Maximum number of frames per batch.
+        - max_wait (float): Seconds to wait for more frames after the first one. With the
+          default of 0, a batch only holds the frames that are immediately available.
+
+        Yields:
+        - List[Union[str, bytes]]: The text or bytes of the frames, in order.
+        """
+        loop = asyncio.get_running_loop()
+        while not self.disconnected:
+            batch: List[Union[str, bytes]] = []
+            self.__collect(await self.__receive_message(), batch)
+            deadline = loop.time() + max_wait
+            while len(batch) < max_items and not self.disconnected:
+                task = self.__pending_receive
+                self.__pending_receive = None
+                if task is None:
+                    task = asyncio.ensure_future(self.__receive_message())
+                if not task.done():
+                    timeout = deadline - loop.time()
+                    if timeout > 0:
+                        await asyncio.wait((task,), timeout=timeout)
+                    else:
+                        await asyncio.sleep(0)
+                if not task.done():
+                    self.__pending_receive = task
+                    break
+                self.__collect(task.result(), batch)
+            if batch:
+                yield batch
+
+    def __collect(self, event: Dict[str, Any], batch: List[Union[str, bytes]]) -> None:
+        if event['type'] == 'websocket.receive':
+            batch.append(event['text'] if event.get('text') is not None else event.get('bytes'))
+        elif event['type'] == 'websocket.disconnect':
+            self.disconnected = True
+
+    async def __receive_message(self) -> Dict[str, Any]:
+        """
+        Receive the next ASGI message, taking over the receive left pending by `iter_batches`,
+        or from the frames buffered by the reader of `cancel_on_disconnect` once it runs.
+        """
+        if self.disconnected:
+            raise DisconnectedException(connection_id=self.id)
+        task = self.__pending_receive
+        if task is not None:
+            self.__pending_receive = None
+            return await task
+        if self.__inbox is not None:
+            return await self.__inbox.get()
+        return await self.receive()
+
+    async def __read(self, task: Optional[asyncio.Future]) -> None:
+        # Reader started by `cancel_on_disconnect`, taking over the pending receive: buffers the
+        # frames for `__receive_message` and marks the connection as soon as the client disconnects.
+        try:
+            while True:
+                try:
+                    message = await (task if task is not None else self.receive())
+                except Exception:
+                    message = {'type': 'websocket.disconnect', 'code': 1006}
+                if message['type'] == 'websocket.disconnect':
+                    self.disconnected = True
+                    if self.__on_disconnect is not None:
+                        self.__on_disconnect()
+                    try:
+                        self.__inbox.put_nowait(message)
+                    except asyncio.QueueFull:
+                        pass
+                    return
+                task = None
+                await self.__inbox.put(message)
+        finally:
+            self.__reader = None
 
     async def receive_data(self) -> Optional[Union[str, bytes]]:
         """
@@ -106,13 +424,14 @@ class WSConnection:
 
         This method waits for a `websocket.receive` message from the client and returns the message data.
         """
-        event = await self.receive()
+        event = await self.__receive_message()
         if event['type'] == 'websocket.receive':
             if event.get('text'):
                 return event['text']
             elif event.get('bytes'):
                 return event['bytes']
         elif event['type'] == 'websocket.disconnect':
+            self.disconnected = True
             raise DisconnectedException(connection_id=self.id)
 
     async def receive_bytes(self) -> Optional[bytes]:
@@ -124,10 +443,11 @@ class WSConnection:
 
         This method waits for a `websocket.receive` message from the client and returns the binary data.
         """
-        event = await self.receive()
+        event = await self.__receive_message()
         if event['type'] == 'websocket.receive':
             return event['bytes']
         elif event['type'] == 'websocket.disconnect':
+            self.disconnected = True
             raise DisconnectedException(connection_id=self.id)
 
     async def receive_text(self) -> Optional[str]:
@@ -139,10 +459,11 @@ class WSConnection:
 
         This method waits for a `websocket.receive` message from the client and returns the text data.
         """
-        event = await self.receive()
+        event = await self.__receive_message()
         if event['type'] == 'websocket.receive':
             return event['text']
         elif event['type'] == 'websocket.disconnect':
+            self.disconnected = True
             raise DisconnectedException(connection_id=self.id)
 
     async def close(self, code: int = 1000, reason: str = "") -> None:
@@ -155,12 +476,159 @@ class WSConnection:
 
         This method sends a `websocket.close` message to the client,
         indicating that the server is closing the WebSocket connection.
+        With priority lanes, the queued frames are written first and the lanes are closed, so
+        that no frame follows the close message. The connection is then marked as disconnected,
+        so later sends fail fast. It does nothing once the client has disconnected.
+        """
+        if self.disconnected:
+            return
+        if self.lanes is not None:
+            try:
+                await self.lanes.flush()
+            finally:
+                self.lanes.close(DisconnectedException(connection_id=self.id))
+        try:
+            await self.__transport({
+                "type": "websocket.close",
+                "code": code,
+                "reason": reason
+            })
+        finally:
+            self.disconnected = True
+
+    def spawn(self, coro: Coroutine[Any, Any, Any], name: Optional[str] = None) -> asyncio.Task:
+        """
+        Run a coroutine in the background for the lifetime of the connection.
+
+        The task belongs to the connection's task group: it is cancelled, and awaited, as soon as
+        the connection leaves the event loop, before the disconnect callbacks run. An exception
+        raised by the task is printed instead of being lost.
+
+        Parameters:
+        - coro (Coroutine): The coroutine to run, e.g. `push_updates(connection, feed)`.
+        - name (Optional[str]): The task name.
+
+        Returns:
+        - asyncio.Task: The task, which may also be cancelled or awaited directly.
+
+        Raises:
+        - DisconnectedException: If the connection is already closed. The coroutine is closed.
         """
-        await self.send({
-            "type": "websocket.close",
-            "code": code,
-            "reason": reason
-        })
+        if self.disconnected:
+            coro.close()
+            raise DisconnectedException(connection_id=self.id)
+        task = asyncio.get_running_loop().create_task(coro, name=name, context=detached_context())
+        self.__tasks.add(task)
+        task.add_done_callback(self.__task_done)
+        return task
+
+    @property
+    def task_count(self) -> int:
+        """
+        Number of live tasks spawned by the connection.
+        """
+        return len(self.__tasks)
+
+    async def cancel_tasks(self) -> int:
+        """
+        Cancel the tasks spawned by the connection and wait for them to finish.
+
+        Returns:
+        - int: The number of tasks cancelled.
+        """
+        tasks = [task for task in self.__tasks if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return len(tasks)
+
+    def __task_done(self, task: asyncio.Task) -> None:
+        self.__tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            if not isinstance(task.exception(), DisconnectedException):
+                traceback.print_exception(task.exception())
+
+    @contextlib.contextmanager
+    def cancel_on_disconnect(self, max_buffered: int = 64) -> Iterator[None]:
+        """
+        Cancel the current task as soon as the client disconnects inside the block.
+
+        The first block starts a reader receiving the ASGI messages of the connection for the rest
+        of its life, so the disconnect is seen without waiting for the block to end, even behind
+        other frames: the connection is marked as disconnected, making further sends fail fast,
+        and the task is cancelled. Frames are buffered for the next `receive_*` calls, up to
+        `max_buffered`; the reader then waits for them to be consumed. The event loop runs every
+        event handler in this block.
+
+        Parameters:
+        - max_buffered (int): Maximum number of frames read ahead of the `receive_*` calls.
+
+        Raises:
+        - DisconnectedException: If the client disconnected before or inside the block, instead
+          of the `CancelledError` thrown into the block.
+        """
+        if self.disconnected:
+            raise DisconnectedException(connection_id=self.id)
+        if self.__reader is None:
+            if self.__inbox is None:
+                self.__inbox = asyncio.Queue(max_buffered)
+            pending, self.__pending_receive = self.__pending_receive, None
+            self.__reader = asyncio.get_running_loop().create_task(self.__read(pending), context=detached_context())
+        task = asyncio.current_task()
+        cancelled = False
+
+        def on_disconnect() -> None:
+            nonlocal cancelled
+            cancelled = task.cancel()
+
+        previous, self.__on_disconnect = self.__on_disconnect, on_disconnect
+        try:
+            yield
+        except asyncio.CancelledError:
+            if cancelled and task.uncancel() == 0:
+                raise DisconnectedException(connection_id=self.id) from None
+            raise
+        except BaseException:
+            if cancelled:
+                task.uncancel()
+            raise
+        else:
+            if cancelled:
+                task.uncancel()
+                raise DisconnectedException(connection_id=self.id)
+        finally:
+            self.__on_disconnect = previous
+
+    def add_disconnect_callback(self, callback: Callable[['WSConnection'], Any]) -> None:
+        """
+        Register a callable run with the connection once it is closed.
+
+        Parameters:
+        - callback (Callable[[WSConnection], Any]): A sync or async callable.
+        """
+        self.__disconnect_callbacks.append(callback)
+
+    async def run_disconnect_callbacks(self) -> None:
+        """
+        Cancel the spawned tasks, then run the disconnect callbacks once, in registration order.
+        Called by the event loop.
+        """
+        if self.__pending_receive is not None:
+            self.__pending_receive.cancel()
+            self.__pending_receive = None
+        if self.__reader is not None:
+            self.__reader.cancel()
+        self.disconnected = True
+        await self.cancel_tasks()
+        callbacks, self.__disconnect_callbacks = self.__disconnect_callbacks, []
+        for callback in callbacks:
+            try:
+                result = callback(self)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                traceback.print_exception(e)
 
     def __create_request_headers_model(self):
         """
@@ -289,6 +757,41 @@ class WSConnection:
         """
         return self.__subprotocols
 
+    @property
+    def app(self) -> Any:
+        """
+        Returns the application serving the connection.
+
+        Returns:
+        - Eventum: The application stored in the scope, or None.
+        """
+        return self.scope.get('app')
+
+    @property
+    def state(self) -> State:
+        """
+        Returns the per-connection state, created on first access as a shallow copy
+        of the ASGI lifespan state (the values yielded by the lifespan context).
+
+        Returns:
+        - State: The connection state.
+        """
+        if self.__state is None:
+            self.__state = State(self.scope.get('state'))
+        return self.__state
+
+    @property
+    def streams(self) -> ConnectionStreams:
+        """
+        Returns the binary streams of the connection, created on first access.
+
+        Returns:
+        - ConnectionStreams: Sends and receives large payloads as flow-controlled chunks.
+        """
+        if self.__streams is None:
+            self.__streams = ConnectionStreams(self)
+        return self.__streams
+
     @property
     def flags(self) -> Dict[Any, Any]:
         """
@@ -0,0 +1,112 @@
+import functools
+import typing
+from eventum_asgi.cache import TTLCache
+from eventum_asgi.connection import WSConnection
+from eventum_asgi.metrics import Metrics
+from eventum_asgi.replies import record_reply
+from eventum_asgi.types import Handler
+
+_MISSING = object()
+_IN_FLIGHT = object()
+
+
+class Deduplicator:
+    """
+    Answers retried events with the reply of their first delivery instead of running the handler again.
+
+    An event carrying a message id in `id_field` is remembered, with its event name, in a window
+    of the last `window` ids seen on the connection (or for the user identified by the connection
+    flag `identity_flag`, so retries over a new socket are caught too), for `ttl` seconds. The
+    frames the handler call sent to the connection, recorded by a `ReplyRecorder`, are kept with
+    the id unless they exceed `max_reply_bytes`, and sent again for a duplicate. Events without a
+    message id always run.
+    """
+    def __init__(self,
+                 id_field: str = 'id',
+                 window: int = 256,
+                 ttl: float = 60.0,
+                 identity_flag: typing.Any = None,
+                 max_windows: int = 10_000,
+                 max_reply_bytes: int = 64 * 1024,
+                 metrics: typing.Optional[Metrics] = None):
+        """
+        Initialize the deduplicator.
+
+        Parameters:
+        - id_field (str): The event field holding the message id.
+        - window (int): Maximum number of message ids remembered per connection or user.
+        - ttl (float): Seconds a message id is remembered.
+        - identity_flag (Any): Connection flag keying the windows per user instead of per connection.
+        - max_windows (int): Maximum number of windows, the least recently used being dropped.
+        - max_reply_bytes (int): Maximum size of the reply kept for a message id.
+        - metrics (Optional[Metrics]): Registry receiving the dedupe counters and gauges.
+        """
+        self.id_field = id_field
+        self.window = window
+        self.ttl = ttl
+        self.identity_flag = identity_flag
+        self.max_reply_bytes = max_reply_bytes
+        self.metrics = metrics
+        self.windows: TTLCache[typing.Any, TTLCache] = TTLCache(maxsize=max_windows, ttl=ttl)
+        if metrics is not None:
+            metrics.register_gauge('dedupe.windows', lambda: len(self.windows))
+            metrics.register_gauge('dedupe.entries', lambda: sum(len(window) for window in self.windows.values()))
+
+    def wrap(self, call: Handler) -> Handler:
+        """
+        Wrap the call of a route so that duplicated events are answered from the window.
+
+        Parameters:
+        - call (Handler): The async callable invoking the handler.
+
+        Returns:
+        - Handler: The deduplicating callable.
+        """
+        @functools.wraps(call)
+        async def call_once(connection: WSConnection, event_data: typing.Any, *args: typing.Any, **kwargs: typing.Any) -> typing.Any:
+            message_id = event_data.get(self.id_field) if isinstance(event_data, dict) else None
+            if message_id is None:
+                return await call(connection, event_data, *args, **kwargs)
+
+            window = self.__window(connection)
+            key = (event_data.get('event'), message_id)
+            entry = window.get(key, _MISSING)
+            if entry is not _MISSING:
+                self.__count('dedupe.duplicates')
+                if entry is not _IN_FLIGHT and entry is not None:
+                    for message in entry:
+                        await connection.send(message)
+                    self.__count('dedupe.replayed_messages', len(entry))
+                return None
+
+            window.set(key, _IN_FLIGHT)
+            try:
+                result, reply = await record_reply(call, connection, event_data, *args, **kwargs)
+            except BaseException:
+                window.pop(key)
+                raise
+            window.set(key, tuple(reply.frames) if reply.size <= self.max_reply_bytes else None)
+            return result
+        return call_once
+
+    def __window(self, connection: WSConnection) -> TTLCache:
+        key = connection if self.identity_flag is None else connection.get_flag(self.identity_flag)
+        if key is None:
+            key = connection
+        window = self.windows.get(key)
+        if window is None:
+            window = TTLCache(maxsize=self.window, ttl=self.ttl)
+            if key is connection:
+                connection.add_disconnect_callback(self.forget)
+        self.windows.set(key, window)
+        return window
+
+    def forget(self, connection: WSConnection) -> None:
+        """
+        Drop the window of a connection. Registered as a disconnect callback for per-connection windows.
+        """
+        self.windows.pop(connection)
+
+    def __count(self, name: str, value: int = 1) -> None:
+        if self.metrics is not None:
+            self.metrics.increment(name, value)
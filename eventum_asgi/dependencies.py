@@ -0,0 +1,243 @@
+import inspect
+import typing
+from eventum_asgi.offload import is_async_callable
+
+if typing.TYPE_CHECKING:
+    from eventum_asgi.connection import WSConnection
+
+DependencyScope = typing.Literal['app', 'connection', 'event']
+"""
+Lifetime of a resolved dependency value.
+
+- **'app'**: Resolved once and shared by every connection (settings, connection pools).
+- **'connection'**: Resolved once per connection (the current user).
+- **'event'**: Resolved once per handler call, shared by the dependencies of that call.
+"""
+
+_CONNECTION = 0
+_EVENT = 1
+_DEPENDENCY = 2
+
+_SCOPE_WIDTH: typing.Dict[str, int] = {'app': 0, 'connection': 1, 'event': 2}
+
+
+class Depends:
+    """
+    Marker declaring that a handler parameter is provided by a dependency.
+
+    Use it as the parameter default or inside `typing.Annotated`:
+
+        def get_settings():
+            return Settings()
+
+        @app.event('save')
+        async def save(connection, event, settings=Depends(get_settings, scope='app')):
+            ...
+
+        @app.event('load')
+        async def load(connection, event, user: Annotated[User, Depends(get_user, scope='connection')]):
+            ...
+
+    A dependency may itself take the `connection` (by name or `WSConnection` annotation),
+    the `event` data (named `event` or `event_data`) and other `Depends` parameters, as long as
+    they live at least as long as its scope: an 'app' dependency takes neither the connection nor
+    the event, a 'connection' dependency does not take the event, and no dependency depends on a
+    narrower-scoped one. Otherwise the value of the first connection or event would be cached for
+    all of them, so registering such a dependency raises `TypeError`.
+    """
+    __slots__ = ('dependency', 'scope')
+
+    def __init__(self, dependency: typing.Callable[..., typing.Any], scope: DependencyScope = 'event'):
+        """
+        Initialize the marker.
+
+        Parameters:
+        - dependency (Callable[..., Any]): A sync or async callable returning the value.
+        - scope (DependencyScope): How long the resolved value is cached. Defaults to 'event'.
+        """
+        if scope not in ('app', 'connection', 'event'):
+            raise ValueError(f'Unknown dependency scope: {scope!r}')
+        self.dependency = dependency
+        self.scope = scope
+
+    def __repr__(self) -> str:
+        return f'Depends({getattr(self.dependency, "__qualname__", self.dependency)!r}, scope={self.scope!r})'
+
+
+class Dependant:
+    """
+    Resolution node for one dependency callable, built once at registration time.
+    """
+    __slots__ = ('call', 'scope', 'is_async', 'params')
+
+    def __init__(self,
+                 call: typing.Callable[..., typing.Any],
+                 scope: DependencyScope,
+                 params: typing.Tuple[typing.Tuple[str, int, typing.Optional['Dependant']], ...]):
+        self.call = call
+        self.scope = scope
+        self.is_async = is_async_callable(call)
+        self.params = params
+
+
+class DependencyPlan:
+    """
+    Precompiled list of the dependency parameters of one handler.
+
+    Resolving it walks tuples built at registration time; no signature is inspected per event.
+    """
+    __slots__ = ('injector', 'params')
+
+    def __init__(self, injector: 'DependencyInjector', params: typing.Tuple[typing.Tuple[str, Dependant], ...]):
+        self.injector = injector
+        self.params = params
+
+    async def resolve(self, connection: 'WSConnection', event: typing.Any = None) -> typing.Dict[str, typing.Any]:
+        """
+        Resolve every dependency of the handler.
+
+        Parameters:
+        - connection (WSConnection): The connection the handler is called for.
+        - event (Any): The event data, or None for handshake handlers.
+
+        Returns:
+        - Dict[str, Any]: The keyword arguments to pass to the handler.
+        """
+        event_cache: typing.Dict[typing.Any, typing.Any] = {}
+        solve = self.injector.solve
+        return {name: await solve(node, connection, event, event_cache) for name, node in self.params}
+
+
+class DependencyInjector:
+    """
+    Builds dependency plans for handlers and owns the application-scoped cache.
+    """
+    def __init__(self):
+        """
+        Initialize the injector with an empty application-scoped cache.
+        """
+        self.app_cache: typing.Dict[typing.Any, typing.Any] = {}
+        self.__nodes: typing.Dict[typing.Tuple[typing.Any, str], Dependant] = {}
+
+    def build_plan(self, handler: typing.Callable[..., typing.Any]) -> typing.Optional[DependencyPlan]:
+        """
+        Inspect the handler signature once and build its resolution plan.
+
+        Parameters without a `Depends` marker are left to the router (`connection`, `event`).
+
+        Parameters:
+        - handler (Callable[..., Any]): The event or handshake handler being registered.
+
+        Returns:
+        - Optional[DependencyPlan]: The plan, or None if the handler declares no dependency.
+        """
+        params = tuple(
+            (name, self.__node(marker.dependency, marker.scope, ()))
+            for name, marker in self.__markers(handler)
+        )
+        return DependencyPlan(self, params) if params else None
+
+    async def solve(self,
+                    node: Dependant,
+                    connection: 'WSConnection',
+                    event: typing.Any,
+                    event_cache: typing.Dict[typing.Any, typing.Any]
+                    ) -> typing.Any:
+        """
+        Resolve one dependency, reusing the cached value of its scope when present.
+        """
+        if node.scope == 'event':
+            cache = event_cache
+        elif node.scope == 'app':
+            cache = self.app_cache
+        else:
+            cache = connection.dependency_cache
+            if cache is None:
+                cache = connection.dependency_cache = {}
+        try:
+            return cache[node.call]
+        except KeyError:
+            pass
+
+        kwargs = {}
+        for name, kind, sub in node.params:
+            if kind == _CONNECTION:
+                kwargs[name] = connection
+            elif kind == _EVENT:
+                kwargs[name] = event
+            else:
+                kwargs[name] = await self.solve(sub, connection, event, event_cache)
+        value = node.call(**kwargs)
+        if node.is_async:
+            value = await value
+        cache[node.call] = value
+        return value
+
+    def __node(self,
+               call: typing.Callable[..., typing.Any],
+               scope: DependencyScope,
+               stack: typing.Tuple[typing.Any, ...]
+               ) -> Dependant:
+        key = (call, scope)
+        node = self.__nodes.get(key)
+        if node is not None:
+            return node
+        if call in stack:
+            raise TypeError(f'Circular dependency on {call!r}')
+
+        from eventum_asgi.connection import WSConnection
+
+        params = []
+        hints = self.__hints(call)
+        markers = dict(self.__markers(call))
+        for name, parameter in self.__signature(call).parameters.items():
+            if name in markers:
+                marker = markers[name]
+                sub = self.__node(marker.dependency, marker.scope, stack + (call,))
+                self.__check_scope(call, scope, f'the {sub.scope}-scoped dependency {sub.call!r}', sub.scope)
+                params.append((name, _DEPENDENCY, sub))
+                continue
+            annotation = hints.get(name, parameter.annotation)
+            if name == 'connection' or (inspect.isclass(annotation) and issubclass(annotation, WSConnection)):
+                self.__check_scope(call, scope, 'the connection', 'connection')
+                params.append((name, _CONNECTION, None))
+            elif name in ('event', 'event_data'):
+                self.__check_scope(call, scope, 'the event', 'event')
+                params.append((name, _EVENT, None))
+            elif parameter.default is inspect.Parameter.empty and parameter.kind not in (
+                    inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD):
+                raise TypeError(f'Cannot resolve parameter {name!r} of dependency {call!r}')
+        node = self.__nodes[key] = Dependant(call, scope, tuple(params))
+        return node
+
+    @staticmethod
+    def __check_scope(call: typing.Callable[..., typing.Any], scope: DependencyScope, what: str, needed: str) -> None:
+        if _SCOPE_WIDTH[needed] > _SCOPE_WIDTH[scope]:
+            raise TypeError(f'The {scope}-scoped dependency {call!r} cannot depend on {what}')
+
+    @classmethod
+    def __markers(cls, func: typing.Callable[..., typing.Any]) -> typing.List[typing.Tuple[str, Depends]]:
+        markers = []
+        hints = cls.__hints(func)
+        for name, parameter in cls.__signature(func).parameters.items():
+            if isinstance(parameter.default, Depends):
+                markers.append((name, parameter.default))
+                continue
+            annotation = hints.get(name, parameter.annotation)
+            if typing.get_origin(annotation) is typing.Annotated:
+                marker = next((m for m in annotation.__metadata__ if isinstance(m, Depends)), None)
+                if marker is not None:
+                    markers.append((name, marker))
+        return markers
+
+    @staticmethod
+    def __signature(func: typing.Callable[..., typing.Any]) -> inspect.Signature:
+        return inspect.signature(func)
+
+    @staticmethod
+    def __hints(func: typing.Callable[..., typing.Any]) -> typing.Dict[str, typing.Any]:
+        target = func if inspect.isfunction(func) or inspect.ismethod(func) else getattr(func, '__call__', func)
+        try:
+            return typing.get_type_hints(target, include_extras=True)
+        except Exception:
+            return {}
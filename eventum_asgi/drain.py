@@ -0,0 +1,117 @@
+import asyncio
+import typing
+from eventum_asgi.connection import WSConnection
+from eventum_asgi.event_loop import EventLoop
+from eventum_asgi.http_eventum import HttpResponse
+from eventum_asgi.metrics import Metrics
+
+
+class ConnectionDrainer:
+    """
+    Drain phase run at the beginning of `lifespan.shutdown`.
+
+    While draining, new handshakes are answered with HTTP 503. Live connections are closed with
+    code 1001 (going away) in staggered batches, so clients of a pod being replaced reconnect
+    over `batch_interval * connections / batch_size` seconds instead of all at once. Idle
+    connections of a batch are closed right away. A connection whose handler is still running is
+    set aside and closed once that handler returns, or after `handler_grace` seconds, without
+    holding back the next batches. The whole phase is bounded by `timeout`, closes included: a
+    close still flushing the outbound lanes of a slow client is abandoned at the deadline.
+    """
+    def __init__(self,
+                 event_loop: EventLoop,
+                 batch_size: int = 100,
+                 batch_interval: float = 0.1,
+                 timeout: float = 30.0,
+                 handler_grace: typing.Optional[float] = None,
+                 close_code: int = 1001,
+                 retry_after: int = 5,
+                 metrics: typing.Optional[Metrics] = None
+                 ) -> None:
+        """
+        Initialize the drainer.
+
+        Parameters:
+        - event_loop (EventLoop): The event loop tracking live and busy connections.
+        - batch_size (int): Number of connections closed per batch.
+        - batch_interval (float): Delay in seconds between two batches.
+        - timeout (float): Upper bound in seconds of the whole drain phase.
+        - handler_grace (Optional[float]): Seconds a busy connection may keep running its handler
+          once its batch is reached, before it is closed anyway. Defaults to `timeout`.
+        - close_code (int): The WebSocket close code sent to clients. Defaults to 1001 (going away).
+        - retry_after (int): Value of the `Retry-After` header of handshakes rejected while draining.
+        - metrics (Optional[Metrics]): Registry receiving the drain counters.
+        """
+        self.event_loop = event_loop
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.timeout = timeout
+        self.handler_grace = handler_grace
+        self.close_code = close_code
+        self.retry_after = retry_after
+        self.metrics = metrics
+        self.draining = False
+
+    def resume(self) -> None:
+        """
+        Accept handshakes again. Called on `lifespan.startup`.
+        """
+        self.draining = False
+
+    async def reject(self, connection: WSConnection) -> None:
+        """
+        Answer a handshake received while draining with HTTP 503.
+
+        Parameters:
+        - connection (WSConnection): The connection being rejected.
+        """
+        if self.metrics is not None:
+            self.metrics.increment('drain.rejected_handshakes')
+        await connection.send_http_response(HttpResponse(
+            code=503,
+            headers={'Retry-After': str(self.retry_after)},
+            body=b'Server is shutting down'
+        ))
+
+    async def drain(self) -> None:
+        """
+        Stop accepting handshakes, close live connections in rate-limited batches and wait
+        for in-flight handlers, all within `timeout` seconds.
+        """
+        self.draining = True
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        connections = list(self.event_loop.connections)
+        busy: typing.List[asyncio.Task] = []
+        for start in range(0, len(connections), self.batch_size):
+            if start:
+                await asyncio.sleep(min(self.batch_interval, max(0.0, deadline - loop.time())))
+            idle = []
+            for connection in connections[start:start + self.batch_size]:
+                if connection in self.event_loop.busy:
+                    grace = deadline if self.handler_grace is None else min(deadline, loop.time() + self.handler_grace)
+                    busy.append(asyncio.ensure_future(self.__close_when_idle(connection, grace)))
+                else:
+                    idle.append(connection)
+            await asyncio.gather(*(self.__close(connection, deadline) for connection in idle))
+        await asyncio.gather(*busy)
+        await self.event_loop.wait_idle(lambda: bool(self.event_loop.busy), deadline)
+
+    async def __close_when_idle(self, connection: WSConnection, deadline: float) -> None:
+        await self.event_loop.wait_idle(lambda: connection in self.event_loop.busy, deadline)
+        await self.__close(connection, deadline)
+
+    async def __close(self, connection: WSConnection, deadline: float) -> None:
+        if connection not in self.event_loop.connections:
+            return
+        try:
+            async with asyncio.timeout(max(0.0, deadline - asyncio.get_running_loop().time())):
+                await connection.close(code=self.close_code, reason='Server is shutting down')
+        except TimeoutError:
+            if self.metrics is not None:
+                self.metrics.increment('drain.close_timeouts')
+            return
+        except Exception:
+            return
+        if self.metrics is not None:
+            self.metrics.increment('drain.closed_connections')
@@ -1,49 +1,146 @@
 import asyncio
 import traceback
+import typing
 import orjson
 from eventum_asgi.connection import WSConnection
 from eventum_asgi.event_router import EventRouter
+from eventum_asgi.events.frozen_event import FrozenEvent
+from eventum_asgi.events.timeout_error import EventTimeoutException
 from eventum_asgi.events.validation_error import EventValidationException
-from eventum_asgi.exceptions import DisconnectedException
+from eventum_asgi.exceptions import DisconnectedException, HandlerTimeoutException
 from eventum_asgi.exceptions.validation import ValidationException
+from eventum_asgi.metrics import Metrics
+from eventum_asgi.streams import is_chunk
 
 
 class EventLoop:
-    def __init__(self, router: EventRouter):
+    validation_exception_event = FrozenEvent(EventValidationException())
+    """
+    Event sent when an event fails validation, serialized once for all connections.
+    """
+    timeout_exception_event = FrozenEvent(EventTimeoutException())
+    """
+    Event sent when an event handler is cancelled by its timeout, serialized once for all connections.
+    """
+
+    def __init__(self,
+                 router: EventRouter,
+                 metrics: typing.Optional[Metrics] = None,
+                 cancel_on_disconnect: bool = True):
+        """
+        Initialize the event loop.
+
+        Parameters:
+        - router (EventRouter): The router events are dispatched to.
+        - metrics (Optional[Metrics]): Registry receiving the live and busy connection gauges
+          and the handler timeout counter.
+        - cancel_on_disconnect (bool): Watch for the disconnect of the client while a handler
+          runs and cancel the handler as soon as it arrives.
+        """
         self.router = router
+        self.metrics = metrics
+        self.cancel_on_disconnect = cancel_on_disconnect
+        self.connections: typing.Set[WSConnection] = set()
+        self.busy: typing.Set[WSConnection] = set()
+        self.__left_busy = asyncio.Event()
+        if metrics is not None:
+            metrics.register_gauge('connections.live', lambda: len(self.connections))
+            metrics.register_gauge('connections.busy', lambda: len(self.busy))
+            metrics.register_gauge('connections.tasks', self.__task_counts)
 
-    @staticmethod
-    async def send_validation_exception_event(connection: WSConnection):
+    async def send_validation_exception_event(self, connection: WSConnection):
         """
-        Send a validation exception event to the client.
+        Send the cached validation exception event to the client.
 
         Parameters:
         - connection (WSConnection): The connection object to send the event to.
         """
-        await connection.send_text(EventValidationException())
+        await connection.send_text(self.validation_exception_event, priority='high')
 
     async def handle_connection(self, connection: WSConnection):
         """
         Handle the WebSocket connection by receiving data and routing events.
 
+        The connection is registered in `connections` for its whole lifetime and in `busy`
+        while one of its event handlers is running, which lets the drain phase find live
+        sockets and wait for in-flight handlers. Unless `cancel_on_disconnect` is disabled, a
+        handler is cancelled as soon as its client disconnects instead of running to completion
+        for nobody. The disconnect callbacks of the connection run once it leaves the loop.
+
         Parameters:
         - connection (WSConnection): The connection object to handle.
         """
-        while True:
-            await asyncio.sleep(0.1)
+        self.connections.add(connection)
+        try:
+            while True:
+                try:
+                    data = await connection.receive_data()
+                    if data is not None:
+                        if is_chunk(data):
+                            connection.streams.feed(data)
+                            continue
+                        data_json = orjson.loads(data)
+                        self.busy.add(connection)
+                        try:
+                            if self.cancel_on_disconnect:
+                                with connection.cancel_on_disconnect():
+                                    await self.router.route_event(connection, data_json)
+                            else:
+                                await self.router.route_event(connection, data_json)
+                        except DisconnectedException:
+                            if self.metrics is not None:
+                                self.metrics.increment('events.cancelled_on_disconnect')
+                            raise
+                        finally:
+                            self.busy.discard(connection)
+                            self.__left_busy.set()
+
+                except orjson.JSONDecodeError:
+                    print('Not json')
+                except ValidationException:
+                    await self.send_validation_exception_event(connection)
+                except HandlerTimeoutException:
+                    if self.metrics is not None:
+                        self.metrics.increment('events.timeouts')
+                    await connection.send_text(self.timeout_exception_event, priority='high')
+                except DisconnectedException:
+                    break  # Exit the loop if disconnected
+                except Exception as e:
+                    traceback.print_exception(e)
+                    await connection.close()
+                    break  # Exit the loop in case of an error
+        except DisconnectedException:
+            pass  # The client left while an error event was being sent
+        finally:
+            self.connections.discard(connection)
+            if self.metrics is not None and connection.task_count:
+                self.metrics.increment('connections.tasks_cancelled', connection.task_count)
+            await connection.run_disconnect_callbacks()
+
+    async def wait_idle(self, is_busy: typing.Callable[[], bool], deadline: float) -> bool:
+        """
+        Wait until `is_busy()` is false, checking it again each time a connection leaves `busy`.
+
+        Parameters:
+        - is_busy (Callable[[], bool]): The condition waited out, e.g. `lambda: bool(loop.busy)`.
+        - deadline (float): Event loop time at which to stop waiting.
+
+        Returns:
+        - bool: False if the deadline was reached first.
+        """
+        loop = asyncio.get_running_loop()
+        while is_busy():
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            self.__left_busy.clear()
             try:
-                data = await connection.receive_data()
-                if data is not None:
-                    data_json = orjson.loads(data)
-                    await self.router.route_event(connection, data_json)
-                  
-            except orjson.JSONDecodeError:
-                print('Not json')
-            except ValidationException:
-                await self.send_validation_exception_event(connection)
-            except DisconnectedException:
-                break  # Exit the loop if disconnected
-            except Exception as e:
-                traceback.print_exception(e)
-                await connection.close()
-                break  # Exit the loop in case of an error
\ No newline at end of file
+                async with asyncio.timeout(remaining):
+                    await self.__left_busy.wait()
+            except TimeoutError:
+                return not is_busy()
+        return True
+
+    def __task_counts(self) -> typing.Dict[str, int]:
+        counts = [connection.task_count for connection in self.connections]
+        return {'live': sum(counts), 'max_per_connection': max(counts, default=0)}
@@ -1,22 +1,71 @@
+import asyncio
 import functools
 import typing
 import pydantic
 from eventum_asgi.connection import WSConnection
+from eventum_asgi.dedupe import Deduplicator
+from eventum_asgi.dependencies import DependencyInjector
+from eventum_asgi.exceptions.timeout import HandlerTimeoutException
 from eventum_asgi.exceptions.validation import ValidationException
-from eventum_asgi.types import EventRoutesDict, Handler
+from eventum_asgi.load import LoopMonitor
+from eventum_asgi.offload import ThreadOffloader, ProcessOffloader, is_async_callable
+from eventum_asgi.response_cache import ResponseCache
+from eventum_asgi.streams import IncomingStream
+from eventum_asgi.types import EventRoutesDict, Handler, Offload, Priority
 
 
 class EventRouter:
-    def __init__(self):
+    def __init__(self,
+                 thread_offloader: typing.Optional[ThreadOffloader] = None,
+                 process_offloader: typing.Optional[ProcessOffloader] = None,
+                 injector: typing.Optional[DependencyInjector] = None,
+                 deduplicator: typing.Optional[Deduplicator] = None,
+                 default_timeout: typing.Optional[float] = None,
+                 load_monitor: typing.Optional[LoopMonitor] = None,
+                 response_cache: typing.Optional[ResponseCache] = None):
+        """
+        Initialize the event router.
+
+        Parameters:
+        - thread_offloader (Optional[ThreadOffloader]): The pool running synchronous handlers and
+          routes registered with `offload='thread'`. A default pool is created if omitted.
+        - process_offloader (Optional[ProcessOffloader]): The pool running routes registered with
+          `offload='process'`. A default pool is created if omitted.
+        - injector (Optional[DependencyInjector]): Builds the dependency plans of the handlers and
+          holds the application-scoped dependency cache.
+        - deduplicator (Optional[Deduplicator]): Used by the routes registered with `dedupe=True`.
+        - default_timeout (Optional[float]): Seconds a handler may run before it is cancelled, for
+          the routes registered without a timeout. None lets handlers run unbounded.
+        - load_monitor (Optional[LoopMonitor]): Events of the routes registered with
+          `priority='low'` are dropped while it sheds load.
+        - response_cache (Optional[ResponseCache]): Used by the routes registered with `cache=True`.
+        """
         self.events: EventRoutesDict = {}
+        self.thread_offloader = thread_offloader if thread_offloader is not None else ThreadOffloader()
+        self.process_offloader = process_offloader if process_offloader is not None else ProcessOffloader()
+        self.injector = injector if injector is not None else DependencyInjector()
+        self.deduplicator = deduplicator if deduplicator is not None else Deduplicator()
+        self.default_timeout = default_timeout
+        self.load_monitor = load_monitor
+        self.response_cache = response_cache if response_cache is not None else ResponseCache()
 
     async def route_event(self, connection: WSConnection, event_data: dict):
         """
         Route the event to the appropriate handler.
 
+        When the route or the router has a timeout, the deadline is a single timer on the event
+        loop (`asyncio.timeout`), not an extra task. On expiry the handler is cancelled, so its
+        `finally` blocks and context managers still run, and `HandlerTimeoutException` is raised.
+        A handler offloaded to a thread stops being awaited but its thread runs to completion.
+        Events of low-priority routes are dropped without a reply while the load monitor sheds load.
+
         Parameters:
         - connection (WSConnection): The connection object.
         - event_data (dict): The event data.
+
+        Raises:
+        - ValidationException: If the event fails the validator of its route.
+        - HandlerTimeoutException: If the handler ran past its timeout.
         """
         event = event_data.get('event')
         path = self.events.get(event)
@@ -25,14 +74,37 @@ class EventRouter:
             if validator is not None:
                 if not self.validate_model(validator, event_data):
                     raise ValidationException()
+            if path.get('priority') == 'low' and self.load_monitor is not None and self.load_monitor.shedding:
+                self.load_monitor.count('load.events_dropped')
+                return
             handler = path['handler']
-            await handler(connection, event_data)
+            timeout = path.get('timeout')
+            if timeout is None:
+                timeout = self.default_timeout
+            if timeout is None:
+                await handler(connection, event_data)
+                return
+            deadline = asyncio.timeout(timeout)
+            try:
+                async with deadline:
+                    await handler(connection, event_data)
+            except TimeoutError:
+                if not deadline.expired():
+                    raise
+                raise HandlerTimeoutException(event, timeout) from None
         else:
             print('No event')
 
     def route(self,
               event: str,
-              validator: typing.Optional[typing.Type[pydantic.BaseModel]] = None
+              validator: typing.Optional[typing.Type[pydantic.BaseModel]] = None,
+              offload: Offload = None,
+              dedupe: typing.Union[bool, Deduplicator] = False,
+              timeout: typing.Optional[float] = None,
+              priority: Priority = 'normal',
+              cache: typing.Union[bool, ResponseCache] = False,
+              cache_key: typing.Optional[typing.Sequence[str]] = None,
+              stream: bool = False
               ) -> typing.Callable[[Handler], Handler]:
         """
     A decorator that registers a WebSocket event handler for the specified event.
@@ -41,6 +113,31 @@ class EventRouter:
     -----------
     event : str
         The event type to be registered (e.g., "registered", "message_sent").
+    validator : typing.Optional[typing.Type[pydantic.BaseModel]]
+        A Pydantic model to validate the event data against.
+    offload : Offload
+        Set to 'thread' to run an async handler that wraps blocking code on the thread pool, or
+        'process' to call a picklable function as `handler(event_data)` in the process pool.
+        Other synchronous handlers are always run on the thread pool.
+    dedupe : typing.Union[bool, Deduplicator]
+        Set to True to answer events whose message id was already handled with the cached reply
+        instead of running the handler again, or pass a `Deduplicator` configured for this route.
+    timeout : typing.Optional[float]
+        Seconds the handler may run before it is cancelled. Defaults to the router timeout.
+    priority : Priority
+        Set to 'low' for events that may be dropped while the application sheds load.
+    cache : typing.Union[bool, ResponseCache]
+        Set to True for read-only events whose reply only depends on their payload, to send the
+        memoized reply of identical events instead of running the handler again, or pass a
+        `ResponseCache` configured for this route.
+    cache_key : typing.Optional[typing.Sequence[str]]
+        The payload fields the reply depends on. Defaults to the whole payload.
+    stream : bool
+        With offload='process', receive the binary stream announced by the event's 'stream' (id)
+        and 'size' (bytes) fields into shared memory and call the function as
+        `handler(event_data, payload)`, `payload` being a memoryview valid during the call. The
+        stream is consumed and the function run in a task of the connection, after the handler
+        returned, so the result is sent outside of its timeout, deduplication and cache.
 
     Returns:
     --------
@@ -50,6 +147,8 @@ class EventRouter:
     """
 
         def decorator(func: Handler) -> Handler:
+            call = self.__cached(event, self.build_call(func, offload, dedupe, stream), cache, cache_key)
+
             @functools.wraps(func)
             async def wrapped_handler(connection: WSConnection,
                                       *args: typing.Any,
@@ -73,14 +172,140 @@ class EventRouter:
                 Any
                     The result of the asynchronous handler function.
                 """
-                return await func(connection, *args, **kwargs)
+                return await call(connection, *args, **kwargs)
 
             # Register the route with the wrapped handler
-            self.events[event] = {'handler': wrapped_handler, 'validator': validator}
+            self.events[event] = {'handler': wrapped_handler, 'validator': validator, 'timeout': timeout,
+                                  'priority': priority}
             return wrapped_handler
 
         return decorator
 
+    def build_call(self,
+                   handler: Handler,
+                   offload: Offload = None,
+                   dedupe: typing.Union[bool, Deduplicator] = False,
+                   stream: bool = False
+                   ) -> Handler:
+        """
+        Build the coroutine function used to invoke a handler, decided once at registration.
+
+        The execution mode and the dependency plan of the handler are both computed here,
+        so dispatching an event never inspects the handler again.
+
+        Parameters:
+        - handler (Handler): The handler being registered.
+        - offload (Offload): The requested offload mode.
+        - dedupe (Union[bool, Deduplicator]): Deduplicate the events by message id.
+        - stream (bool): Hand the binary stream announced by the event to a process handler.
+
+        Returns:
+        - Handler: An async callable taking the same arguments as the handler.
+        """
+        call = self.__build_call(handler, offload, stream)
+        if dedupe:
+            deduplicator = dedupe if isinstance(dedupe, Deduplicator) else self.deduplicator
+            call = deduplicator.wrap(call)
+        return call
+
+    def __cached(self,
+                 event: str,
+                 call: Handler,
+                 cache: typing.Union[bool, ResponseCache],
+                 cache_key: typing.Optional[typing.Sequence[str]]
+                 ) -> Handler:
+        if not cache:
+            return call
+        response_cache = cache if isinstance(cache, ResponseCache) else self.response_cache
+        return response_cache.wrap(event, call, cache_key)
+
+    def __build_call(self, handler: Handler, offload: Offload, stream: bool = False) -> Handler:
+        plan = self.injector.build_plan(handler)
+        if stream and offload != 'process':
+            raise ValueError("stream=True requires offload='process'")
+
+        if offload == 'process':
+            if is_async_callable(handler):
+                raise ValueError("offload='process' requires a synchronous, picklable function")
+            if plan is not None:
+                raise ValueError("offload='process' handlers cannot declare dependencies")
+
+            if stream:
+                async def call_in_process_with_stream(connection: WSConnection, event_data: typing.Any) -> None:
+                    stream_id, size = event_data.get('stream'), event_data.get('size')
+                    if type(stream_id) is not int or type(size) is not int:
+                        raise ValidationException()
+                    if not 0 <= size <= self.process_offloader.max_stream_bytes:
+                        raise ValidationException()
+                    incoming = await connection.streams.receive(stream_id)
+                    connection.spawn(self.__run_stream(handler, connection, event_data, incoming, size))
+                return call_in_process_with_stream
+
+            async def call_in_process(connection: WSConnection, event_data: typing.Any) -> typing.Any:
+                result = await self.process_offloader.run(handler, event_data)
+                await self.send_handler_result(connection, result)
+                return result
+            return call_in_process
+
+        if not is_async_callable(handler):
+            async def call_sync(connection: WSConnection, *args: typing.Any) -> typing.Any:
+                func = handler
+                if plan is not None:
+                    func = functools.partial(handler, **await plan.resolve(connection, *args[:1]))
+                result = await self.thread_offloader.run(func, connection, *args)
+                await self.send_handler_result(connection, result)
+                return result
+            return call_sync
+
+        if offload == 'thread':
+            async def call_in_thread(connection: WSConnection, *args: typing.Any) -> typing.Any:
+                func = handler
+                if plan is not None:
+                    func = functools.partial(handler, **await plan.resolve(connection, *args[:1]))
+                result = await self.thread_offloader.run_async(func, connection, *args)
+                await self.send_handler_result(connection, result)
+                return result
+            return call_in_thread
+
+        if offload is not None:
+            raise ValueError(f'Unsupported offload mode: {offload!r}')
+        if plan is not None:
+            async def call_with_dependencies(connection: WSConnection, *args: typing.Any) -> typing.Any:
+                return await handler(connection, *args, **await plan.resolve(connection, *args[:1]))
+            return call_with_dependencies
+        return handler
+
+    async def __run_stream(self,
+                           handler: Handler,
+                           connection: WSConnection,
+                           event_data: typing.Any,
+                           incoming: IncomingStream,
+                           size: int) -> None:
+        result = await self.process_offloader.run_stream(handler, event_data, incoming, size)
+        await self.send_handler_result(connection, result)
+
+    @staticmethod
+    async def send_handler_result(connection: WSConnection, result: typing.Any) -> None:
+        """
+        Send the value returned by an offloaded handler back to the client. Applies to every
+        handler running off the event loop: synchronous ones and both offload modes.
+
+        Parameters:
+        - connection (WSConnection): The connection to send the result to.
+        - result (Any): `None` sends nothing, `str` is sent as text, `bytes` as a binary frame,
+          pydantic models through `send_model` and anything else (events included) through `send_json`.
+        """
+        if result is None:
+            return
+        if isinstance(result, str):
+            await connection.send_text(result)
+        elif isinstance(result, (bytes, bytearray, memoryview)):
+            await connection.send_bytes(bytes(result))
+        elif isinstance(result, pydantic.BaseModel):
+            await connection.send_model(result)
+        else:
+            await connection.send_json(result)
+
     @staticmethod
     def validate_model(model: typing.Type[pydantic.BaseModel], data: dict):
         """
@@ -102,7 +327,14 @@ class EventRouter:
     def add_event(self,
                   event: str,
                   handler: Handler,
-                  validator: typing.Optional[typing.Type[pydantic.BaseModel]] = None
+                  validator: typing.Optional[typing.Type[pydantic.BaseModel]] = None,
+                  offload: Offload = None,
+                  dedupe: typing.Union[bool, Deduplicator] = False,
+                  timeout: typing.Optional[float] = None,
+                  priority: Priority = 'normal',
+                  cache: typing.Union[bool, ResponseCache] = False,
+                  cache_key: typing.Optional[typing.Sequence[str]] = None,
+                  stream: bool = False
                   ) -> None:
         """
         A method to register a WebSocket event handler by directly passing the event name and handler.
@@ -112,16 +344,34 @@ class EventRouter:
         event : str
             The event type to be registered (e.g., "registered", "message_sent").
         handler : Handler
-            The asynchronous handler function for the event.
+            The handler function for the event. Synchronous functions are run on the thread pool.
         validator : typing.Optional[typing.Type[pydantic.BaseModel]]
             A Pydantic model to validate the event data against.
+        offload : Offload
+            Set to 'thread' to run an async handler that wraps blocking code on the thread pool, or
+            'process' to call a picklable function as `handler(event_data)` in the process pool.
+        dedupe : typing.Union[bool, Deduplicator]
+            Set to True to answer events whose message id was already handled with the cached reply.
+        timeout : typing.Optional[float]
+            Seconds the handler may run before it is cancelled. Defaults to the router timeout.
+        priority : Priority
+            Set to 'low' for events that may be dropped while the application sheds load.
+        cache : typing.Union[bool, ResponseCache]
+            Set to True to memoize the replies of a read-only event by payload.
+        cache_key : typing.Optional[typing.Sequence[str]]
+            The payload fields the reply depends on. Defaults to the whole payload.
+        stream : bool
+            With offload='process', hand the binary stream announced by the event to the function
+            through shared memory. See `route`.
         """
+        call = self.__cached(event, self.build_call(handler, offload, dedupe, stream), cache, cache_key)
 
         async def wrapped_handler(connection: WSConnection,
                                   *args: typing.Any,
                                   **kwargs: typing.Any
                                   ) -> typing.Any:
-            return await handler(connection, *args, **kwargs)
+            return await call(connection, *args, **kwargs)
 
         # Register the event with the wrapped handler
-        self.events[event] = {'handler': wrapped_handler, 'validator': validator}
\ No newline at end of file
+        self.events[event] = {'handler': wrapped_handler, 'validator': validator, 'timeout': timeout,
+                              'priority': priority}
\ No newline at end of file
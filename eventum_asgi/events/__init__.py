@@ -1,3 +1,6 @@
 from eventum_asgi.events.base_event import Event
 from eventum_asgi.events.validation_error import EventValidationException
+from eventum_asgi.events.timeout_error import EventTimeoutException
 
+from eventum_asgi.events.typed_event import TypedEvent
+from eventum_asgi.events.frozen_event import FrozenEvent, cached_event
@@ -17,3 +17,9 @@ class Event:
         Convert the event to a JSON string.
         """
         return orjson.dumps(self.__dict__).decode('utf-8')
+
+    def to_json_bytes(self):
+        """
+        Convert the event to JSON bytes, without decoding them to a string.
+        """
+        return orjson.dumps(self.__dict__)
@@ -0,0 +1,101 @@
+import functools
+import typing
+import orjson
+from eventum_asgi.events.base_event import Event
+from eventum_asgi.events.typed_event import TypedEvent
+
+
+class FrozenEvent:
+    """
+    Immutable event serialized once, when it is defined.
+
+    Use it for constant server events (errors, acks, heartbeats): every send reuses the cached
+    JSON instead of serializing the same payload again.
+
+        RATE_LIMITED = FrozenEvent(event='rate_limited', message='Slow down')
+        await connection.send_text(RATE_LIMITED)
+    """
+    __slots__ = ('_data', '_json_bytes', '_json')
+
+    def __init__(self,
+                 source: typing.Union[Event, TypedEvent, typing.Mapping[str, typing.Any], None] = None,
+                 **fields: typing.Any):
+        """
+        Serialize the event.
+
+        Parameters:
+        - source (Union[Event, TypedEvent, Mapping, None]): The event or mapping to freeze.
+        - fields (Any): Fields of the event, merged over the ones of `source`.
+        """
+        if isinstance(source, TypedEvent):
+            data = source.to_dict()
+        elif isinstance(source, Event):
+            data = dict(source.__dict__)
+        else:
+            data = dict(source or {})
+        data.update(fields)
+        json_bytes = orjson.dumps(data)
+        object.__setattr__(self, '_data', data)
+        object.__setattr__(self, '_json_bytes', json_bytes)
+        object.__setattr__(self, '_json', json_bytes.decode('utf-8'))
+
+    def __getattr__(self, name: str) -> typing.Any:
+        try:
+            return self._data[name]
+        except KeyError:
+            raise AttributeError(f"'{self.__class__.__name__}' object has no attribute '{name}'") from None
+
+    def __setattr__(self, name: str, value: typing.Any) -> None:
+        raise AttributeError(f"'{self.__class__.__name__}' object is immutable")
+
+    def __eq__(self, other: typing.Any) -> bool:
+        return isinstance(other, FrozenEvent) and self._json_bytes == other._json_bytes
+
+    def __hash__(self) -> int:
+        return hash(self._json_bytes)
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({self._json})'
+
+    def to_dict(self) -> typing.Dict[str, typing.Any]:
+        """
+        Get a copy of the event fields.
+        """
+        return dict(self._data)
+
+    def to_json(self) -> str:
+        """
+        Get the cached JSON string.
+        """
+        return self._json
+
+    def to_json_bytes(self) -> bytes:
+        """
+        Get the cached JSON bytes.
+        """
+        return self._json_bytes
+
+
+def cached_event(maxsize: typing.Optional[int] = 128
+                 ) -> typing.Callable[[typing.Callable[..., typing.Any]], typing.Callable[..., FrozenEvent]]:
+    """
+    Decorator memoizing an event factory whose arguments come from a small key space.
+
+    The factory returns an `Event`, a `TypedEvent` or a mapping; the decorated function returns
+    the corresponding `FrozenEvent`, serialized on the first call with given (hashable) arguments
+    and served from an LRU of `maxsize` entries afterwards.
+
+        @cached_event(maxsize=64)
+        def room_full(room: str):
+            return Event(event='room_full', room=room)
+
+    Parameters:
+    - maxsize (Optional[int]): Size of the LRU, or None for an unbounded cache.
+    """
+    def decorator(factory: typing.Callable[..., typing.Any]) -> typing.Callable[..., FrozenEvent]:
+        @functools.lru_cache(maxsize=maxsize)
+        @functools.wraps(factory)
+        def frozen_factory(*args: typing.Any, **kwargs: typing.Any) -> FrozenEvent:
+            return FrozenEvent(factory(*args, **kwargs))
+        return frozen_factory
+    return decorator
@@ -0,0 +1,14 @@
+from eventum_asgi.events.base_event import Event
+
+
+class EventTimeoutException(Event):
+    def __init__(self,
+                 event: str = 'timeout_error',
+                 message: str = 'Event handling timed out',
+                 **kwargs):
+        """
+        Initialize the event with the given keyword arguments.
+        """
+        self.event = event
+        self.message = message
+        super().__init__(**kwargs)
@@ -2,4 +2,6 @@ from eventum_asgi.exceptions.disconnect import DisconnectedException
 from eventum_asgi.exceptions.required_headers_missing import RequiredHeadersMissingException
 from eventum_asgi.exceptions.route_not_found import HttpNotFoundException
 from eventum_asgi.exceptions.http_exception import HttpException
-
+from eventum_asgi.exceptions.unauthorized import HttpUnauthorizedException
+from eventum_asgi.exceptions.stream import StreamAbortedException
+from eventum_asgi.exceptions.timeout import HandlerTimeoutException
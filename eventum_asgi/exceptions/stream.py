@@ -0,0 +1,10 @@
+class StreamAbortedException(Exception):
+    """
+    Exception raised when a binary stream is aborted before its end.
+    """
+    def __init__(self, stream_id, reason='Stream aborted'):
+        """
+        Initialize the exception with the given stream ID and reason.
+        """
+        self.stream_id = stream_id
+        super().__init__(f'Stream {stream_id}: {reason}')
@@ -0,0 +1,11 @@
+class HandlerTimeoutException(Exception):
+    """
+    Exception raised when an event handler runs past its timeout and is cancelled.
+    """
+    def __init__(self, event, timeout):
+        """
+        Initialize the exception with the given event name and timeout.
+        """
+        self.event = event
+        self.timeout = timeout
+        super().__init__(f'Handler of event {event!r} timed out after {timeout}s')
@@ -0,0 +1,15 @@
+from eventum_asgi.exceptions.http_exception import HttpException
+from eventum_asgi.models.headers import Headers
+
+
+class HttpUnauthorizedException(HttpException):
+    """
+    Exception raised when a handshake carries no valid credentials.
+    """
+    def __init__(self, code: int = 401,
+                 headers: Headers = Headers(),
+                 body: bytes = b'Unauthorized'):
+        """
+        Initialize the exception with the given status code, headers, and body.
+        """
+        super().__init__(code, headers, body)
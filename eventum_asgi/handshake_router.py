@@ -1,13 +1,22 @@
 import functools
 import typing
 from eventum_asgi.connection import WSConnection
+from eventum_asgi.dependencies import DependencyInjector
 from eventum_asgi.exceptions import RequiredHeadersMissingException, HttpNotFoundException
 from eventum_asgi.types import HandshakeRoutesDict, Handler
 
 
 class HandshakeRouter:
-    def __init__(self):
+    def __init__(self, injector: typing.Optional[DependencyInjector] = None):
+        """
+        Initialize the handshake router.
+
+        Parameters:
+        - injector (Optional[DependencyInjector]): Builds the dependency plans of the handlers and
+          holds the application-scoped dependency cache.
+        """
         self.routes: HandshakeRoutesDict = {}
+        self.injector = injector if injector is not None else DependencyInjector()
 
     async def __call__(self, connection: WSConnection) -> None:
         """
@@ -49,6 +58,8 @@ class HandshakeRouter:
         """
 
         def decorator(func: Handler) -> Handler:
+            call = self.build_call(func)
+
             @functools.wraps(func)
             async def wrapped_handler(connection: WSConnection,
                                       *args: typing.Any,
@@ -72,7 +83,7 @@ class HandshakeRouter:
                 Any
                     The result of the asynchronous handler function.
                 """
-                return await func(connection, *args, **kwargs)
+                return await call(connection, *args, **kwargs)
 
             # Register the route with the wrapped handler
             self.routes[path] = {'handler': wrapped_handler, 
@@ -82,6 +93,25 @@ class HandshakeRouter:
 
         return decorator
 
+    def build_call(self, handler: Handler) -> Handler:
+        """
+        Build the coroutine function used to invoke a handler, resolving its
+        dependencies from a plan computed once at registration.
+
+        Parameters:
+        - handler (Handler): The handler being registered.
+
+        Returns:
+        - Handler: An async callable taking the same arguments as the handler.
+        """
+        plan = self.injector.build_plan(handler)
+        if plan is None:
+            return handler
+
+        async def call_with_dependencies(connection: WSConnection, *args: typing.Any) -> typing.Any:
+            return await handler(connection, *args, **await plan.resolve(connection))
+        return call_with_dependencies
+
     def add_route(self,
                   path: str,
                   handler: Handler,
@@ -100,11 +130,13 @@ class HandshakeRouter:
             A list of required headers that must be present in the connection request.
         """
 
+        call = self.build_call(handler)
+
         async def wrapped_handler(connection: WSConnection,
                                   *args: typing.Any,
                                   **kwargs: typing.Any
                                   ) -> typing.Any:
-            return await handler(connection, *args, **kwargs)
+            return await call(connection, *args, **kwargs)
 
         # Register the route with the wrapped handler
         self.routes[path] = {'handler': wrapped_handler, "required_headers": required_headers}
\ No newline at end of file
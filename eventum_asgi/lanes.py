@@ -0,0 +1,155 @@
+import asyncio
+import typing
+from eventum_asgi.types import Send, Priority
+
+
+class OutboundLanes:
+    """
+    Bounded outbound queues of one connection, drained by a single writer task.
+
+    Before every frame, the writer takes the oldest high-priority frame if there is one, so a
+    high-priority frame never waits for more than the frame being written. Otherwise the normal
+    and low lanes are served in weighted round-robin. A sender waits when its lane is full.
+
+    If writing a frame fails, or the lanes are closed, the queued frames are dropped and the
+    error is raised to every sender, including those waiting for room in a full lane.
+    """
+    priorities: typing.Tuple[Priority, ...] = ('high', 'normal', 'low')
+
+    def __init__(self,
+                 send: Send,
+                 capacity: int = 256,
+                 weights: typing.Optional[typing.Dict[str, int]] = None):
+        """
+        Initialize the lanes and start the writer task.
+
+        Parameters:
+        - send (Send): The ASGI send callable the frames are written to.
+        - capacity (int): Maximum number of frames queued per lane.
+        - weights (Optional[Dict[str, int]]): Frames of the normal and low lanes written per
+          round. Defaults to `{'normal': 4, 'low': 1}`.
+        """
+        weights = weights or {'normal': 4, 'low': 1}
+        self.queues: typing.Dict[str, asyncio.Queue] = {
+            priority: asyncio.Queue(maxsize=capacity) for priority in self.priorities
+        }
+        self.error: typing.Optional[BaseException] = None
+        self.__send = send
+        self.__rounds: typing.Tuple[str, ...] = ('normal',) * weights['normal'] + ('low',) * weights['low']
+        self.__turn = 0
+        self.__wakeup = asyncio.Event()
+        self.__idle = asyncio.Event()
+        self.__writer = asyncio.ensure_future(self.__write())
+
+    async def put(self, message: typing.Dict[str, typing.Any], priority: Priority = 'normal') -> None:
+        """
+        Queue a frame, waiting while its lane is full.
+
+        Parameters:
+        - message (Dict[str, Any]): The ASGI message.
+        - priority (Priority): The lane.
+
+        Raises:
+        - Exception: The error that stopped the writer, if the connection failed or the lanes
+          were closed.
+        """
+        if self.error is not None:
+            raise self.error
+        await self.queues[priority].put(message)
+        if self.error is not None:
+            self.__discard()
+            raise self.error
+        self.__idle.clear()
+        self.__wakeup.set()
+
+    def put_nowait(self, message: typing.Dict[str, typing.Any], priority: Priority = 'normal') -> None:
+        """
+        Queue a frame without waiting.
+
+        Parameters:
+        - message (Dict[str, Any]): The ASGI message.
+        - priority (Priority): The lane.
+
+        Raises:
+        - asyncio.QueueFull: If the lane is full.
+        - Exception: The error that stopped the writer, if the connection failed or the lanes
+          were closed.
+        """
+        if self.error is not None:
+            raise self.error
+        self.queues[priority].put_nowait(message)
+        self.__idle.clear()
+        self.__wakeup.set()
+
+    async def send(self, message: typing.Dict[str, typing.Any]) -> None:
+        """
+        Queue a frame on the normal lane. Replaces `connection.send` while the lanes are enabled.
+        """
+        await self.put(message, 'normal')
+
+    async def flush(self) -> None:
+        """
+        Wait until every queued frame was written.
+
+        Raises:
+        - Exception: The error that stopped the writer, if the connection failed or the lanes
+          were closed.
+        """
+        if self.error is None:
+            await self.__idle.wait()
+        if self.error is not None:
+            raise self.error
+
+    def depths(self) -> typing.Dict[str, int]:
+        """
+        Get the number of frames queued per lane.
+        """
+        return {priority: queue.qsize() for priority, queue in self.queues.items()}
+
+    def close(self, error: typing.Optional[BaseException] = None) -> None:
+        """
+        Stop the writer, dropping the queued frames.
+
+        Parameters:
+        - error (Optional[BaseException]): The error raised to senders from now on.
+        """
+        self.__writer.cancel()
+        self.__fail(error if error is not None else RuntimeError('The outbound lanes are closed'))
+
+    def __fail(self, error: BaseException) -> None:
+        if self.error is None:
+            self.error = error
+        self.__discard()
+        self.__idle.set()
+
+    def __discard(self) -> None:
+        # Emptying the queues wakes the senders waiting for room, which then see the error.
+        for queue in self.queues.values():
+            while not queue.empty():
+                queue.get_nowait()
+
+    def __next(self) -> typing.Optional[typing.Dict[str, typing.Any]]:
+        high = self.queues['high']
+        if not high.empty():
+            return high.get_nowait()
+        for _ in range(len(self.__rounds)):
+            queue = self.queues[self.__rounds[self.__turn]]
+            self.__turn = (self.__turn + 1) % len(self.__rounds)
+            if not queue.empty():
+                return queue.get_nowait()
+        return None
+
+    async def __write(self) -> None:
+        try:
+            while True:
+                message = self.__next()
+                if message is None:
+                    self.__idle.set()
+                    self.__wakeup.clear()
+                    await self.__wakeup.wait()
+                    continue
+                await self.__send(message)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.__fail(e)
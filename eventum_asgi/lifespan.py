@@ -1,15 +1,59 @@
-from typing import Callable, Any, Literal
-from eventum_asgi.types import Scope, Receive, Send
+import asyncio
+import inspect
+import time
+import traceback
+from typing import Callable, Any, Literal, List, Optional, Dict, Tuple, Mapping, AsyncContextManager, TYPE_CHECKING
+from eventum_asgi.state import State
+from eventum_asgi.types import Scope, Receive, Send, LifespanResource
+
+if TYPE_CHECKING:
+    from eventum_asgi.drain import ConnectionDrainer
+
+LifespanContext = Callable[[Any], AsyncContextManager[Optional[Mapping[str, Any]]]]
+"""
+Factory called with the application and returning an async context manager. The code before its
+`yield` runs on startup, the code after it on shutdown; a mapping yielded by it is merged into
+`app.state` and into the ASGI lifespan state copied into every connection.
+"""
 
 
 class Lifespan:
-    def __init__(self):
+    def __init__(self,
+                 drainer: Optional['ConnectionDrainer'] = None,
+                 context: Optional[LifespanContext] = None,
+                 state: Optional[State] = None):
+        """
+        Initializes the Lifespan instance with empty lists of startup and shutdown
+        handlers and managed resources.
+
+        Args:
+            drainer (ConnectionDrainer, optional): Drain phase run first on 'lifespan.shutdown',
+                before the shutdown handlers and the resources are released.
+            context (LifespanContext, optional): An async-context-manager lifespan entered after the
+                resources are started and exited after the shutdown handlers ran.
+            state (State, optional): The application state updated with the values yielded by `context`.
+        """
+        self.startup_handlers: List[Tuple[Callable[..., Any], bool]] = []
+        self.shutdown_handlers: List[Tuple[Callable[..., Any], bool]] = []
+        self.resources: List[LifespanResource] = []
+        self.drainer = drainer
+        self.context = context
+        self.state = state if state is not None else State()
+        self.timings: Dict[str, float] = {}
+        self.__context_manager: Optional[AsyncContextManager] = None
+        self.__started: List[LifespanResource] = []
+
+    def add_resource(self, resource: LifespanResource) -> None:
         """
-        Initializes the Lifespan instance, setting on_startup and on_shutdown
-        handlers to None.
+        Register a resource managed by the application lifespan.
+
+        Resources are started in registration order before the startup handlers run,
+        and shut down in reverse order after the shutdown handlers ran.
+
+        Args:
+            resource (LifespanResource): An object with async `startup()` and `shutdown()` methods.
         """
-        self.on_startup = None
-        self.on_shutdown = None
+        self.resources.append(resource)
 
     async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """
@@ -17,6 +61,9 @@ class Lifespan:
         events. This method is intended to be called with the scope, receive, and send
         arguments as per the ASGI specification.
 
+        A failing startup is reported with 'lifespan.startup.failed' and a failing shutdown
+        with 'lifespan.shutdown.failed'.
+
         Args:
             scope (dict): The ASGI connection scope.
             receive (callable): An awaitable callable to receive messages.
@@ -29,31 +76,171 @@ class Lifespan:
         while True:
             message = await receive()
             if message['type'] == 'lifespan.startup':
-                if self.on_startup:
-                    await self.on_startup()
+                try:
+                    await self.startup(scope)
+                except BaseException as e:
+                    traceback.print_exception(e)
+                    await send({'type': 'lifespan.startup.failed', 'message': repr(e)})
+                    raise
                 await send({'type': 'lifespan.startup.complete'})
             elif message['type'] == 'lifespan.shutdown':
-                if self.on_shutdown:
-                    await self.on_shutdown()
+                try:
+                    await self.shutdown()
+                except BaseException as e:
+                    traceback.print_exception(e)
+                    await send({'type': 'lifespan.shutdown.failed', 'message': repr(e)})
+                    raise
                 await send({'type': 'lifespan.shutdown.complete'})
                 return
 
+    async def startup(self, scope: Optional[Scope] = None) -> None:
+        """
+        Start the resources, enter the context lifespan and run the startup handlers,
+        recording the duration of each step in `timings`. If a step fails, the context lifespan
+        is exited and the resources already started are shut down before the error is raised.
+
+        Args:
+            scope (dict, optional): The ASGI lifespan scope. Its 'app' is passed to the context
+                lifespan and its 'state' receives the values yielded by it.
+        """
+        scope = scope if scope is not None else {}
+        self.timings.clear()
+        if self.drainer is not None:
+            self.drainer.resume()
+        try:
+            for resource in self.resources:
+                await self.__timed(f'resource:{type(resource).__name__}', resource.startup)
+                self.__started.append(resource)
+            if self.context is not None:
+                context_manager = self.context(scope.get('app'))
+                values = await self.__timed('context', context_manager.__aenter__)
+                self.__context_manager = context_manager
+                if values:
+                    self.state.update(values)
+                    if scope.get('state') is not None:
+                        scope['state'].update(values)
+            await self.__run_handlers(self.startup_handlers, record=True)
+        except BaseException as e:
+            await self.__unwind(e)
+            raise
+
+    async def shutdown(self) -> None:
+        """
+        Drain the connections, run the shutdown handlers, exit the context lifespan
+        and shut the resources down in reverse order.
+
+        The context lifespan is exited and the resources are shut down even if the drain or a
+        shutdown handler fails. That error is raised once they are released, and errors raised
+        while releasing them are printed.
+        """
+        try:
+            if self.drainer is not None:
+                await self.drainer.drain()
+            await self.__run_handlers(self.shutdown_handlers, record=False)
+        except BaseException:
+            try:
+                await self.__exit_context()
+            except BaseException as e:
+                traceback.print_exception(e)
+            try:
+                await self.__shutdown_resources()
+            except BaseException as e:
+                traceback.print_exception(e)
+            raise
+        try:
+            await self.__exit_context()
+        finally:
+            await self.__shutdown_resources()
+
+    async def __exit_context(self) -> None:
+        if self.__context_manager is not None:
+            context_manager, self.__context_manager = self.__context_manager, None
+            await context_manager.__aexit__(None, None, None)
+
+    async def __unwind(self, error: BaseException) -> None:
+        """
+        Undo a failed startup: exit the context lifespan if it was entered and shut the started
+        resources down. Errors raised meanwhile are printed so that `error` is the one reported.
+        """
+        if self.__context_manager is not None:
+            context_manager, self.__context_manager = self.__context_manager, None
+            try:
+                await context_manager.__aexit__(type(error), error, error.__traceback__)
+            except BaseException as e:
+                if e is not error:
+                    traceback.print_exception(e)
+        try:
+            await self.__shutdown_resources()
+        except BaseException as e:
+            traceback.print_exception(e)
+
+    async def __shutdown_resources(self) -> None:
+        """
+        Shut the started resources down in reverse order. A failing resource does not keep the
+        others running: the first error is raised once every resource was shut down.
+        """
+        started, self.__started = self.__started, []
+        error: Optional[BaseException] = None
+        for resource in reversed(started):
+            try:
+                await resource.shutdown()
+            except BaseException as e:
+                if error is None:
+                    error = e
+                else:
+                    traceback.print_exception(e)
+        if error is not None:
+            raise error
+
+    async def __run_handlers(self, handlers: List[Tuple[Callable[..., Any], bool]], record: bool) -> None:
+        """
+        Run handlers in registration order. Consecutive handlers registered with
+        `concurrent=True` are independent of each other and run together.
+        """
+        group: List[Callable[..., Any]] = []
+        for func, concurrent in handlers + [(None, False)]:
+            if concurrent:
+                group.append(func)
+                continue
+            if group:
+                await asyncio.gather(*(self.__timed(self.__name(f), f, record) for f in group))
+                group = []
+            if func is not None:
+                await self.__timed(self.__name(func), func, record)
+
+    async def __timed(self, name: str, func: Callable[..., Any], record: bool = True) -> Any:
+        start = time.perf_counter()
+        result = func()
+        if inspect.isawaitable(result):
+            result = await result
+        if record:
+            self.timings[name] = time.perf_counter() - start
+        return result
+
+    @staticmethod
+    def __name(func: Callable[..., Any]) -> str:
+        return f'{getattr(func, "__module__", "")}.{getattr(func, "__qualname__", repr(func))}'
+
     def on_event(self,
-                 event_type: Literal['startup', 'shutdown']
+                 event_type: Literal['startup', 'shutdown'],
+                 concurrent: bool = False
                  ) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
         """
         Decorator to register a function as a handler for a specified lifecycle event.
+        Any number of handlers can be registered per event; they run in registration order.
 
         Args:
             event_type (str): The type of event to handle. Expected values are
                               'startup' or 'shutdown'.
+            concurrent (bool): Declare the handler independent of its neighbours, so it runs
+                               concurrently with the adjacent handlers that are also concurrent.
 
         Returns:
             Callable: A decorator that registers the given function as an event handler.
         """
         def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
             """
-            Registers the given function as the handler for the specified event type.
+            Registers the given function as a handler for the specified event type.
 
             Args:
                 func (callable): The function to register as an event handler.
@@ -62,9 +249,10 @@ class Lifespan:
                 callable: The original function, unmodified.
             """
             if event_type == 'startup':
-                self.on_startup = func
+                self.startup_handlers.append((func, concurrent))
             elif event_type == 'shutdown':
-                self.on_shutdown = func
+                self.shutdown_handlers.append((func, concurrent))
+            else:
+                raise ValueError(f'Unknown lifespan event type: {event_type!r}')
             return func
         return decorator
-    
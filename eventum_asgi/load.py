@@ -0,0 +1,105 @@
+import asyncio
+import typing
+from eventum_asgi.metrics import Metrics
+
+
+class LoopMonitor:
+    """
+    Event loop lag sampler deciding when the application sheds load.
+
+    Every `interval` seconds a `call_later` callback measures how late it runs: with a saturated
+    loop, callbacks wait behind ready tasks and the delay is the lag every socket experiences.
+    The lag is smoothed with an exponential moving average. Shedding starts when the smoothed lag
+    exceeds `shed_lag` and stops only once it falls below `recover_lag`, so the application does
+    not flap around a single threshold. While shedding, admission control rejects new handshakes,
+    the event router drops events of routes registered with `priority='low'` and fan-outs
+    (presence diffs, scheduler pushes) are spaced `broadcast_slowdown` times further apart.
+    """
+    def __init__(self,
+                 interval: float = 0.1,
+                 shed_lag: typing.Optional[float] = None,
+                 recover_lag: typing.Optional[float] = None,
+                 smoothing: float = 0.3,
+                 broadcast_slowdown: float = 4.0,
+                 metrics: typing.Optional[Metrics] = None):
+        """
+        Initialize the monitor. It samples once started by the lifespan.
+
+        Parameters:
+        - interval (float): Seconds between two samples.
+        - shed_lag (Optional[float]): Smoothed lag in seconds above which load is shed. None only
+          measures the lag.
+        - recover_lag (Optional[float]): Smoothed lag in seconds below which shedding stops.
+          Defaults to half of `shed_lag`.
+        - smoothing (float): Weight of the latest sample in the moving average, between 0 and 1.
+        - broadcast_slowdown (float): Factor applied to fan-out intervals while shedding.
+        - metrics (Optional[Metrics]): Registry receiving the lag gauges and the shedding counters.
+        """
+        self.interval = interval
+        self.shed_lag = shed_lag
+        self.recover_lag = recover_lag if recover_lag is not None else (shed_lag / 2 if shed_lag is not None else None)
+        self.smoothing = smoothing
+        self.broadcast_slowdown = broadcast_slowdown
+        self.metrics = metrics
+        self.lag = 0.0
+        self.max_lag = 0.0
+        self.shedding = False
+        self.__expected = 0.0
+        self.__handle: typing.Optional[asyncio.TimerHandle] = None
+        if metrics is not None:
+            metrics.register_gauge('load.lag', lambda: self.lag)
+            metrics.register_gauge('load.lag_max', lambda: self.max_lag)
+            metrics.register_gauge('load.shedding', lambda: self.shedding)
+
+    @property
+    def broadcast_factor(self) -> float:
+        """
+        Factor fan-out intervals are multiplied by: `broadcast_slowdown` while shedding, else 1.
+        """
+        return self.broadcast_slowdown if self.shedding else 1.0
+
+    def record(self, lag: float) -> None:
+        """
+        Add a lag sample and update the shedding state.
+
+        Parameters:
+        - lag (float): How late the sampling callback ran, in seconds.
+        """
+        self.lag += self.smoothing * (lag - self.lag)
+        self.max_lag = max(self.max_lag, lag)
+        if self.shed_lag is None:
+            return
+        if not self.shedding and self.lag > self.shed_lag:
+            self.shedding = True
+            self.count('load.shed_periods')
+        elif self.shedding and self.lag < self.recover_lag:
+            self.shedding = False
+
+    def count(self, name: str, value: int = 1) -> None:
+        """
+        Increment a shedding counter, e.g. `load.events_dropped`.
+        """
+        if self.metrics is not None:
+            self.metrics.increment(name, value)
+
+    async def startup(self) -> None:
+        """
+        Start sampling.
+        """
+        self.__schedule(asyncio.get_running_loop())
+
+    async def shutdown(self) -> None:
+        """
+        Stop sampling.
+        """
+        if self.__handle is not None:
+            self.__handle.cancel()
+            self.__handle = None
+
+    def __schedule(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.__expected = loop.time() + self.interval
+        self.__handle = loop.call_later(self.interval, self.__sample, loop)
+
+    def __sample(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.record(max(0.0, loop.time() - self.__expected))
+        self.__schedule(loop)
@@ -0,0 +1,49 @@
+import typing
+
+
+class Metrics:
+    """
+    Registry of counters and gauges exposed by the application.
+
+    Counters are plain integers incremented on the hot path. Gauges are callables registered by
+    components (thread pool, event loop, ...) and evaluated only when a snapshot is taken, so
+    reporting costs nothing until somebody scrapes the metrics.
+    """
+    def __init__(self):
+        """
+        Initialize an empty registry.
+        """
+        self.counters: typing.Dict[str, int] = {}
+        self.__gauges: typing.Dict[str, typing.Callable[[], typing.Any]] = {}
+
+    def increment(self, name: str, value: int = 1) -> None:
+        """
+        Increment the counter `name` by `value`.
+
+        Parameters:
+        - name (str): The counter name.
+        - value (int): The amount to add. Defaults to 1.
+        """
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def register_gauge(self, name: str, func: typing.Callable[[], typing.Any]) -> None:
+        """
+        Register a gauge evaluated lazily on every snapshot.
+
+        Parameters:
+        - name (str): The gauge name.
+        - func (Callable[[], Any]): A callable returning the current value of the gauge.
+        """
+        self.__gauges[name] = func
+
+    def snapshot(self) -> typing.Dict[str, typing.Any]:
+        """
+        Get the current value of every counter and gauge.
+
+        Returns:
+        - Dict[str, Any]: A new dictionary mapping metric names to values.
+        """
+        snapshot: typing.Dict[str, typing.Any] = dict(self.counters)
+        for name, func in self.__gauges.items():
+            snapshot[name] = func()
+        return snapshot
@@ -0,0 +1,54 @@
+from typing import Any, Union, Optional, Collection
+from eventum_asgi.auth import HandshakeAuthenticator
+from eventum_asgi.connection import WSConnection
+from eventum_asgi.exceptions import HttpUnauthorizedException
+from eventum_asgi.middleware import CallNext, MiddlewareClass
+from eventum_asgi.middleware.exceptions_middleware import ExceptionMiddleware
+
+
+class HandshakeAuthMiddleware(MiddlewareClass):
+    """
+    Middleware authenticating every handshake with a `HandshakeAuthenticator` before routing.
+
+    Handshakes without a valid token are answered with HTTP 401; the others reach the router
+    with the principal stored in the connection flags.
+    """
+
+    def __init__(self, call_next: Union[CallNext[WSConnection], MiddlewareClass[WSConnection]],
+                 authenticator: HandshakeAuthenticator,
+                 paths: Optional[Collection[str]] = None,
+                 *args: Any, **kwargs: Any):
+        """
+        Initialize the HandshakeAuthMiddleware.
+
+        Parameters
+        ----------
+        call_next : Union[CallNext[WSConnection], MiddlewareClass[WSConnection]]
+            The next callable or middleware class in the chain.
+
+        authenticator : HandshakeAuthenticator
+            Resolves and caches the principal of the handshake token.
+
+        paths : Optional[Collection[str]]
+            The paths requiring authentication. Every path does if omitted.
+        """
+        self.call_next = call_next
+        self.authenticator = authenticator
+        self.paths = frozenset(paths) if paths is not None else None
+
+    async def __call__(self, connection: WSConnection) -> None:
+        """
+        Authenticate the connection, then pass it to the next middleware in the chain.
+
+        Parameters
+        ----------
+        connection : WSConnection
+            The WebSocket connection to be processed.
+        """
+        if self.paths is None or connection.path in self.paths:
+            try:
+                await self.authenticator(connection)
+            except HttpUnauthorizedException as e:
+                await ExceptionMiddleware.handle_exc(exception=e, connection=connection)
+                return
+        await self.call_next(connection)
@@ -0,0 +1,40 @@
+import typing
+from eventum_asgi.capture import TrafficCapture
+from eventum_asgi.connection import WSConnection
+from eventum_asgi.middleware import CallNext, MiddlewareClass
+
+
+class CaptureMiddleware(MiddlewareClass):
+    """
+    Middleware recording the traffic of the connections sampled by a `TrafficCapture`.
+    """
+
+    def __init__(self, call_next: typing.Union[CallNext[WSConnection], MiddlewareClass[WSConnection]],
+                 capture: TrafficCapture,
+                 *args: typing.Any, **kwargs: typing.Any):
+        """
+        Initialize the CaptureMiddleware.
+
+        Parameters
+        ----------
+        call_next : Union[CallNext[WSConnection], MiddlewareClass[WSConnection]]
+            The next callable or middleware class in the chain.
+
+        capture : TrafficCapture
+            The log the sampled connections are recorded to.
+        """
+        self.call_next = call_next
+        self.capture = capture
+
+    async def __call__(self, connection: WSConnection) -> None:
+        """
+        Record the handshake of a sampled connection, then pass it to the next middleware in the chain.
+
+        Parameters
+        ----------
+        connection : WSConnection
+            The WebSocket connection to be processed.
+        """
+        if self.capture.sample():
+            self.capture.record_handshake(connection)
+        await self.call_next(connection)
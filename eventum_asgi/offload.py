@@ -0,0 +1,434 @@
+import asyncio
+import contextvars
+import functools
+import inspect
+import multiprocessing
+import os
+import threading
+import typing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from multiprocessing import shared_memory
+from eventum_asgi.metrics import Metrics
+
+if typing.TYPE_CHECKING:
+    from eventum_asgi.streams import IncomingStream
+
+T = typing.TypeVar('T')
+
+
+def is_async_callable(obj: typing.Any) -> bool:
+    """
+    Check whether calling `obj` returns an awaitable, looking through `functools.partial`
+    and callable instances with an `async def __call__`.
+    """
+    while isinstance(obj, functools.partial):
+        obj = obj.func
+    return inspect.iscoroutinefunction(obj) or (
+        callable(obj) and inspect.iscoroutinefunction(getattr(obj, '__call__', None))
+    )
+
+
+class ThreadConnectionProxy:
+    """
+    Connection wrapper handed to async handlers that run on a worker thread.
+
+    Attribute access is forwarded to the real connection. Coroutine methods (`send_text`, `close`,
+    the raw ASGI `send`, ...) are scheduled on the application's event loop, which owns the
+    socket, and awaited from the worker thread's own loop.
+    """
+    def __init__(self, connection: typing.Any, loop: asyncio.AbstractEventLoop):
+        """
+        Initialize the proxy.
+
+        Parameters:
+        - connection (WSConnection): The connection living on the application's event loop.
+        - loop (asyncio.AbstractEventLoop): The application's event loop.
+        """
+        self.__connection = connection
+        self.__loop = loop
+
+    def __getattr__(self, name: str) -> typing.Any:
+        value = getattr(self.__connection, name)
+        if not is_async_callable(value):
+            return value
+        loop = self.__loop
+
+        async def bridge(*args: typing.Any, **kwargs: typing.Any) -> typing.Any:
+            future = asyncio.run_coroutine_threadsafe(value(*args, **kwargs), loop)
+            return await asyncio.wrap_future(future)
+
+        return bridge
+
+
+class ThreadOffloader:
+    """
+    Bounded thread pool running synchronous and blocking event handlers off the event loop.
+
+    At most `max_workers` calls run at once and at most `max_pending` more wait in the executor's
+    queue. Further callers wait on an asyncio semaphore, so a flood of blocking events applies
+    backpressure to their own connections instead of growing an unbounded queue.
+    """
+    def __init__(self,
+                 max_workers: typing.Optional[int] = None,
+                 max_pending: typing.Optional[int] = None,
+                 metrics: typing.Optional[Metrics] = None
+                 ) -> None:
+        """
+        Initialize the offloader. The executor and the admission semaphore are created on
+        startup or on first use, inside the running event loop. Once shut down, the offloader
+        rejects calls until it is started again.
+
+        Parameters:
+        - max_workers (Optional[int]): Number of worker threads.
+          Defaults to `min(32, os.cpu_count() + 4)`, like `ThreadPoolExecutor`.
+        - max_pending (Optional[int]): Number of calls allowed to queue for a free worker.
+          Defaults to `max_workers`.
+        - metrics (Optional[Metrics]): Registry receiving the pool saturation gauges.
+        """
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+        self.max_pending = self.max_workers if max_pending is None else max_pending
+        self.__executor: typing.Optional[ThreadPoolExecutor] = None
+        self.__slots: typing.Optional[asyncio.Semaphore] = None
+        self.__closed = False
+        self.__lock = threading.Lock()
+        self.__local = threading.local()
+        self.__thread_loops: typing.List[asyncio.AbstractEventLoop] = []
+        self.__active = 0
+        self.__submitted = 0
+        self.__waiting = 0
+        self.__completed = 0
+        if metrics is not None:
+            metrics.register_gauge('thread_pool.max_workers', lambda: self.max_workers)
+            metrics.register_gauge('thread_pool.active', lambda: self.active)
+            metrics.register_gauge('thread_pool.queued', lambda: self.queued)
+            metrics.register_gauge('thread_pool.waiting', lambda: self.__waiting)
+            metrics.register_gauge('thread_pool.completed', lambda: self.__completed)
+            metrics.register_gauge('thread_pool.saturation', lambda: self.saturation)
+
+    @property
+    def active(self) -> int:
+        """
+        Number of calls currently running on a worker thread.
+        """
+        return self.__active
+
+    @property
+    def queued(self) -> int:
+        """
+        Number of calls submitted to the executor and waiting for a free worker.
+        """
+        return self.__submitted - self.__active
+
+    @property
+    def saturation(self) -> float:
+        """
+        Ratio of busy workers, from 0.0 (idle) to 1.0 (every worker busy).
+        """
+        return self.__active / self.max_workers
+
+    async def run(self, func: typing.Callable[..., T], *args: typing.Any) -> T:
+        """
+        Run a synchronous callable on the pool and await its result.
+
+        Parameters:
+        - func (Callable[..., T]): The callable to run.
+        - args (Any): Positional arguments passed to the callable.
+
+        Returns:
+        - T: The value returned by the callable.
+
+        Raises:
+        - RuntimeError: If the offloader is shut down, including while the call waited for a slot.
+        """
+        if self.__slots is None and not self.__closed:
+            await self.startup()
+        self.__check_open()
+        slots = self.__slots
+        self.__waiting += 1
+        async with slots:
+            self.__waiting -= 1
+            self.__check_open()
+            self.__submitted += 1
+            try:
+                loop = asyncio.get_running_loop()
+                context = contextvars.copy_context()
+                call = functools.partial(context.run, self.__tracked, func, *args)
+                return await loop.run_in_executor(self.__get_executor(), call)
+            finally:
+                self.__submitted -= 1
+                self.__completed += 1
+
+    async def run_async(self,
+                        handler: typing.Callable[..., typing.Awaitable[T]],
+                        connection: typing.Any,
+                        *args: typing.Any
+                        ) -> T:
+        """
+        Run an async handler that wraps blocking code on a worker thread's private event loop.
+
+        The handler receives a `ThreadConnectionProxy` whose coroutine methods execute on the
+        application's event loop, so sending from the handler stays safe.
+
+        Parameters:
+        - handler (Callable[..., Awaitable[T]]): The async handler to run.
+        - connection (WSConnection): The connection passed to the handler through the proxy.
+        - args (Any): Additional positional arguments passed to the handler.
+
+        Returns:
+        - T: The value returned by the handler.
+        """
+        proxy = ThreadConnectionProxy(connection, asyncio.get_running_loop())
+        return await self.run(self.__run_in_thread_loop, handler, proxy, *args)
+
+    async def startup(self) -> None:
+        """
+        Create the semaphore bounding the submitted calls on the running event loop, reopening an
+        offloader that was shut down. The executor is created on first use. Called on `lifespan.startup`.
+        """
+        if self.__slots is None or self.__closed:
+            self.__slots = asyncio.Semaphore(self.max_workers + self.max_pending)
+            self.__closed = False
+
+    async def shutdown(self) -> None:
+        """
+        Reject new calls, wait for running calls, stop the worker threads and close their event
+        loops. Calls still waiting for a slot fail. Called on `lifespan.shutdown`.
+        """
+        self.__closed = True
+        executor, self.__executor = self.__executor, None
+        if executor is not None:
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
+        loops, self.__thread_loops = self.__thread_loops, []
+        for loop in loops:
+            loop.close()
+
+    def __check_open(self) -> None:
+        if self.__closed:
+            raise RuntimeError('The thread offloader is shut down')
+
+    def __get_executor(self) -> ThreadPoolExecutor:
+        if self.__executor is None:
+            self.__executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                 thread_name_prefix='eventum-handler')
+        return self.__executor
+
+    def __tracked(self, func: typing.Callable[..., T], *args: typing.Any) -> T:
+        with self.__lock:
+            self.__active += 1
+        try:
+            return func(*args)
+        finally:
+            with self.__lock:
+                self.__active -= 1
+
+    def __run_in_thread_loop(self, handler: typing.Callable[..., typing.Awaitable[T]], *args: typing.Any) -> T:
+        loop = getattr(self.__local, 'loop', None)
+        if loop is None or loop.is_closed():
+            loop = self.__local.loop = asyncio.new_event_loop()
+            with self.__lock:
+                self.__thread_loops.append(loop)
+        return loop.run_until_complete(handler(*args))
+
+
+class SharedBuffer:
+    """
+    Picklable reference to a binary payload copied into a shared memory block.
+
+    Only the block name and size cross the process boundary; the worker maps the block and the
+    target function receives a `memoryview` over it instead of an unpickled copy of the payload.
+    """
+    __slots__ = ('name', 'size')
+
+    def __init__(self, name: str, size: int):
+        self.name = name
+        self.size = size
+
+
+def _call_with_shared_buffers(func: typing.Callable[..., T], *args: typing.Any) -> T:
+    """
+    Worker-side trampoline replacing every `SharedBuffer` argument by a memoryview of its block.
+    The views are released when `func` returns, so `func` must copy anything it wants to keep.
+    """
+    blocks = []
+    views = []
+    call_args = []
+    try:
+        for arg in args:
+            if isinstance(arg, SharedBuffer):
+                block = shared_memory.SharedMemory(name=arg.name)
+                blocks.append(block)
+                view = block.buf[:arg.size]
+                views.append(view)
+                call_args.append(view)
+            else:
+                call_args.append(arg)
+        return func(*call_args)
+    finally:
+        for view in views:
+            view.release()
+        for block in blocks:
+            try:
+                block.close()
+            except BufferError:
+                pass
+
+
+class ProcessOffloader:
+    """
+    Managed `ProcessPoolExecutor` running CPU-bound, picklable pure functions.
+
+    The pool is a lifespan resource: it is created on startup (or on first use) and drained on
+    shutdown. Workers are started with the 'forkserver' method where available, 'spawn' elsewhere,
+    never forked from the application process and its running threads.
+
+    Binary payloads are handed over through shared memory instead of being pickled through the
+    pool's pipe: binary arguments of at least `shared_memory_threshold` bytes are copied once into
+    a shared block, and `run_stream` receives a client stream straight into one. A block is
+    unlinked once the worker is done with it, even if the awaiting caller was cancelled before.
+    """
+    def __init__(self,
+                 max_workers: typing.Optional[int] = None,
+                 shared_memory_threshold: int = 64 * 1024,
+                 max_stream_bytes: int = 64 * 1024 * 1024,
+                 metrics: typing.Optional[Metrics] = None
+                 ) -> None:
+        """
+        Initialize the offloader.
+
+        Parameters:
+        - max_workers (Optional[int]): Number of worker processes. Defaults to `os.cpu_count()`.
+        - shared_memory_threshold (int): Minimum size in bytes of a binary argument to be passed
+          through shared memory. Defaults to 64 KiB.
+        - max_stream_bytes (int): Maximum size in bytes of a stream received by `run_stream`.
+          Defaults to 64 MiB.
+        - metrics (Optional[Metrics]): Registry receiving the pool gauges.
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.shared_memory_threshold = shared_memory_threshold
+        self.max_stream_bytes = max_stream_bytes
+        self.__executor: typing.Optional[ProcessPoolExecutor] = None
+        self.__in_flight = 0
+        self.__completed = 0
+        if metrics is not None:
+            metrics.register_gauge('process_pool.max_workers', lambda: self.max_workers)
+            metrics.register_gauge('process_pool.in_flight', lambda: self.__in_flight)
+            metrics.register_gauge('process_pool.completed', lambda: self.__completed)
+
+    @property
+    def started(self) -> bool:
+        """
+        Whether the worker pool is running.
+        """
+        return self.__executor is not None
+
+    async def startup(self) -> None:
+        """
+        Create the worker pool. Called on `lifespan.startup`.
+        """
+        if self.__executor is None:
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            self.__executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                  mp_context=multiprocessing.get_context(method))
+
+    async def shutdown(self) -> None:
+        """
+        Wait for submitted calls to finish and stop the workers. Called on `lifespan.shutdown`.
+        """
+        executor, self.__executor = self.__executor, None
+        if executor is not None:
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
+
+    async def run(self, func: typing.Callable[..., T], *args: typing.Any) -> T:
+        """
+        Run `func(*args)` in a worker process and await its result.
+
+        Parameters:
+        - func (Callable[..., T]): A picklable (module-level) function.
+        - args (Any): Picklable arguments. `bytes`, `bytearray` and `memoryview` arguments above the
+          shared memory threshold reach `func` as a `memoryview` valid only during the call.
+
+        Returns:
+        - T: The value returned by the function.
+        """
+        blocks = []
+        call_args = []
+        try:
+            for arg in args:
+                if isinstance(arg, (bytes, bytearray, memoryview)) and len(arg) >= self.shared_memory_threshold:
+                    block = shared_memory.SharedMemory(create=True, size=len(arg))
+                    blocks.append(block)
+                    block.buf[:len(arg)] = arg
+                    call_args.append(SharedBuffer(block.name, len(arg)))
+                else:
+                    call_args.append(arg)
+        except BaseException:
+            self.__release(blocks)
+            raise
+        return await self.__submit(blocks, func, *call_args)
+
+    async def run_stream(self,
+                         func: typing.Callable[..., T],
+                         event_data: typing.Any,
+                         stream: 'IncomingStream',
+                         size: int
+                         ) -> T:
+        """
+        Receive a client stream into a shared memory block and run `func(event_data, payload)` in a
+        worker process, `payload` being a `memoryview` of the received bytes valid during the call.
+        The chunks are copied once, from the received frames into the block.
+
+        Parameters:
+        - func (Callable[..., T]): A picklable (module-level) function.
+        - event_data (Any): The event that announced the stream.
+        - stream (IncomingStream): The opened stream, consumed by this call.
+        - size (int): The size announced for the stream. A longer stream is aborted.
+
+        Returns:
+        - T: The value returned by the function.
+
+        Raises:
+        - ValueError: If `size` exceeds `max_stream_bytes`.
+        - StreamAbortedException: If the stream was aborted or is longer than `size`.
+        """
+        if size > self.max_stream_bytes:
+            raise ValueError(f'Streams are limited to {self.max_stream_bytes} bytes, got {size}')
+        block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        try:
+            received = await stream.readinto(block.buf[:size])
+        except BaseException:
+            self.__release([block])
+            raise
+        return await self.__submit([block], func, event_data, SharedBuffer(block.name, received))
+
+    async def __submit(self,
+                       blocks: typing.List[shared_memory.SharedMemory],
+                       func: typing.Callable[..., T],
+                       *args: typing.Any
+                       ) -> T:
+        try:
+            await self.startup()
+            if blocks:
+                future = self.__executor.submit(_call_with_shared_buffers, func, *args)
+            else:
+                future = self.__executor.submit(func, *args)
+        except BaseException:
+            self.__release(blocks)
+            raise
+        if blocks:
+            # Released when the worker is done, not when the caller stops waiting
+            future.add_done_callback(lambda done: self.__release(blocks))
+        self.__in_flight += 1
+        try:
+            return await asyncio.wrap_future(future)
+        finally:
+            self.__in_flight -= 1
+            self.__completed += 1
+
+    @staticmethod
+    def __release(blocks: typing.List[shared_memory.SharedMemory]) -> None:
+        for block in blocks:
+            try:
+                block.close()
+            except BufferError:
+                pass
+            block.unlink()
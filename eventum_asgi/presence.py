@@ -0,0 +1,273 @@
+import asyncio
+import collections
+import typing
+import orjson
+from eventum_asgi.connection import WSConnection
+from eventum_asgi.load import LoopMonitor
+from eventum_asgi.metrics import Metrics
+from eventum_asgi.replies import detached_context
+
+
+class Presence:
+    """
+    Per-topic presence of users, with join/leave diffs batched over an interval.
+
+    A user is identified by the connection flag `identity_flag` (the connection id when the flag
+    is not set), so several sockets of the same user count once. Each topic maps users to their
+    sockets, which makes `count` a `len` and membership changes O(1). Changes are collected per
+    topic and a single `{"event": "presence", "topic": ..., "joined": [...], "left": [...], "count": n}`
+    message is serialized once and sent to the members of the topic every `batch_interval`
+    seconds; a user leaving and joining again within an interval produces no diff at all.
+
+    Flushing never waits for a socket: frames are queued on the priority lanes of the connection
+    or on a per-connection backlog drained by one delivery task, in order. A connection that
+    cannot take a diff (lane or backlog full, failed send) would miss it for good, so it is
+    counted as a send failure and removed from every topic it joined.
+    """
+    def __init__(self,
+                 identity_flag: typing.Any = 'user_id',
+                 batch_interval: float = 0.05,
+                 metrics: typing.Optional[Metrics] = None,
+                 load_monitor: typing.Optional[LoopMonitor] = None,
+                 max_backlog: int = 32):
+        """
+        Initialize the presence tracker.
+
+        Parameters:
+        - identity_flag (Any): Name of the connection flag holding the user identity.
+        - batch_interval (float): Seconds during which changes are collected before being sent.
+        - metrics (Optional[Metrics]): Registry receiving the presence counters and gauges.
+        - load_monitor (Optional[LoopMonitor]): Stretches the batch interval while load is shed.
+        - max_backlog (int): Diffs waiting for a connection without priority lanes before it fails.
+        """
+        self.identity_flag = identity_flag
+        self.batch_interval = batch_interval
+        self.metrics = metrics
+        self.load_monitor = load_monitor
+        self.max_backlog = max_backlog
+        self.__topics: typing.Dict[typing.Any, typing.Dict[typing.Any, typing.Set[WSConnection]]] = {}
+        self.__connection_topics: typing.Dict[WSConnection, typing.Dict[typing.Any, typing.Any]] = {}
+        self.__pending: typing.Dict[typing.Any, typing.Tuple[typing.Set[typing.Any], typing.Set[typing.Any]]] = {}
+        self.__flush_handle: typing.Optional[asyncio.TimerHandle] = None
+        self.__flush_tasks: typing.Set[asyncio.Task] = set()
+        self.__backlogs: typing.Dict[WSConnection, typing.Deque[typing.Dict[str, typing.Any]]] = {}
+        self.__deliveries: typing.Dict[WSConnection, asyncio.Task] = {}
+        if metrics is not None:
+            metrics.register_gauge('presence.topics', lambda: len(self.__topics))
+
+    def identity(self, connection: WSConnection) -> typing.Any:
+        """
+        Get the identity under which the connection is tracked.
+
+        Parameters:
+        - connection (WSConnection): The connection.
+
+        Returns:
+        - Any: The `identity_flag` flag of the connection, or its id if the flag is not set.
+        """
+        identity = connection.get_flag(self.identity_flag)
+        return identity if identity is not None else str(connection.id)
+
+    def join(self, connection: WSConnection, topic: typing.Any) -> bool:
+        """
+        Add the connection to a topic. Its socket is removed from every topic on disconnect.
+        The identity is read once here, so changing the flag later does not move the socket.
+
+        Parameters:
+        - connection (WSConnection): The connection joining.
+        - topic (Any): The topic, e.g. a document id.
+
+        Returns:
+        - bool: True if the user was not present in the topic before.
+        """
+        topics = self.__connection_topics.get(connection)
+        if topics is None:
+            topics = self.__connection_topics[connection] = {}
+            connection.add_disconnect_callback(self.leave_all)
+        elif topic in topics:
+            return False
+        identity = topics[topic] = self.identity(connection)
+        members = self.__topics.setdefault(topic, {})
+        sockets = members.get(identity)
+        if sockets is not None:
+            sockets.add(connection)
+            return False
+        members[identity] = {connection}
+        joined, left = self.__changes(topic)
+        if identity in left:
+            left.discard(identity)
+        else:
+            joined.add(identity)
+        return True
+
+    def leave(self, connection: WSConnection, topic: typing.Any) -> bool:
+        """
+        Remove the connection from a topic.
+
+        Parameters:
+        - connection (WSConnection): The connection leaving.
+        - topic (Any): The topic.
+
+        Returns:
+        - bool: True if it was the last socket of the user in the topic.
+        """
+        topics = self.__connection_topics.get(connection)
+        if topics is None or topic not in topics:
+            return False
+        identity = topics.pop(topic)
+        if not topics:
+            del self.__connection_topics[connection]
+
+        members = self.__topics[topic]
+        sockets = members[identity]
+        sockets.discard(connection)
+        if sockets:
+            return False
+        del members[identity]
+        if not members:
+            del self.__topics[topic]
+        joined, left = self.__changes(topic)
+        if identity in joined:
+            joined.discard(identity)
+        else:
+            left.add(identity)
+        return True
+
+    def leave_all(self, connection: WSConnection) -> None:
+        """
+        Remove the connection from every topic it joined.
+
+        Parameters:
+        - connection (WSConnection): The connection leaving.
+        """
+        for topic in list(self.__connection_topics.get(connection, ())):
+            self.leave(connection, topic)
+
+    def count(self, topic: typing.Any) -> int:
+        """
+        Get the number of distinct users present in a topic.
+        """
+        return len(self.__topics.get(topic, ()))
+
+    def members(self, topic: typing.Any) -> typing.List[typing.Any]:
+        """
+        Get the identities of the users present in a topic.
+        """
+        return list(self.__topics.get(topic, ()))
+
+    def topics(self, connection: WSConnection) -> typing.Set[typing.Any]:
+        """
+        Get the topics joined by a connection.
+        """
+        return set(self.__connection_topics.get(connection, ()))
+
+    async def flush(self) -> None:
+        """
+        Send the pending diffs now, one message per changed topic.
+
+        The diffs are handed off without awaiting, so concurrent flushes cannot interleave and
+        every connection receives them in order.
+        """
+        if self.__flush_handle is not None:
+            self.__flush_handle.cancel()
+            self.__flush_handle = None
+        pending, self.__pending = self.__pending, {}
+        for topic, (joined, left) in pending.items():
+            if not joined and not left:
+                continue
+            members = self.__topics.get(topic)
+            if not members:
+                continue
+            message = {
+                'type': 'websocket.send',
+                'text': orjson.dumps({
+                    'event': 'presence',
+                    'topic': topic,
+                    'joined': list(joined),
+                    'left': list(left),
+                    'count': len(members)
+                }).decode('utf-8')
+            }
+            targets = [connection for sockets in members.values() for connection in sockets]
+            for connection in targets:
+                self.__post(connection, message)
+            if self.metrics is not None:
+                self.metrics.increment('presence.diffs_sent')
+                self.metrics.increment('presence.messages_sent', len(targets))
+
+    async def startup(self) -> None:
+        """
+        Nothing to start: flushes are scheduled on the first change.
+        """
+
+    async def shutdown(self) -> None:
+        """
+        Cancel the scheduled flush and the pending deliveries, and wait for the running flushes.
+        """
+        if self.__flush_handle is not None:
+            self.__flush_handle.cancel()
+            self.__flush_handle = None
+        self.__pending.clear()
+        if self.__flush_tasks:
+            await asyncio.gather(*self.__flush_tasks, return_exceptions=True)
+        deliveries = list(self.__deliveries.values())
+        for task in deliveries:
+            task.cancel()
+        await asyncio.gather(*deliveries, return_exceptions=True)
+
+    def __changes(self, topic: typing.Any) -> typing.Tuple[typing.Set[typing.Any], typing.Set[typing.Any]]:
+        changes = self.__pending.get(topic)
+        if changes is None:
+            changes = self.__pending[topic] = (set(), set())
+        if self.__flush_handle is None:
+            interval = self.batch_interval
+            if self.load_monitor is not None:
+                interval *= self.load_monitor.broadcast_factor
+            self.__flush_handle = asyncio.get_running_loop().call_later(interval, self.__start_flush,
+                                                                        context=detached_context())
+        return changes
+
+    def __start_flush(self) -> None:
+        self.__flush_handle = None
+        task = asyncio.ensure_future(self.flush())
+        self.__flush_tasks.add(task)
+        task.add_done_callback(self.__flush_tasks.discard)
+
+    def __post(self, connection: WSConnection, message: typing.Dict[str, typing.Any]) -> None:
+        if connection.lanes is not None:
+            try:
+                connection.lanes.put_nowait(message)
+            except Exception:
+                self.__fail(connection)
+            return
+        backlog = self.__backlogs.get(connection)
+        if backlog is None:
+            self.__backlogs[connection] = collections.deque((message,))
+            self.__deliveries[connection] = asyncio.get_running_loop().create_task(self.__deliver(connection),
+                                                                                   context=detached_context())
+        elif len(backlog) < self.max_backlog:
+            backlog.append(message)
+        else:
+            self.__fail(connection)
+
+    async def __deliver(self, connection: WSConnection) -> None:
+        backlog = self.__backlogs[connection]
+        try:
+            while backlog:
+                await connection.send(backlog.popleft())
+        except Exception:
+            if self.__backlogs.get(connection) is backlog:
+                self.__fail(connection)
+        finally:
+            if self.__backlogs.get(connection) is backlog:
+                del self.__backlogs[connection]
+            if self.__deliveries.get(connection) is asyncio.current_task():
+                del self.__deliveries[connection]
+
+    def __fail(self, connection: WSConnection) -> None:
+        backlog = self.__backlogs.pop(connection, None)
+        if backlog is not None:
+            backlog.clear()
+        if self.metrics is not None:
+            self.metrics.increment('presence.send_failures')
+        self.leave_all(connection)
@@ -0,0 +1,258 @@
+import argparse
+import asyncio
+import inspect
+import os
+import sys
+import time
+import typing
+import orjson
+from eventum_asgi.capture import CONNECT, TEXT, BINARY, DISCONNECT, CaptureRecord, read_capture
+
+HANDSHAKE_HEADERS = frozenset({
+    'host', 'upgrade', 'connection', 'sec-websocket-key', 'sec-websocket-version',
+    'sec-websocket-protocol', 'sec-websocket-extensions', 'content-length',
+})
+"""
+Headers recreated by the client of the replay instead of being copied from the log.
+"""
+
+
+class ReplayReport(typing.NamedTuple):
+    """
+    Outcome of a replay.
+
+    - connections: Handshakes replayed.
+    - rejected: Handshakes that failed or were rejected by the application.
+    - messages: Frames sent to the application.
+    - received: Frames received from the application.
+    - duration: Seconds the replay took.
+    - max_lag: Largest delay in seconds between the scheduled and the actual time of a message.
+      At speeds the application cannot sustain, it grows with the replay.
+    """
+    connections: int
+    rejected: int
+    messages: int
+    received: int
+    duration: float
+    max_lag: float
+
+
+class _Stats:
+    __slots__ = ('connections', 'rejected', 'messages', 'received', 'max_lag')
+
+    def __init__(self):
+        self.connections = 0
+        self.rejected = 0
+        self.messages = 0
+        self.received = 0
+        self.max_lag = 0.0
+
+
+Opener = typing.Callable[[str, typing.Dict[str, str], typing.List[str]], typing.Awaitable[typing.Any]]
+
+
+async def replay(records: typing.Iterable[CaptureRecord],
+                 open_connection: Opener,
+                 speed: typing.Optional[float] = 1.0,
+                 extra_headers: typing.Optional[typing.Dict[str, str]] = None) -> ReplayReport:
+    """
+    Send captured traffic again, keeping the connections and the order of their messages.
+
+    Every captured connection is replayed by its own task, fed with its records when they are
+    due: at `timestamp / speed` seconds after the start, or as fast as possible when `speed` is
+    None. A connection waits for its handshake before sending its first frame, and the frames
+    sent back by the application are read and discarded.
+
+    Parameters:
+    - records (Iterable[CaptureRecord]): The records, e.g. `read_capture(path)`.
+    - open_connection (Opener): Opens a connection from its path with query string, headers and
+      subprotocols, returning an object with the `websockets` client `send`, `recv` and `close`.
+    - speed (Optional[float]): Time factor: 1 replays in real time, 10 ten times faster and None
+      without waiting.
+    - extra_headers (Optional[Dict[str, str]]): Headers overriding the captured ones, e.g. to
+      replace redacted credentials.
+
+    Returns:
+    - ReplayReport: The counts of the replay.
+    """
+    loop = asyncio.get_running_loop()
+    stats = _Stats()
+    queues: typing.Dict[int, asyncio.Queue] = {}
+    tasks: typing.List[asyncio.Task] = []
+    started_at = loop.time()
+
+    for record in records:
+        if speed is not None:
+            due = started_at + record.timestamp / speed
+            delay = due - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                stats.max_lag = max(stats.max_lag, -delay)
+        if record.kind == CONNECT:
+            queue = queues[record.connection] = asyncio.Queue()
+            tasks.append(asyncio.ensure_future(
+                _replay_connection(orjson.loads(record.payload), queue, open_connection, extra_headers, stats)
+            ))
+        else:
+            queue = queues.get(record.connection)
+            if queue is not None:
+                queue.put_nowait(record)
+                if record.kind == DISCONNECT:
+                    del queues[record.connection]
+        if speed is None:
+            await asyncio.sleep(0)
+
+    for queue in queues.values():
+        queue.put_nowait(None)
+    await asyncio.gather(*tasks)
+    return ReplayReport(stats.connections, stats.rejected, stats.messages, stats.received,
+                        loop.time() - started_at, stats.max_lag)
+
+
+async def _replay_connection(handshake: typing.Dict[str, typing.Any],
+                             queue: asyncio.Queue,
+                             open_connection: Opener,
+                             extra_headers: typing.Optional[typing.Dict[str, str]],
+                             stats: _Stats) -> None:
+    stats.connections += 1
+    path = handshake['path']
+    if handshake.get('query_string'):
+        path = f"{path}?{handshake['query_string']}"
+    headers = {name: value for name, value in handshake['headers'] if name not in HANDSHAKE_HEADERS}
+    headers.update(extra_headers or {})
+    try:
+        connection = await open_connection(path, headers, handshake.get('subprotocols') or [])
+    except Exception:
+        stats.rejected += 1
+        return
+
+    async def drain() -> None:
+        try:
+            while True:
+                await connection.recv()
+                stats.received += 1
+        except Exception:
+            pass
+
+    reader = asyncio.ensure_future(drain())
+    code = 1000
+    try:
+        while True:
+            record = await queue.get()
+            if record is None:
+                break
+            if record.kind == TEXT:
+                await connection.send(record.payload.decode('utf-8'))
+                stats.messages += 1
+            elif record.kind == BINARY:
+                await connection.send(record.payload)
+                stats.messages += 1
+            elif record.kind == DISCONNECT:
+                code = orjson.loads(record.payload)
+                break
+    except Exception:
+        pass
+    finally:
+        try:
+            await connection.close(code=code if 1000 <= code < 5000 and code not in (1005, 1006) else 1000)
+        except Exception:
+            pass
+        reader.cancel()
+        await asyncio.gather(reader, return_exceptions=True)
+
+
+def in_process_opener(client: typing.Any) -> Opener:
+    """
+    Build an opener connecting to an application through an entered `InMemoryTestClient`.
+    """
+    async def open_connection(path: str, headers: typing.Dict[str, str], subprotocols: typing.List[str]) -> typing.Any:
+        return await client.connect(path=path, extra_headers=headers, subprotocols=subprotocols or None)
+    return open_connection
+
+
+def loopback_opener(url: str) -> Opener:
+    """
+    Build an opener connecting to a running server with the `websockets` client.
+
+    The headers keyword of `websockets.connect` is `extra_headers` up to websockets 13 and
+    `additional_headers` from websockets 14, whose client is the new asyncio implementation.
+
+    Parameters:
+    - url (str): The base URL of the server, e.g. 'ws://127.0.0.1:8000'.
+    """
+    import websockets
+
+    parameters = inspect.signature(websockets.connect).parameters
+    headers_keyword = 'additional_headers' if 'additional_headers' in parameters else 'extra_headers'
+
+    async def open_connection(path: str, headers: typing.Dict[str, str], subprotocols: typing.List[str]) -> typing.Any:
+        return await websockets.connect(url.rstrip('/') + path, subprotocols=subprotocols or None,
+                                        **{headers_keyword: headers})
+    return open_connection
+
+
+async def replay_file(path: str,
+                      app: typing.Any = None,
+                      url: typing.Optional[str] = None,
+                      speed: typing.Optional[float] = 1.0,
+                      extra_headers: typing.Optional[typing.Dict[str, str]] = None) -> ReplayReport:
+    """
+    Replay a capture log against an application in-process, with its lifespan, or against a server.
+
+    Parameters:
+    - path (str): The capture log.
+    - app (Any): The `Eventum` application to replay in-process.
+    - url (Optional[str]): The base URL of the server to replay over the network, if no `app` is given.
+    - speed (Optional[float]): Time factor, None for maximum speed.
+    - extra_headers (Optional[Dict[str, str]]): Headers overriding the captured ones.
+
+    Returns:
+    - ReplayReport: The counts of the replay.
+    """
+    if app is not None:
+        from eventum_asgi.testclient import InMemoryTestClient
+        async with InMemoryTestClient(app, record_messages=False) as client:
+            return await replay(read_capture(path), in_process_opener(client), speed, extra_headers)
+    if url is None:
+        raise ValueError('Either an application or a URL is required')
+    return await replay(read_capture(path), loopback_opener(url), speed, extra_headers)
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> int:
+    """
+    Replay a capture log from the command line and print the report.
+
+    Run with: python -m eventum_asgi.replay traffic.evcap (--app main:app | --url ws://127.0.0.1:8000) [--speed 10|max]
+    """
+    parser = argparse.ArgumentParser(prog='python -m eventum_asgi.replay', description='Replay captured WebSocket traffic.')
+    parser.add_argument('log', help='The capture log.')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--app', help="The application to replay in-process, as 'module:attribute'.")
+    target.add_argument('--url', help='The base URL of a running server, e.g. ws://127.0.0.1:8000.')
+    parser.add_argument('--speed', default='1', help="Time factor, e.g. 1, 10, or 'max'. Default: 1.")
+    parser.add_argument('--header', action='append', default=[], metavar='NAME:VALUE',
+                        help='Header overriding the captured ones, e.g. to replace redacted credentials.')
+    parser.add_argument('--app-dir', default='.', help='Directory added to sys.path to import the application. Default: .')
+    args = parser.parse_args(argv)
+
+    app = None
+    if args.app is not None:
+        from eventum_asgi.server import import_app
+        sys.path.insert(0, os.path.abspath(args.app_dir))
+        app = import_app(args.app)
+    speed = None if args.speed == 'max' else float(args.speed)
+    headers = dict(header.split(':', 1) for header in args.header)
+    headers = {name.strip().lower(): value.strip() for name, value in headers.items()}
+
+    started = time.perf_counter()
+    report = asyncio.run(replay_file(args.log, app=app, url=args.url, speed=speed, extra_headers=headers))
+    elapsed = time.perf_counter() - started
+    print(f'{report.connections} connections ({report.rejected} rejected), {report.messages} frames sent, '
+          f'{report.received} received in {elapsed:.2f}s ({report.messages / max(elapsed, 1e-9):.0f} frames/s), '
+          f'max lag {report.max_lag * 1000:.1f} ms')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
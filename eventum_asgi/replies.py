@@ -0,0 +1,88 @@
+import contextvars
+import typing
+from eventum_asgi.types import Handler
+
+if typing.TYPE_CHECKING:
+    from eventum_asgi.connection import WSConnection
+
+
+class ReplyRecorder:
+    """
+    Frames sent to a connection by one handler call, kept by `Deduplicator` and `ResponseCache`.
+
+    The recorder of a call lives in a context variable while the call runs. The send path of the
+    connection appends to it the text and binary frames it writes from that context, and only to
+    the recorder's own connection. Work scheduled apart from the call runs in a context without
+    recorder (`connection.spawn`, stream pumps, presence flushes, scheduler pushes), so frames that
+    other tasks send to the connection while the handler runs never end up in its reply. Nested
+    recorders, e.g. a deduplicated route with a response cache, also record into their parent.
+    """
+    __slots__ = ('connection', 'frames', 'size', 'parent', 'closed')
+
+    def __init__(self, connection: 'WSConnection', parent: typing.Optional['ReplyRecorder'] = None):
+        """
+        Initialize an empty recorder.
+
+        Parameters:
+        - connection (WSConnection): The connection whose frames are recorded.
+        - parent (Optional[ReplyRecorder]): The recorder of an enclosing call.
+        """
+        self.connection = connection
+        self.frames: typing.List[typing.Dict[str, typing.Any]] = []
+        self.size = 0
+        self.parent = parent
+        self.closed = False
+
+    def record(self, connection: 'WSConnection', message: typing.Dict[str, typing.Any]) -> None:
+        """
+        Keep a message sent to `connection` if it is a frame of the recorded call.
+        """
+        if message.get('type') != 'websocket.send':
+            return
+        recorder = self
+        while recorder is not None:
+            if not recorder.closed and recorder.connection is connection:
+                recorder.frames.append(message)
+                recorder.size += len(message.get('text') or message.get('bytes') or b'')
+            recorder = recorder.parent
+
+
+_recorder: contextvars.ContextVar[typing.Optional[ReplyRecorder]] = contextvars.ContextVar('eventum_reply_recorder',
+                                                                                           default=None)
+
+
+def current_recorder() -> typing.Optional[ReplyRecorder]:
+    """
+    Get the recorder of the handler call running in the current context, if any.
+    """
+    return _recorder.get()
+
+
+def detached_context() -> contextvars.Context:
+    """
+    Copy the current context without its reply recorder, for work scheduled apart from the handler.
+    """
+    context = contextvars.copy_context()
+    context.run(_recorder.set, None)
+    return context
+
+
+async def record_reply(call: Handler,
+                       connection: 'WSConnection',
+                       *args: typing.Any,
+                       **kwargs: typing.Any
+                       ) -> typing.Tuple[typing.Any, ReplyRecorder]:
+    """
+    Await `call(connection, *args, **kwargs)` while recording the frames it sends to the connection.
+
+    Returns:
+    - Tuple[Any, ReplyRecorder]: The value returned by the call and its closed recorder.
+    """
+    recorder = ReplyRecorder(connection, parent=_recorder.get())
+    token = _recorder.set(recorder)
+    try:
+        result = await call(connection, *args, **kwargs)
+    finally:
+        _recorder.reset(token)
+        recorder.closed = True
+    return result, recorder
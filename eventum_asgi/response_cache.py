@@ -0,0 +1,158 @@
+import functools
+import hashlib
+import typing
+import orjson
+from eventum_asgi.cache import TTLCache, SingleFlight
+from eventum_asgi.connection import WSConnection
+from eventum_asgi.metrics import Metrics
+from eventum_asgi.replies import record_reply
+from eventum_asgi.types import Handler
+
+
+class ResponseCache:
+    """
+    Memoizes the replies of read-only events, such as configuration or metadata lookups.
+
+    An event is keyed by a digest of the canonical JSON (sorted keys) of its payload, or of the
+    fields selected for its route. The frames the handler call sends to the connection are
+    recorded as they leave by a `ReplyRecorder`, so a cached reply is a tuple of already serialized
+    frames sent as-is to the next clients asking the same thing. An empty reply is not kept. Identical events arriving while the handler runs wait for its reply instead of
+    running it again. Each route has its own LRU of `maxsize` replies living `ttl` seconds.
+
+    Invalidating a route bumps its generation: a handler call started before is neither stored
+    nor joined by the events arriving after, so a stale reply cannot outlive its invalidation.
+    """
+    def __init__(self,
+                 maxsize: int = 1024,
+                 ttl: float = 5.0,
+                 max_reply_bytes: int = 64 * 1024,
+                 metrics: typing.Optional[Metrics] = None):
+        """
+        Initialize an empty cache.
+
+        Parameters:
+        - maxsize (int): Maximum number of replies kept per route.
+        - ttl (float): Seconds a reply is kept.
+        - max_reply_bytes (int): Replies larger than this are sent but not kept.
+        - metrics (Optional[Metrics]): Registry receiving the cache counters and hit rates.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_reply_bytes = max_reply_bytes
+        self.metrics = metrics
+        self.routes: typing.Dict[str, TTLCache] = {}
+        self.__fields: typing.Dict[str, typing.Optional[typing.Tuple[str, ...]]] = {}
+        self.__stats: typing.Dict[str, typing.List[int]] = {}
+        self.__generations: typing.Dict[str, typing.List[int]] = {}
+        self.__flight: SingleFlight = SingleFlight()
+        if metrics is not None:
+            metrics.register_gauge('cache.routes', self.__route_stats)
+
+    def wrap(self, event: str, call: Handler, fields: typing.Optional[typing.Sequence[str]] = None) -> Handler:
+        """
+        Wrap the call of a route so that its replies are memoized.
+
+        Parameters:
+        - event (str): The event name of the route.
+        - call (Handler): The async callable invoking the handler.
+        - fields (Optional[Sequence[str]]): The payload fields the reply depends on. Defaults to the whole payload.
+
+        Returns:
+        - Handler: The memoizing callable.
+        """
+        replies = self.routes[event] = TTLCache(maxsize=self.maxsize, ttl=self.ttl)
+        self.__fields[event] = tuple(fields) if fields is not None else None
+        stats = self.__stats[event] = [0, 0]
+        generation = self.__generations[event] = [0]
+
+        @functools.wraps(call)
+        async def call_cached(connection: WSConnection, event_data: typing.Any, *args: typing.Any, **kwargs: typing.Any) -> typing.Any:
+            if not isinstance(event_data, dict):
+                return await call(connection, event_data, *args, **kwargs)
+            key = self.key(event, event_data)
+            reply = replies.get(key)
+            if reply is not None:
+                stats[0] += 1
+                self.__count('cache.hits')
+                for message in reply:
+                    await connection.send(message)
+                return None
+
+            stats[1] += 1
+            self.__count('cache.misses')
+            leader = False
+            started = generation[0]
+
+            async def run() -> typing.Tuple[typing.Dict[str, typing.Any], ...]:
+                nonlocal leader
+                leader = True
+                _, recorder = await record_reply(call, connection, event_data, *args, **kwargs)
+                recorded = tuple(recorder.frames)
+                if recorded and recorder.size <= self.max_reply_bytes and generation[0] == started:
+                    replies.set(key, recorded)
+                return recorded
+
+            try:
+                reply = await self.__flight.do((event, key, started), run)
+            except Exception:
+                if leader:
+                    raise
+                return await call(connection, event_data, *args, **kwargs)
+            if not leader:
+                self.__count('cache.coalesced')
+                for message in reply:
+                    await connection.send(message)
+            return None
+        return call_cached
+
+    def key(self, event: str, event_data: typing.Dict[str, typing.Any]) -> bytes:
+        """
+        Compute the cache key of an event payload for the route of `event`.
+        """
+        fields = self.__fields.get(event)
+        selected = event_data if fields is None else {field: event_data.get(field) for field in fields}
+        return hashlib.blake2b(orjson.dumps(selected, option=orjson.OPT_SORT_KEYS), digest_size=16).digest()
+
+    def invalidate(self, event: str, event_data: typing.Optional[typing.Dict[str, typing.Any]] = None) -> None:
+        """
+        Drop cached replies of a route.
+
+        Parameters:
+        - event (str): The event name of the route.
+        - event_data (Optional[Dict[str, Any]]): A payload whose reply is dropped, e.g.
+          `{'room': 'lobby'}`. Every reply of the route is dropped if omitted.
+        """
+        replies = self.routes.get(event)
+        if replies is None:
+            return
+        self.__generations[event][0] += 1
+        if event_data is None:
+            replies.clear()
+        else:
+            replies.pop(self.key(event, event_data))
+        self.__count('cache.invalidations')
+
+    def clear(self) -> None:
+        """
+        Drop every cached reply.
+        """
+        for generation in self.__generations.values():
+            generation[0] += 1
+        for replies in self.routes.values():
+            replies.clear()
+        self.__count('cache.invalidations')
+
+    def __route_stats(self) -> typing.Dict[str, typing.Dict[str, typing.Any]]:
+        routes = {}
+        for event, (hits, misses) in self.__stats.items():
+            routes[event] = {
+                'hits': hits,
+                'misses': misses,
+                'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+                'entries': len(self.routes[event]),
+            }
+        return routes
+
+    def __count(self, name: str, value: int = 1) -> None:
+        if self.metrics is not None:
+            self.metrics.increment(name, value)
@@ -0,0 +1,315 @@
+import asyncio
+import heapq
+import inspect
+import itertools
+import random
+import traceback
+import typing
+import orjson
+import pydantic
+from eventum_asgi.connection import WSConnection
+from eventum_asgi.events.base_event import Event
+from eventum_asgi.events.frozen_event import FrozenEvent
+from eventum_asgi.events.typed_event import TypedEvent
+from eventum_asgi.load import LoopMonitor
+from eventum_asgi.metrics import Metrics
+
+MissedTickPolicy = typing.Literal['skip', 'catch_up']
+"""
+What a job does with the ticks it missed because it was still running or the loop was blocked.
+
+- **'skip'**: Drop them and stay on the interval grid. Right for snapshots such as prices.
+- **'catch_up'**: Run once per missed tick, back to back, as soon as possible.
+"""
+
+
+class Job:
+    """
+    Interval job of a `Scheduler` and the connections its results are pushed to.
+    """
+    def __init__(self,
+                 name: str,
+                 func: typing.Callable[[], typing.Any],
+                 interval: float,
+                 jitter: float,
+                 missed: MissedTickPolicy):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.missed = missed
+        self.subscribers: typing.Set[WSConnection] = set()
+        self.deliveries: typing.Dict[WSConnection, asyncio.Task] = {}
+        self.next_due = 0.0
+        self.backlog = 0
+        self.cancelled = False
+        self.task: typing.Optional[asyncio.Task] = None
+        self.runs = 0
+        self.skipped = 0
+        self.dropped = 0
+        self.last_push_duration = 0.0
+        self.last_duration = 0.0
+        self.max_duration = 0.0
+        self.total_duration = 0.0
+
+    def subscribe(self, connection: WSConnection) -> None:
+        """
+        Push the results of the job to the connection until it unsubscribes or disconnects.
+        """
+        if connection not in self.subscribers:
+            self.subscribers.add(connection)
+            connection.add_disconnect_callback(self.unsubscribe)
+
+    def unsubscribe(self, connection: WSConnection) -> None:
+        """
+        Stop pushing the results of the job to the connection.
+        """
+        self.subscribers.discard(connection)
+
+    def stats(self) -> typing.Dict[str, typing.Any]:
+        """
+        Get the run count, skipped ticks, dropped pushes, subscriber count and durations in seconds
+        of the job. The durations are those of the job function; `last_push_duration` is the time
+        spent handing its last result to the subscribers.
+        """
+        return {
+            'runs': self.runs,
+            'skipped': self.skipped,
+            'dropped': self.dropped,
+            'subscribers': len(self.subscribers),
+            'last_push_duration': self.last_push_duration,
+            'last_duration': self.last_duration,
+            'max_duration': self.max_duration,
+            'mean_duration': self.total_duration / self.runs if self.runs else 0.0,
+        }
+
+
+class Scheduler:
+    """
+    Application-wide scheduler running interval jobs on a single timer.
+
+    Jobs run once per tick, whatever their number of subscribers, and their result is serialized
+    once and pushed to every subscribed connection without waiting for the sockets: it is queued
+    on the normal lane of connections with priority lanes and sent by a background delivery
+    otherwise. A subscriber whose lane is full, or whose previous delivery is still pending, misses
+    the result, so one slow client neither delays the others nor the next run of the job. Ticks are computed from the previous due time
+    rather than from the end of the previous run, so slow runs do not make the schedule drift.
+    Each job starts at a random offset within its `jitter`, so jobs sharing an interval (and nodes
+    started together) do not all fire at the same instant. It is a lifespan resource: the timer
+    runs between the application startup and shutdown.
+    """
+    def __init__(self, metrics: typing.Optional[Metrics] = None, load_monitor: typing.Optional[LoopMonitor] = None):
+        """
+        Initialize the scheduler without jobs.
+
+        Parameters:
+        - metrics (Optional[Metrics]): Registry receiving the scheduler counters and the job statistics.
+        - load_monitor (Optional[LoopMonitor]): Stretches the job intervals while load is shed.
+        """
+        self.metrics = metrics
+        self.load_monitor = load_monitor
+        self.jobs: typing.Dict[str, Job] = {}
+        self.__heap: typing.List[typing.Tuple[float, int, Job]] = []
+        self.__order = itertools.count()
+        self.__changed: typing.Optional[asyncio.Event] = None
+        self.__runner: typing.Optional[asyncio.Task] = None
+        if metrics is not None:
+            metrics.register_gauge('scheduler.jobs', lambda: {name: job.stats() for name, job in self.jobs.items()})
+
+    def every(self,
+              interval: float,
+              name: typing.Optional[str] = None,
+              jitter: float = 0.0,
+              missed: MissedTickPolicy = 'skip'
+              ) -> typing.Callable[[typing.Callable[[], typing.Any]], Job]:
+        """
+        Decorator registering a function as an interval job.
+
+        The function takes no argument and may be async. Unless it returns None, its result is
+        pushed to the subscribers: `str` as text, `bytes` as binary and anything else (events and
+        pydantic models included) as JSON.
+
+        Parameters:
+        - interval (float): Seconds between two ticks.
+        - name (Optional[str]): The job name. Defaults to the function name.
+        - jitter (float): Upper bound in seconds of the random offset of the first tick.
+        - missed (MissedTickPolicy): What to do with missed ticks.
+
+        Returns:
+        - Callable: A decorator returning the `Job`, to subscribe connections to.
+        """
+        def decorator(func: typing.Callable[[], typing.Any]) -> Job:
+            return self.add_job(func, interval, name=name, jitter=jitter, missed=missed)
+        return decorator
+
+    def add_job(self,
+                func: typing.Callable[[], typing.Any],
+                interval: float,
+                name: typing.Optional[str] = None,
+                jitter: float = 0.0,
+                missed: MissedTickPolicy = 'skip'
+                ) -> Job:
+        """
+        Register an interval job. See `every`.
+        """
+        if interval <= 0:
+            raise ValueError('The interval of a job must be positive')
+        if missed not in ('skip', 'catch_up'):
+            raise ValueError(f'Unknown missed tick policy: {missed!r}')
+        job = Job(name or func.__name__, func, interval, jitter, missed)
+        if job.name in self.jobs:
+            raise ValueError(f'A job named {job.name!r} already exists')
+        self.jobs[job.name] = job
+        if self.__runner is not None:
+            self.__schedule_first(job, asyncio.get_running_loop().time())
+        return job
+
+    def remove_job(self, name: str) -> None:
+        """
+        Stop running a job.
+        """
+        job = self.jobs.pop(name, None)
+        if job is not None:
+            job.cancelled = True
+
+    async def startup(self) -> None:
+        """
+        Start the timer.
+        """
+        loop = asyncio.get_running_loop()
+        self.__changed = asyncio.Event()
+        self.__heap = []
+        now = loop.time()
+        for job in self.jobs.values():
+            self.__schedule_first(job, now)
+        self.__runner = asyncio.ensure_future(self.__run())
+
+    async def shutdown(self) -> None:
+        """
+        Stop the timer and cancel the running jobs.
+        """
+        tasks = [job.task for job in self.jobs.values() if job.task is not None and not job.task.done()]
+        tasks += [task for job in self.jobs.values() for task in job.deliveries.values()]
+        if self.__runner is not None:
+            tasks.append(self.__runner)
+            self.__runner = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def __schedule_first(self, job: Job, now: float) -> None:
+        job.next_due = now + job.interval + (random.uniform(0, job.jitter) if job.jitter else 0.0)
+        heapq.heappush(self.__heap, (job.next_due, next(self.__order), job))
+        self.__changed.set()
+
+    async def __run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self.__heap:
+                self.__changed.clear()
+                await self.__changed.wait()
+                continue
+            due, _, job = self.__heap[0]
+            delay = due - loop.time()
+            if delay > 0:
+                self.__changed.clear()
+                try:
+                    await asyncio.wait_for(self.__changed.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            heapq.heappop(self.__heap)
+            if job.cancelled:
+                continue
+            self.__tick(job, due, loop.time())
+            heapq.heappush(self.__heap, (job.next_due, next(self.__order), job))
+
+    def __tick(self, job: Job, due: float, now: float) -> None:
+        interval = job.interval
+        if self.load_monitor is not None:
+            interval *= self.load_monitor.broadcast_factor
+        missed = int((now - due) // interval)
+        job.next_due = due + (missed + 1) * interval
+        if job.task is not None and not job.task.done():
+            missed += 1
+        else:
+            job.task = asyncio.ensure_future(self.__execute(job))
+        if missed:
+            if job.missed == 'catch_up':
+                job.backlog += missed
+            else:
+                job.skipped += missed
+                self.__count('scheduler.skipped_ticks', missed)
+
+    async def __execute(self, job: Job) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            try:
+                result = job.func()
+                if inspect.isawaitable(result):
+                    result = await result
+            except Exception as e:
+                self.__count('scheduler.failures')
+                traceback.print_exception(e)
+                result = None
+            finally:
+                duration = loop.time() - started
+                job.runs += 1
+                job.last_duration = duration
+                job.total_duration += duration
+                job.max_duration = max(job.max_duration, duration)
+                self.__count('scheduler.runs')
+            if result is not None and job.subscribers:
+                started = loop.time()
+                self.__push(job, result)
+                job.last_push_duration = loop.time() - started
+            if not job.backlog or job.cancelled:
+                return
+            job.backlog -= 1
+
+    def __push(self, job: Job, result: typing.Any) -> None:
+        if isinstance(result, str):
+            message = {'type': 'websocket.send', 'text': result}
+        elif isinstance(result, (bytes, bytearray)):
+            message = {'type': 'websocket.send', 'bytes': bytes(result)}
+        else:
+            if isinstance(result, (FrozenEvent, Event, TypedEvent)):
+                payload = result.to_json_bytes()
+            elif isinstance(result, pydantic.BaseModel):
+                payload = result.__pydantic_serializer__.to_json(result)
+            else:
+                payload = orjson.dumps(result)
+            message = {'type': 'websocket.send', 'text': payload.decode('utf-8')}
+        dropped = 0
+        for connection in list(job.subscribers):
+            if connection.lanes is not None:
+                try:
+                    connection.lanes.put_nowait(message)
+                except asyncio.QueueFull:
+                    dropped += 1
+                except Exception:
+                    job.unsubscribe(connection)
+                continue
+            delivery = job.deliveries.get(connection)
+            if delivery is not None:
+                dropped += 1
+                continue
+            delivery = asyncio.ensure_future(self.__deliver(job, connection, message))
+            job.deliveries[connection] = delivery
+        if dropped:
+            job.dropped += dropped
+            self.__count('scheduler.dropped_pushes', dropped)
+
+    @staticmethod
+    async def __deliver(job: Job, connection: WSConnection, message: typing.Dict[str, typing.Any]) -> None:
+        try:
+            await connection.send(message)
+        except Exception:
+            job.unsubscribe(connection)
+        finally:
+            job.deliveries.pop(connection, None)
+
+    def __count(self, name: str, value: int = 1) -> None:
+        if self.metrics is not None:
+            self.metrics.increment(name, value)
@@ -0,0 +1,282 @@
+import importlib
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+import typing
+import uvicorn
+from eventum_asgi.types import Scope, Receive, Send
+
+logger = logging.getLogger('uvicorn.error')
+
+SUPERVISOR_SIGNALS = (signal.SIGINT, signal.SIGTERM, signal.SIGHUP)
+
+
+def import_app(target: str) -> typing.Any:
+    """
+    Import an application given as 'module:attribute'.
+
+    Parameters:
+    - target (str): The import string, e.g. 'main:app' or 'package.module:factory.app'.
+
+    Returns:
+    - Any: The application object.
+
+    Raises:
+    - ValueError: If the import string is malformed.
+    """
+    module_name, _, attribute = target.partition(':')
+    if not module_name or not attribute:
+        raise ValueError(f"Application must be given as 'module:attribute', got {target!r}")
+    app = importlib.import_module(module_name)
+    for name in attribute.split('.'):
+        app = getattr(app, name)
+    return app
+
+
+def rss_bytes() -> int:
+    """
+    Get the resident memory of the current process in bytes.
+
+    Reads `/proc/self/statm` on Linux and falls back to the peak resident size reported by
+    `getrusage` elsewhere.
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048, reuse_port: bool = True) -> socket.socket:
+    """
+    Create a listening TCP socket inheritable by forked workers.
+
+    Parameters:
+    - host (str): The address to bind, IPv6 if it contains ':'.
+    - port (int): The port to bind.
+    - backlog (int): Length of the accept queue.
+    - reuse_port (bool): Set `SO_REUSEPORT`, so several sockets bound to the same address each
+      get their share of the incoming connections from the kernel.
+
+    Returns:
+    - socket.socket: The listening socket.
+    """
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if reuse_port:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind((host, port))
+        sock.listen(backlog)
+    except OSError:
+        sock.close()
+        raise
+    sock.set_inheritable(True)
+    return sock
+
+
+class WorkerServer(uvicorn.Server):
+    """
+    uvicorn server of one worker, stopping gracefully once it accepted `max_connections`
+    WebSocket connections or its resident memory exceeded `max_memory` bytes, so that the
+    supervisor replaces it with a fresh process. The thresholds are checked on the server tick,
+    every 100 ms, and the memory once per second.
+    """
+    def __init__(self,
+                 config: uvicorn.Config,
+                 max_connections: typing.Optional[int] = None,
+                 max_memory: typing.Optional[int] = None):
+        """
+        Initialize the server.
+
+        Parameters:
+        - config (uvicorn.Config): The configuration of the worker.
+        - max_connections (Optional[int]): Number of WebSocket connections after which the worker is recycled.
+        - max_memory (Optional[int]): Resident memory in bytes above which the worker is recycled.
+        """
+        super().__init__(config)
+        self.max_connections = max_connections
+        self.max_memory = max_memory
+        self.served = 0
+        self.recycle_reason: typing.Optional[str] = None
+
+    def count_connections(self, app: typing.Any) -> typing.Callable[[Scope, Receive, Send], typing.Awaitable[None]]:
+        """
+        Wrap an ASGI application so that the WebSocket connections it receives are counted.
+        """
+        async def counting_app(scope: Scope, receive: Receive, send: Send) -> None:
+            if scope['type'] == 'websocket':
+                self.served += 1
+            await app(scope, receive, send)
+        return counting_app
+
+    async def on_tick(self, counter: int) -> bool:
+        if self.recycle_reason is None:
+            if self.max_connections is not None and self.served >= self.max_connections:
+                self.recycle_reason = f'served {self.served} connections'
+            elif self.max_memory is not None and counter % 10 == 0 and rss_bytes() > self.max_memory:
+                self.recycle_reason = f'resident memory above {self.max_memory} bytes'
+            if self.recycle_reason is not None:
+                logger.info('Recycling worker [%d]: %s', os.getpid(), self.recycle_reason)
+        return await super().on_tick(counter) or self.recycle_reason is not None
+
+
+class Supervisor:
+    """
+    Pre-fork process manager serving an application with several uvicorn workers.
+
+    The supervisor binds one `SO_REUSEPORT` socket per worker slot before forking, so the kernel
+    balances new connections across the workers and a recycled worker's replacement takes over
+    its socket, with the connections still waiting in the accept queue. Without `SO_REUSEPORT`
+    all workers accept on a single shared socket. Each worker imports the application after the
+    fork and runs its own lifespan, so no event loop, thread pool or connection is shared. Exited
+    workers are restarted until the supervisor receives SIGINT or SIGTERM, which it forwards as
+    SIGTERM for a graceful shutdown; SIGHUP restarts every worker.
+    """
+    def __init__(self,
+                 app: typing.Union[str, typing.Any],
+                 host: str = '127.0.0.1',
+                 port: int = 8000,
+                 workers: int = 1,
+                 backlog: int = 2048,
+                 loop: str = 'auto',
+                 http: str = 'auto',
+                 ws: str = 'auto',
+                 reuse_port: bool = True,
+                 cpu_affinity: bool = False,
+                 max_connections: typing.Optional[int] = None,
+                 max_memory: typing.Optional[int] = None,
+                 graceful_timeout: typing.Optional[float] = 30.0,
+                 log_level: str = 'info'):
+        """
+        Initialize the supervisor.
+
+        Parameters:
+        - app (Union[str, Any]): The application or its 'module:attribute' import string. Prefer
+          the string: the module is then imported by each worker after the fork.
+        - host (str): The address to bind.
+        - port (int): The port to bind.
+        - workers (int): Number of worker processes.
+        - backlog (int): Length of the accept queue of each socket.
+        - loop (str): The uvicorn event loop, 'auto' using uvloop when it is installed.
+        - http (str): The uvicorn HTTP parser, 'auto' using httptools when it is installed.
+        - ws (str): The uvicorn WebSocket implementation.
+        - reuse_port (bool): Give every worker its own `SO_REUSEPORT` socket.
+        - cpu_affinity (bool): Pin worker `i` to the `i`-th available CPU (Linux only).
+        - max_connections (Optional[int]): Number of WebSocket connections after which a worker is recycled.
+        - max_memory (Optional[int]): Resident memory in bytes above which a worker is recycled.
+        - graceful_timeout (Optional[float]): Seconds a stopping worker waits for its connections.
+        - log_level (str): The uvicorn log level.
+        """
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.backlog = backlog
+        self.loop = loop
+        self.http = http
+        self.ws = ws
+        self.reuse_port = reuse_port and hasattr(socket, 'SO_REUSEPORT')
+        self.cpu_affinity = cpu_affinity and hasattr(os, 'sched_setaffinity')
+        self.max_connections = max_connections
+        self.max_memory = max_memory
+        self.graceful_timeout = graceful_timeout
+        self.log_level = log_level
+        self.sockets: typing.List[socket.socket] = []
+        self.__children: typing.Dict[int, typing.Tuple[int, float]] = {}
+        self.__stopping = False
+
+    def run(self) -> int:
+        """
+        Bind the sockets, fork the workers and supervise them until shutdown.
+
+        Returns:
+        - int: The exit code of the supervisor.
+        """
+        if self.reuse_port:
+            self.sockets = [bind_socket(self.host, self.port, self.backlog) for _ in range(self.workers)]
+        else:
+            self.sockets = [bind_socket(self.host, self.port, self.backlog, reuse_port=False)]
+        logger.info('Supervisor [%d] serving on %s:%d with %d worker(s)', os.getpid(), self.host, self.port, self.workers)
+
+        handlers = {sig: signal.signal(sig, self.__handle_signal) for sig in SUPERVISOR_SIGNALS}
+        try:
+            for index in range(self.workers):
+                self.__spawn(index)
+            while self.__children:
+                pid, status = os.wait()
+                index, started_at = self.__children.pop(pid, (None, 0.0))
+                if index is None or self.__stopping:
+                    continue
+                code = os.waitstatus_to_exitcode(status)
+                if code != 0 and time.monotonic() - started_at < 1:
+                    logger.error('Worker [%d] exited with code %d right after starting, restarting in 1s', pid, code)
+                    time.sleep(1)
+                self.__spawn(index)
+        finally:
+            for sig, handler in handlers.items():
+                signal.signal(sig, handler)
+            for sock in self.sockets:
+                sock.close()
+        logger.info('Supervisor [%d] stopped', os.getpid())
+        return 0
+
+    def __handle_signal(self, sig: int, frame: typing.Any) -> None:
+        if sig != signal.SIGHUP:
+            self.__stopping = True
+        for pid in list(self.__children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def __spawn(self, index: int) -> None:
+        pid = os.fork()
+        if pid:
+            self.__children[pid] = (index, time.monotonic())
+            return
+        code = 1
+        try:
+            for sig in SUPERVISOR_SIGNALS:
+                signal.signal(sig, signal.SIG_DFL)
+            sock = self.sockets[index % len(self.sockets)]
+            for other in self.sockets:
+                if other is not sock:
+                    other.close()
+            self.run_worker(index, sock)
+            code = 0
+        except BaseException:
+            logger.exception('Worker [%d] failed', os.getpid())
+        finally:
+            os._exit(code)
+
+    def run_worker(self, index: int, sock: socket.socket) -> None:
+        """
+        Serve the application on `sock` in the current process until it stops.
+
+        Parameters:
+        - index (int): The worker slot, used for the CPU affinity.
+        - sock (socket.socket): The listening socket of the worker.
+        """
+        if self.cpu_affinity:
+            cpus = sorted(os.sched_getaffinity(0))
+            os.sched_setaffinity(0, {cpus[index % len(cpus)]})
+        app = import_app(self.app) if isinstance(self.app, str) else self.app
+        config = uvicorn.Config(app=app,
+                                loop=self.loop,
+                                http=self.http,
+                                ws=self.ws,
+                                lifespan='on',
+                                backlog=self.backlog,
+                                timeout_graceful_shutdown=self.graceful_timeout,
+                                log_level=self.log_level)
+        server = WorkerServer(config, max_connections=self.max_connections, max_memory=self.max_memory)
+        config.app = server.count_connections(app)
+        logger.info('Worker [%d] started', os.getpid())
+        server.run(sockets=[sock])
@@ -0,0 +1,235 @@
+import asyncio
+import collections
+import secrets
+import time
+import typing
+from urllib.parse import parse_qs
+from eventum_asgi.metrics import Metrics
+
+if typing.TYPE_CHECKING:
+    from eventum_asgi.connection import WSConnection
+
+
+class ReplayBuffer:
+    """
+    Ring buffer of the last outbound frames of a session, bounded by count and by bytes.
+    """
+    __slots__ = ('max_events', 'max_bytes', 'frames', 'size', 'last_seq')
+
+    def __init__(self, max_events: int, max_bytes: int):
+        """
+        Initialize an empty buffer.
+
+        Parameters:
+        - max_events (int): Maximum number of frames kept.
+        - max_bytes (int): Maximum total size in bytes of the frames kept.
+        """
+        self.max_events = max_events
+        self.max_bytes = max_bytes
+        self.frames: typing.Deque[typing.Tuple[int, typing.Union[str, bytes], int]] = collections.deque()
+        self.size = 0
+        self.last_seq = 0
+
+    def next_seq(self) -> int:
+        """
+        Reserve the sequence number of the next frame.
+        """
+        self.last_seq += 1
+        return self.last_seq
+
+    def append(self, seq: int, frame: typing.Union[str, bytes]) -> None:
+        """
+        Keep a frame, evicting the oldest ones beyond the count and byte bounds.
+
+        Parameters:
+        - seq (int): The sequence number of the frame.
+        - frame (Union[str, bytes]): The serialized frame.
+        """
+        size = len(frame)
+        self.frames.append((seq, frame, size))
+        self.size += size
+        while self.frames and (len(self.frames) > self.max_events or self.size > self.max_bytes):
+            self.size -= self.frames.popleft()[2]
+
+    def since(self, last_seq: int) -> typing.Optional[typing.List[typing.Union[str, bytes]]]:
+        """
+        Get the frames sent after `last_seq`.
+
+        Parameters:
+        - last_seq (int): The last sequence number received by the client.
+
+        Returns:
+        - Optional[List[Union[str, bytes]]]: The missed frames, or None if some of them were
+          already evicted (or `last_seq` is unknown) and the session cannot be resumed.
+        """
+        if last_seq > self.last_seq or last_seq < 0:
+            return None
+        if last_seq == self.last_seq:
+            return []
+        if not self.frames or self.frames[0][0] > last_seq + 1:
+            return None
+        return [frame for seq, frame, _ in self.frames if seq > last_seq]
+
+
+class Session:
+    """
+    Resumable session: a token, a replay buffer and the connection currently attached to it.
+    """
+    __slots__ = ('token', 'buffer', 'connection')
+
+    def __init__(self, token: str, buffer: ReplayBuffer):
+        self.token = token
+        self.buffer = buffer
+        self.connection: typing.Optional['WSConnection'] = None
+
+
+class SessionManager:
+    """
+    Opt-in resumable sessions for clients that reconnect often.
+
+    `connection.accept(resumable=True)` issues a session token, sent in the `X-Eventum-Session`
+    response header and in a first `session` event. Events sent with `connection.send_resumable`
+    carry a `seq` number and are kept in the session's replay buffer. A client reconnecting with
+    its token and last sequence number (headers `X-Eventum-Session` / `X-Eventum-Last-Seq`, or
+    query parameters `session` / `last_seq` for browsers) gets only the events it missed. A
+    session still attached to a live connection cannot be resumed: presenting its token then
+    starts a new session, so a leaked token does not take over the socket of its owner.
+
+    Detached sessions expire `ttl` seconds after their connection closed. Since every session
+    gets the same TTL, detach order is expiry order and an insertion-ordered dict is the TTL index:
+    expired sessions are popped from its front on every attach and detach, and by a timer every
+    `sweep_interval` seconds so that an idle server frees them too. It is a lifespan resource
+    running that timer.
+    """
+    token_header = 'x-eventum-session'
+    seq_header = 'x-eventum-last-seq'
+
+    def __init__(self,
+                 max_events: int = 1000,
+                 max_bytes: int = 1024 * 1024,
+                 ttl: float = 60.0,
+                 sweep_interval: typing.Optional[float] = None,
+                 metrics: typing.Optional[Metrics] = None):
+        """
+        Initialize the manager.
+
+        Parameters:
+        - max_events (int): Maximum number of frames kept per session.
+        - max_bytes (int): Maximum size in bytes of the frames kept per session.
+        - ttl (float): Seconds a detached session stays resumable.
+        - sweep_interval (Optional[float]): Seconds between two sweeps of the expired sessions.
+          Defaults to `ttl`, at least one second.
+        - metrics (Optional[Metrics]): Registry receiving the session counters and gauges.
+        """
+        self.max_events = max_events
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval if sweep_interval is not None else max(ttl, 1.0)
+        self.metrics = metrics
+        self.sessions: typing.Dict[str, Session] = {}
+        self.__detached: typing.Dict[str, float] = {}
+        self.__sweep_handle: typing.Optional[asyncio.TimerHandle] = None
+        if metrics is not None:
+            metrics.register_gauge('sessions.total', lambda: len(self.sessions))
+            metrics.register_gauge('sessions.detached', lambda: len(self.__detached))
+            metrics.register_gauge('sessions.buffered_bytes',
+                                   lambda: sum(session.buffer.size for session in self.sessions.values()))
+
+    def attach(self, connection: 'WSConnection') -> typing.Tuple[Session, bool, typing.List[typing.Union[str, bytes]]]:
+        """
+        Resume the session presented by the connection, or create a new one if it is unknown,
+        expired, missing frames or still attached to a live connection.
+
+        Parameters:
+        - connection (WSConnection): The connection being accepted.
+
+        Returns:
+        - Tuple[Session, bool, List]: The session, whether it was resumed, and the missed frames.
+        """
+        self.expire()
+        token, last_seq = self.__credentials(connection)
+        session = self.sessions.get(token) if token else None
+        if session is not None and session.connection is not None and not session.connection.disconnected:
+            self.__count('sessions.rejected_attached')
+            session = None
+        missed = session.buffer.since(last_seq) if session is not None and last_seq is not None else None
+        if missed is None:
+            session = Session(secrets.token_urlsafe(16), ReplayBuffer(self.max_events, self.max_bytes))
+            self.sessions[session.token] = session
+            self.__count('sessions.created')
+            resumed = False
+            missed = []
+        else:
+            self.__detached.pop(session.token, None)
+            if session.connection is not None:
+                # Disconnected, its detach callback has not run yet
+                session.connection.session = None
+            self.__count('sessions.resumed')
+            resumed = True
+        session.connection = connection
+        connection.session = session
+        return session, resumed, missed
+
+    def detach(self, connection: 'WSConnection') -> None:
+        """
+        Detach the connection from its session and start the session TTL.
+
+        Parameters:
+        - connection (WSConnection): The closed connection.
+        """
+        session = connection.session
+        if session is None or session.connection is not connection:
+            return
+        session.connection = None
+        connection.session = None
+        self.__detached[session.token] = time.monotonic() + self.ttl
+        self.expire()
+
+    def expire(self) -> None:
+        """
+        Drop the detached sessions whose TTL elapsed.
+        """
+        now = time.monotonic()
+        while self.__detached:
+            token, deadline = next(iter(self.__detached.items()))
+            if deadline > now:
+                break
+            del self.__detached[token]
+            self.sessions.pop(token, None)
+            self.__count('sessions.expired')
+
+    async def startup(self) -> None:
+        """
+        Start the expiry timer. Called on `lifespan.startup`.
+        """
+        if self.__sweep_handle is None:
+            self.__sweep()
+
+    async def shutdown(self) -> None:
+        """
+        Stop the expiry timer. Called on `lifespan.shutdown`.
+        """
+        if self.__sweep_handle is not None:
+            self.__sweep_handle.cancel()
+            self.__sweep_handle = None
+
+    def __sweep(self) -> None:
+        self.expire()
+        self.__sweep_handle = asyncio.get_running_loop().call_later(self.sweep_interval, self.__sweep)
+
+    def __credentials(self, connection: 'WSConnection') -> typing.Tuple[typing.Optional[str], typing.Optional[int]]:
+        headers = connection.request_headers.model_extra or {}
+        token = headers.get(self.token_header)
+        last_seq = headers.get(self.seq_header)
+        if token is None:
+            query = parse_qs(connection.scope.get('query_string', b'').decode('latin-1'))
+            token = query.get('session', [None])[0]
+            last_seq = query.get('last_seq', [None])[0]
+        try:
+            return token, int(last_seq) if last_seq is not None else None
+        except ValueError:
+            return token, None
+
+    def __count(self, name: str) -> None:
+        if self.metrics is not None:
+            self.metrics.increment(name)
@@ -0,0 +1,47 @@
+import typing
+
+
+class State:
+    """
+    Attribute namespace holding shared resources such as database or HTTP connection pools.
+
+    `app.state` lives for the whole application and is filled by lifespan hooks; every
+    `connection.state` starts as a shallow copy of the ASGI lifespan state and can hold
+    per-connection values. Reading `state.pool` is a plain attribute lookup, so handlers
+    can use it on every event. Subclass it with annotations to get a typed state:
+
+        class AppState(State):
+            db: Pool
+
+        app = Eventum(state=AppState())
+    """
+    def __init__(self, state: typing.Optional[typing.Mapping[str, typing.Any]] = None):
+        """
+        Initialize the state with the given values.
+
+        Parameters:
+        - state (Optional[Mapping[str, Any]]): Initial attributes.
+        """
+        if state:
+            self.__dict__.update(state)
+
+    def __getattr__(self, name: str) -> typing.Any:
+        raise AttributeError(f"'{self.__class__.__name__}' object has no attribute '{name}'")
+
+    def update(self, values: typing.Mapping[str, typing.Any]) -> None:
+        """
+        Set several attributes at once.
+
+        Parameters:
+        - values (Mapping[str, Any]): The attributes to set.
+        """
+        self.__dict__.update(values)
+
+    def to_dict(self) -> typing.Dict[str, typing.Any]:
+        """
+        Get a shallow copy of the attributes as a dictionary.
+        """
+        return dict(self.__dict__)
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({self.__dict__!r})'
@@ -0,0 +1,376 @@
+import asyncio
+import inspect
+import struct
+import traceback
+import typing
+from eventum_asgi.exceptions import DisconnectedException, StreamAbortedException
+from eventum_asgi.replies import detached_context
+
+if typing.TYPE_CHECKING:
+    from eventum_asgi.connection import WSConnection
+
+STREAM_MAGIC = 0xE5
+"""
+First byte of every stream chunk frame. Binary frames starting with another byte are events.
+"""
+CHUNK_HEADER = struct.Struct('!BIIB')
+"""
+Header of a stream chunk frame: magic, stream id (u32), chunk sequence number (u32), flags (u8).
+The chunk payload follows the header.
+"""
+FLAG_END = 0x01
+FLAG_ABORT = 0x02
+CREDIT_EVENT = 'stream.credit'
+"""
+Event granting credit to the sender of a stream: `{"event": "stream.credit", "stream": id, "credit": n}`
+allows `n` more chunk frames on the stream.
+"""
+
+BytesLike = typing.Union[bytes, bytearray, memoryview]
+StreamSource = typing.Union[
+    BytesLike,
+    typing.AsyncIterable[BytesLike],
+    typing.Iterable[BytesLike],
+    typing.BinaryIO,
+]
+
+
+def encode_chunk(stream_id: int, seq: int, payload: BytesLike = b'', flags: int = 0) -> bytes:
+    """
+    Build a stream chunk frame.
+
+    Parameters:
+    - stream_id (int): The stream id.
+    - seq (int): The sequence number of the chunk, starting at 0.
+    - payload (BytesLike): The chunk data.
+    - flags (int): `FLAG_END` on the last chunk, `FLAG_ABORT` to abort the stream.
+
+    Returns:
+    - bytes: The frame.
+    """
+    return CHUNK_HEADER.pack(STREAM_MAGIC, stream_id, seq, flags) + payload
+
+
+def decode_chunk(frame: bytes) -> typing.Tuple[int, int, int, memoryview]:
+    """
+    Parse a stream chunk frame without copying its payload.
+
+    Parameters:
+    - frame (bytes): The frame.
+
+    Returns:
+    - Tuple[int, int, int, memoryview]: The stream id, sequence number, flags and a view of the payload.
+    """
+    _, stream_id, seq, flags = CHUNK_HEADER.unpack_from(frame)
+    return stream_id, seq, flags, memoryview(frame)[CHUNK_HEADER.size:]
+
+
+def is_chunk(data: typing.Any) -> bool:
+    """
+    Check whether a received message is a stream chunk frame.
+    """
+    return type(data) is bytes and len(data) >= CHUNK_HEADER.size and data[0] == STREAM_MAGIC
+
+
+class IncomingStream:
+    """
+    Chunks of a stream sent by the client, iterated as memoryviews over the received frames.
+
+    The client may send as many chunks as it was granted credit for. The stream grants `window`
+    chunks when it is opened and grants more as chunks are consumed, so at most `window` chunks
+    are ever buffered. Consume it outside of the event handler that opened it (e.g. in a task):
+    chunks are delivered by the connection's event loop, which waits for that handler.
+    """
+    def __init__(self, streams: 'ConnectionStreams', stream_id: int, window: int):
+        self.streams = streams
+        self.stream_id = stream_id
+        self.window = window
+        self.received = 0
+        self.__queue: asyncio.Queue = asyncio.Queue()
+        self.__credit = 0
+        self.__consumed = 0
+        self.__next_seq = 0
+        self.__finished = False
+
+    def __aiter__(self) -> 'IncomingStream':
+        return self
+
+    async def __anext__(self) -> memoryview:
+        if self.__finished:
+            raise StopAsyncIteration
+        item = await self.__queue.get()
+        if isinstance(item, Exception):
+            self.__finished = True
+            raise item
+        flags, payload = item
+        if flags & FLAG_END:
+            self.__finished = True
+        else:
+            self.__consumed += 1
+            if self.__consumed >= max(1, self.window // 2):
+                await self.grant(self.__consumed)
+                self.__consumed = 0
+        if not payload and self.__finished:
+            raise StopAsyncIteration
+        return payload
+
+    async def grant(self, credit: int) -> None:
+        """
+        Allow the client to send `credit` more chunks.
+        """
+        self.__credit += credit
+        await self.streams.connection.send_json({'event': CREDIT_EVENT, 'stream': self.stream_id, 'credit': credit},
+                                                priority='high')
+
+    async def to_file(self, file: typing.BinaryIO) -> int:
+        """
+        Write the stream to a file (e.g. a `tempfile.TemporaryFile`) chunk by chunk.
+
+        Returns:
+        - int: The number of bytes written.
+        """
+        size = 0
+        async for chunk in self:
+            file.write(chunk)
+            size += len(chunk)
+        return size
+
+    async def readinto(self, buffer: typing.Union[bytearray, memoryview]) -> int:
+        """
+        Copy the stream into a preallocated buffer.
+
+        Returns:
+        - int: The number of bytes written.
+
+        Raises:
+        - StreamAbortedException: If the stream does not fit into the buffer.
+        """
+        view = memoryview(buffer)
+        size = 0
+        async for chunk in self:
+            end = size + len(chunk)
+            if end > len(view):
+                self.streams.abort_incoming(self.stream_id, 'Buffer too small')
+                raise StreamAbortedException(self.stream_id, 'Buffer too small')
+            view[size:end] = chunk
+            size = end
+        return size
+
+    def _feed(self, seq: int, flags: int, payload: memoryview) -> bool:
+        if flags & FLAG_ABORT:
+            self._fail(StreamAbortedException(self.stream_id, 'Aborted by the client'))
+            return False
+        if seq != self.__next_seq:
+            self._fail(StreamAbortedException(self.stream_id, f'Expected chunk {self.__next_seq}, got {seq}'))
+            return False
+        if self.__credit <= 0:
+            self._fail(StreamAbortedException(self.stream_id, 'Client exceeded its credit'))
+            return False
+        self.__next_seq += 1
+        self.__credit -= 1
+        self.received += len(payload)
+        self.__queue.put_nowait((flags, payload))
+        return not flags & FLAG_END
+
+    def _fail(self, exception: Exception) -> None:
+        self.__queue.put_nowait(exception)
+
+
+class OutgoingStream:
+    """
+    Stream being pushed to the client by a background task. Await it to wait for its end.
+    """
+    def __init__(self, stream_id: int, window: int):
+        self.stream_id = stream_id
+        self.sent = 0
+        self.task: typing.Optional[asyncio.Task] = None
+        self.__credit = window
+        self.__credit_granted = asyncio.Event()
+
+    def grant(self, credit: int) -> None:
+        """
+        Add credit received from the client.
+        """
+        self.__credit += credit
+        self.__credit_granted.set()
+
+    async def _acquire(self) -> None:
+        while self.__credit <= 0:
+            self.__credit_granted.clear()
+            await self.__credit_granted.wait()
+        self.__credit -= 1
+
+    def abort(self) -> None:
+        """
+        Stop sending the stream. The client receives a chunk with `FLAG_ABORT`.
+        """
+        if self.task is not None:
+            self.task.cancel()
+
+    def __await__(self) -> typing.Generator[typing.Any, None, int]:
+        return self.task.__await__()
+
+
+class ConnectionStreams:
+    """
+    Binary streams of one connection, in both directions.
+
+    Chunks travel in binary frames prefixed with `CHUNK_HEADER`, so they interleave with the
+    regular events of the connection, on the low lane when priority lanes are enabled. Flow control is credit based: a sender may only send as
+    many chunks as its peer granted with `stream.credit` events.
+    """
+    def __init__(self, connection: 'WSConnection', chunk_size: int = 64 * 1024, window: int = 8):
+        """
+        Initialize the streams of a connection.
+
+        Parameters:
+        - connection (WSConnection): The connection.
+        - chunk_size (int): Default size in bytes of the chunks sent to the client.
+        - window (int): Default number of chunks in flight per stream, in both directions.
+        """
+        self.connection = connection
+        self.chunk_size = chunk_size
+        self.window = window
+        self.incoming: typing.Dict[int, IncomingStream] = {}
+        self.outgoing: typing.Dict[int, OutgoingStream] = {}
+        self.__next_id = 1
+        connection.add_disconnect_callback(self.close)
+
+    def send(self,
+             source: StreamSource,
+             chunk_size: typing.Optional[int] = None,
+             window: typing.Optional[int] = None
+             ) -> OutgoingStream:
+        """
+        Start pushing a stream to the client in a background task.
+
+        Parameters:
+        - source (StreamSource): Bytes-like data (sliced without copying), a file object opened in
+          binary mode, or a sync or async iterable of bytes-like chunks.
+        - chunk_size (Optional[int]): Maximum payload size of a chunk frame.
+        - window (Optional[int]): Number of chunks sent before waiting for credit from the client.
+
+        Returns:
+        - OutgoingStream: The stream. Its `stream_id` identifies its chunks on the client.
+        """
+        stream = OutgoingStream(self.__next_id, window if window is not None else self.window)
+        self.__next_id += 1
+        self.outgoing[stream.stream_id] = stream
+        stream.task = asyncio.get_running_loop().create_task(self.__pump(stream, source, chunk_size or self.chunk_size),
+                                                             context=detached_context())
+        stream.task.add_done_callback(self.__report)
+        return stream
+
+    async def receive(self, stream_id: int, window: typing.Optional[int] = None) -> IncomingStream:
+        """
+        Open a stream announced by the client and grant it its initial credit.
+
+        Parameters:
+        - stream_id (int): The id chosen by the client.
+        - window (Optional[int]): Number of chunks the client may send ahead of consumption.
+
+        Returns:
+        - IncomingStream: The stream, to iterate over.
+        """
+        stream = IncomingStream(self, stream_id, window if window is not None else self.window)
+        self.incoming[stream_id] = stream
+        await stream.grant(stream.window)
+        return stream
+
+    def feed(self, frame: bytes) -> None:
+        """
+        Deliver a chunk frame received from the client. Called by the event loop.
+        """
+        stream_id, seq, flags, payload = decode_chunk(frame)
+        stream = self.incoming.get(stream_id)
+        if stream is not None and not stream._feed(seq, flags, payload):
+            del self.incoming[stream_id]
+
+    def grant(self, stream_id: int, credit: int) -> None:
+        """
+        Apply a `stream.credit` event received from the client.
+        """
+        stream = self.outgoing.get(stream_id)
+        if stream is not None:
+            stream.grant(credit)
+
+    def abort_incoming(self, stream_id: int, reason: str = 'Aborted') -> None:
+        """
+        Stop accepting chunks of an incoming stream.
+        """
+        stream = self.incoming.pop(stream_id, None)
+        if stream is not None:
+            stream._fail(StreamAbortedException(stream_id, reason))
+
+    def close(self, connection: 'WSConnection') -> None:
+        """
+        Abort every stream of the connection. Registered as a disconnect callback.
+        """
+        for stream in self.outgoing.values():
+            stream.abort()
+        for stream_id, stream in self.incoming.items():
+            stream._fail(DisconnectedException(connection_id=connection.id))
+        self.incoming.clear()
+
+    @staticmethod
+    async def handle_credit(connection: 'WSConnection', event: typing.Dict[str, typing.Any]) -> None:
+        """
+        Event handler of `stream.credit` events, registered by the application.
+        """
+        connection.streams.grant(event['stream'], event['credit'])
+
+    async def __pump(self, stream: OutgoingStream, source: StreamSource, chunk_size: int) -> int:
+        send = self.connection.send_bytes
+        stream_id = stream.stream_id
+        seq = 0
+        previous = None
+        try:
+            async for chunk in self.__chunks(source, chunk_size):
+                if previous is not None:
+                    await stream._acquire()
+                    await send(encode_chunk(stream_id, seq, previous), priority='low')
+                    stream.sent += len(previous)
+                    seq += 1
+                previous = chunk
+            await stream._acquire()
+            await send(encode_chunk(stream_id, seq, previous or b'', FLAG_END), priority='low')
+            stream.sent += len(previous or b'')
+            return stream.sent
+        except BaseException:
+            try:
+                await asyncio.shield(send(encode_chunk(stream_id, seq, flags=FLAG_ABORT), priority='low'))
+            except Exception:
+                pass
+            raise
+        finally:
+            self.outgoing.pop(stream_id, None)
+
+    @staticmethod
+    def __report(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            traceback.print_exception(task.exception())
+
+    @staticmethod
+    async def __chunks(source: StreamSource, chunk_size: int) -> typing.AsyncIterator[BytesLike]:
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            view = memoryview(source)
+            for start in range(0, len(view), chunk_size):
+                yield view[start:start + chunk_size]
+        elif hasattr(source, 'read'):
+            while True:
+                data = source.read(chunk_size)
+                if inspect.isawaitable(data):
+                    data = await data
+                if not data:
+                    break
+                yield data
+        elif hasattr(source, '__aiter__'):
+            async for item in source:
+                view = memoryview(item)
+                for start in range(0, len(view), chunk_size):
+                    yield view[start:start + chunk_size]
+        else:
+            for item in source:
+                view = memoryview(item)
+                for start in range(0, len(view), chunk_size):
+                    yield view[start:start + chunk_size]
@@ -0,0 +1,329 @@
+import asyncio
+import collections
+import typing
+import orjson
+from eventum_asgi.connection import WSConnection
+from eventum_asgi.metrics import Metrics
+from eventum_asgi.replies import detached_context
+
+JsonPatch = typing.List[typing.Dict[str, typing.Any]]
+
+ACK_EVENT = 'sync.ack'
+"""
+Event acknowledging a state version: `{"event": "sync.ack", "channel": name, "version": n}`.
+"""
+
+
+def _escape(key: typing.Any) -> str:
+    return str(key).replace('~', '~0').replace('/', '~1')
+
+
+def _unescape(token: str) -> str:
+    return token.replace('~1', '/').replace('~0', '~')
+
+
+def json_diff(old: typing.Any, new: typing.Any, path: str = '') -> JsonPatch:
+    """
+    Compute an RFC 6902 JSON Patch turning `old` into `new`.
+
+    Objects are compared key by key and arrays index by index (with additions and removals at
+    their end), so a change deep inside a large document yields a patch of the size of the change.
+
+    Parameters:
+    - old (Any): The previous JSON document.
+    - new (Any): The new JSON document.
+    - path (str): JSON Pointer of both documents, '' for the root.
+
+    Returns:
+    - JsonPatch: The list of operations.
+    """
+    patch: JsonPatch = []
+    _diff(old, new, path, patch)
+    return patch
+
+
+def _diff(old: typing.Any, new: typing.Any, path: str, patch: JsonPatch) -> None:
+    if old is new:
+        return
+    if type(old) is dict and type(new) is dict:
+        for key in old:
+            if key not in new:
+                patch.append({'op': 'remove', 'path': f'{path}/{_escape(key)}'})
+        for key, value in new.items():
+            if key in old:
+                _diff(old[key], value, f'{path}/{_escape(key)}', patch)
+            else:
+                patch.append({'op': 'add', 'path': f'{path}/{_escape(key)}', 'value': value})
+    elif type(old) is list and type(new) is list:
+        common = min(len(old), len(new))
+        for index in range(common):
+            _diff(old[index], new[index], f'{path}/{index}', patch)
+        for index in range(common, len(new)):
+            patch.append({'op': 'add', 'path': f'{path}/{index}', 'value': new[index]})
+        for index in range(len(old) - 1, common - 1, -1):
+            patch.append({'op': 'remove', 'path': f'{path}/{index}'})
+    elif type(old) is not type(new) or old != new:
+        patch.append({'op': 'replace', 'path': path, 'value': new})
+
+
+def apply_patch(document: typing.Any, patch: JsonPatch) -> typing.Any:
+    """
+    Apply the `add`, `remove` and `replace` operations of a JSON Patch in place.
+
+    Parameters:
+    - document (Any): The JSON document.
+    - patch (JsonPatch): The operations.
+
+    Returns:
+    - Any: The patched document, which is a new object only when the root is replaced.
+    """
+    for operation in patch:
+        path = operation['path']
+        if not path:
+            document = operation['value']
+            continue
+        *parents, last = [_unescape(token) for token in path[1:].split('/')]
+        target = document
+        for token in parents:
+            target = target[int(token)] if type(target) is list else target[token]
+        if type(target) is list:
+            index = len(target) if last == '-' else int(last)
+            if operation['op'] == 'add':
+                target.insert(index, operation['value'])
+            elif operation['op'] == 'remove':
+                del target[index]
+            else:
+                target[index] = operation['value']
+        elif operation['op'] == 'remove':
+            del target[last]
+        else:
+            target[last] = operation['value']
+    return document
+
+
+class SyncChannel:
+    """
+    Versioned JSON state replicated to subscribed connections.
+
+    A subscriber gets a `sync.snapshot` message with the whole state, then a `sync.delta` message
+    with a JSON Patch (`from` and `version` bound it) on every change. The patch of each version is
+    computed once and its message serialized once for every subscriber at the same version.
+
+    Clients acknowledge the versions they applied with `sync.ack` events. A subscriber more than
+    `max_unacked` versions ahead of its last acknowledgement is paused; on its next acknowledgement
+    it catches up with one patch covering every missed version, or with a new snapshot when those
+    versions fell out of the `history` window.
+
+    Changes never wait for a socket: frames are queued on the priority lanes of a subscriber, or
+    sent by one delivery task per subscriber. A subscriber whose lane is full or whose previous
+    frame is still being delivered is paused the same way, and caught up once it drains.
+    """
+    def __init__(self,
+                 name: str,
+                 state: typing.Any = None,
+                 history: int = 64,
+                 max_unacked: int = 32,
+                 metrics: typing.Optional[Metrics] = None):
+        """
+        Initialize the channel at version 0.
+
+        Parameters:
+        - name (str): The channel name, sent in every message.
+        - state (Any): The initial JSON state.
+        - history (int): Number of past patches kept to catch lagging subscribers up.
+        - max_unacked (int): Number of versions sent ahead of a subscriber's acknowledgement.
+        - metrics (Optional[Metrics]): Registry receiving the sync counters.
+        """
+        self.name = name
+        self.version = 0
+        self.max_unacked = max_unacked
+        self.metrics = metrics
+        self.subscribers: typing.Dict[WSConnection, typing.List[int]] = {}
+        self.__serialized = orjson.dumps(state)
+        self.state = orjson.loads(self.__serialized)
+        self.__name_json = orjson.dumps(name).decode('utf-8')
+        self.__history: typing.Deque[typing.Tuple[int, JsonPatch]] = collections.deque(maxlen=history)
+        self.__deltas: typing.Dict[int, str] = {}
+        self.__snapshot: typing.Optional[str] = None
+        self.__deliveries: typing.Dict[WSConnection, asyncio.Task] = {}
+
+    async def subscribe(self, connection: WSConnection) -> None:
+        """
+        Send the current snapshot to the connection and keep it updated until it unsubscribes
+        or disconnects.
+        """
+        if connection in self.subscribers:
+            return
+        version = self.version
+        try:
+            await connection.send({'type': 'websocket.send', 'text': self.__snapshot_frame()})
+        except Exception:
+            return
+        self.__count('sync.snapshots_sent')
+        connection.add_disconnect_callback(self.unsubscribe)
+        cursor = self.subscribers[connection] = [version, version]
+        self.__update(connection, cursor)
+
+    def unsubscribe(self, connection: WSConnection) -> None:
+        """
+        Stop updating the connection.
+        """
+        self.subscribers.pop(connection, None)
+
+    async def set(self, state: typing.Any) -> int:
+        """
+        Replace the state and send the resulting delta to the subscribers.
+
+        The state is copied through its JSON serialization, so the caller may keep mutating it.
+
+        Parameters:
+        - state (Any): The new JSON state.
+
+        Returns:
+        - int: The new version, unchanged if the state did not change.
+        """
+        serialized = orjson.dumps(state)
+        new_state = orjson.loads(serialized)
+        patch = json_diff(self.state, new_state)
+        if not patch:
+            return self.version
+        if self.metrics is not None:
+            self.metrics.increment('sync.diffs_computed')
+        self.version += 1
+        self.state = new_state
+        self.__serialized = serialized
+        self.__history.append((self.version, patch))
+        self.__deltas = {}
+        self.__snapshot = None
+
+        for connection, cursor in list(self.subscribers.items()):
+            if cursor[0] - cursor[1] < self.max_unacked:
+                self.__update(connection, cursor)
+        return self.version
+
+    async def ack(self, connection: WSConnection, version: int) -> None:
+        """
+        Record a version acknowledged by a subscriber and resume it if it was paused.
+        """
+        cursor = self.subscribers.get(connection)
+        if cursor is None or not cursor[1] < version <= cursor[0]:
+            return
+        cursor[1] = version
+        if cursor[0] - cursor[1] < self.max_unacked:
+            self.__update(connection, cursor)
+
+    def __update(self, connection: WSConnection, cursor: typing.List[int]) -> None:
+        sent = cursor[0]
+        if sent == self.version:
+            return
+        if connection in self.__deliveries:
+            self.__count('sync.paused')
+            return
+        frame = self.__delta_frame(sent)
+        if frame is None:
+            frame, counter = self.__snapshot_frame(), 'sync.snapshots_sent'
+        else:
+            counter = 'sync.deltas_sent'
+        message = {'type': 'websocket.send', 'text': frame}
+        if connection.lanes is not None:
+            try:
+                connection.lanes.put_nowait(message)
+            except asyncio.QueueFull:
+                self.__count('sync.paused')
+                return
+            except Exception:
+                self.unsubscribe(connection)
+                return
+            cursor[0] = self.version
+            self.__count(counter)
+            return
+        cursor[0] = self.version
+        self.__deliveries[connection] = asyncio.get_running_loop().create_task(
+            self.__deliver(connection, message, counter), context=detached_context()
+        )
+
+    def __delta_frame(self, since: int) -> typing.Optional[str]:
+        frame = self.__deltas.get(since)
+        if frame is not None:
+            return frame
+        if not self.__history or self.__history[0][0] > since + 1:
+            return None
+        patch = [operation for version, ops in self.__history if version > since for operation in ops]
+        frame = self.__deltas[since] = orjson.dumps({
+            'event': 'sync.delta',
+            'channel': self.name,
+            'from': since,
+            'version': self.version,
+            'patch': patch
+        }).decode('utf-8')
+        return frame
+
+    def __snapshot_frame(self) -> str:
+        if self.__snapshot is None:
+            self.__snapshot = (
+                f'{{"event":"sync.snapshot","channel":{self.__name_json},"version":{self.version},"state":'
+                f'{self.__serialized.decode("utf-8")}}}'
+            )
+        return self.__snapshot
+
+    async def __deliver(self, connection: WSConnection, message: typing.Dict[str, typing.Any], counter: str) -> None:
+        try:
+            await connection.send(message)
+        except Exception:
+            self.unsubscribe(connection)
+            return
+        finally:
+            self.__deliveries.pop(connection, None)
+        self.__count(counter)
+        cursor = self.subscribers.get(connection)
+        if cursor is not None and cursor[0] - cursor[1] < self.max_unacked:
+            self.__update(connection, cursor)
+
+    def __count(self, name: str) -> None:
+        if self.metrics is not None:
+            self.metrics.increment(name)
+
+
+class SyncHub:
+    """
+    Registry of the state-sync channels of an application, available as `app.sync`.
+    """
+    def __init__(self, history: int = 64, max_unacked: int = 32, metrics: typing.Optional[Metrics] = None):
+        """
+        Initialize an empty registry.
+
+        Parameters:
+        - history (int): Number of past patches kept per channel.
+        - max_unacked (int): Number of versions sent ahead of a subscriber's acknowledgement.
+        - metrics (Optional[Metrics]): Registry receiving the sync counters.
+        """
+        self.history = history
+        self.max_unacked = max_unacked
+        self.metrics = metrics
+        self.channels: typing.Dict[str, SyncChannel] = {}
+        if metrics is not None:
+            metrics.register_gauge('sync.channels', lambda: len(self.channels))
+
+    def channel(self, name: str, state: typing.Any = None) -> SyncChannel:
+        """
+        Get a channel, creating it with `state` if it does not exist.
+        """
+        channel = self.channels.get(name)
+        if channel is None:
+            channel = self.channels[name] = SyncChannel(name, state, history=self.history,
+                                                        max_unacked=self.max_unacked, metrics=self.metrics)
+        return channel
+
+    def remove(self, name: str) -> None:
+        """
+        Forget a channel and its subscribers.
+        """
+        self.channels.pop(name, None)
+
+    async def handle_ack(self, connection: WSConnection, event: typing.Dict[str, typing.Any]) -> None:
+        """
+        Event handler of `sync.ack` events, registered by the application.
+        """
+        channel = self.channels.get(event.get('channel'))
+        if channel is not None:
+            await channel.ack(connection, event.get('version', 0))
@@ -1,10 +1,13 @@
+import base64
+import os
 import typing
+import orjson
 import pydantic
 import uvicorn
 import websockets
 import asyncio
 from eventum_asgi.app import Eventum
-from eventum_asgi.types import Handler
+from eventum_asgi.types import Handler, Offload
 
 class CustomServer(uvicorn.Server):
     def __init__(self, config):
@@ -22,6 +25,8 @@ class CustomServer(uvicorn.Server):
         Start the server asynchronously.
         """
         self._serve_task = asyncio.create_task(self.serve())
+        while not self.started and not self._serve_task.done():
+            await asyncio.sleep(0.01)
 
     async def stop(self):
         """
@@ -81,7 +86,8 @@ class TestClient:
     def add_event(self,
                   event: str,
                   handler: Handler,
-                  validator: typing.Optional[typing.Type[pydantic.BaseModel]] = None
+                  validator: typing.Optional[typing.Type[pydantic.BaseModel]] = None,
+                  offload: Offload = None
                   ) -> None:
         """
         Add an event to the application.
@@ -90,10 +96,12 @@ class TestClient:
         - event (str): The event name.
         - handler (Handler): The handler for the event.
         - validator (typing.Optional[typing.Type[pydantic.BaseModel]]): The validator for the event.
+        - offload (Offload): The offload mode of the handler.
         """
         self.app.add_event(event=event,
                            handler=handler,
-                           validator=validator)
+                           validator=validator,
+                           offload=offload)
 
     async def connect(self, url, path, extra_headers: typing.Dict[str, str] = None):
         """
@@ -108,3 +116,324 @@ class TestClient:
         return await websockets.connect(uri, extra_headers=extra_headers)
 
 
+
+
+class WebSocketRejected(Exception):
+    """
+    Exception raised by the in-memory transport when the application answers the handshake
+    with an HTTP response (or a close) instead of accepting the connection.
+    """
+    def __init__(self, status_code: int, headers: typing.List[typing.Tuple[bytes, bytes]], body: bytes):
+        """
+        Initialize the exception with the given status code, headers, and body.
+        """
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+        super().__init__(f'Handshake rejected with status code: {self.status_code}, details: {self.body}')
+
+
+class ConnectionClosed(Exception):
+    """
+    Exception raised by the in-memory transport when the connection is closed.
+    """
+    def __init__(self, code: int, reason: str = ''):
+        """
+        Initialize the exception with the given close code and reason.
+        """
+        self.code = code
+        self.reason = reason
+        super().__init__(f'Connection closed with code: {self.code}, reason: {self.reason}')
+
+
+class _CaseInsensitiveHeaders(dict):
+    """
+    Minimal case-insensitive header mapping mirroring the lookups of `websockets` headers.
+    """
+    def __init__(self, raw_headers: typing.Iterable[typing.Tuple[bytes, bytes]] = ()):
+        super().__init__()
+        for key, value in raw_headers:
+            self[key.decode('latin-1')] = value.decode('latin-1')
+
+    def __setitem__(self, key: str, value: str) -> None:
+        super().__setitem__(key.lower(), value)
+
+    def __getitem__(self, key: str) -> str:
+        return super().__getitem__(key.lower())
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and super().__contains__(key.lower())
+
+    def get(self, key: str, default: typing.Any = None) -> typing.Any:
+        return super().get(key.lower(), default)
+
+
+class InMemoryWebSocket:
+    """
+    Client side of a WebSocket connection served by calling the application's `__call__` directly.
+
+    The application receives from and sends to two `asyncio.Queue` objects, so no socket, server
+    or extra task besides the application coroutine itself is involved. The API mirrors the
+    `websockets` client connection returned by `TestClient.connect` (`send`, `recv`, `close`,
+    `state`, `request_headers`, `response_headers`).
+    """
+    CONNECTING, OPEN, CLOSING, CLOSED = 0, 1, 2, 3
+
+    _APP_EXITED = object()
+
+    def __init__(self, app: Eventum, scope: typing.Dict[str, typing.Any], record_messages: bool = True):
+        """
+        Initialize the in-memory WebSocket.
+
+        Parameters:
+        - app (Eventum): The ASGI application to call.
+        - scope (dict): The ASGI websocket scope passed to the application.
+        - record_messages (bool): Whether to keep every raw ASGI message in `messages_to_app`
+          and `messages_from_app`. Disable it when simulating many clients.
+        """
+        self.app = app
+        self.scope = scope
+        self.state = self.CONNECTING
+        self.request_headers = _CaseInsensitiveHeaders(scope['headers'])
+        self.response_headers = _CaseInsensitiveHeaders()
+        self.subprotocol: typing.Optional[str] = None
+        self.close_code: typing.Optional[int] = None
+        self.close_reason: str = ''
+        self.messages_to_app: typing.List[typing.Dict[str, typing.Any]] = []
+        self.messages_from_app: typing.List[typing.Dict[str, typing.Any]] = []
+        self.__record_messages = record_messages
+        self.__to_app: asyncio.Queue = asyncio.Queue()
+        self.__from_app: asyncio.Queue = asyncio.Queue()
+        self.__app_task: typing.Optional[asyncio.Task] = None
+
+    async def _open(self) -> None:
+        """
+        Run the handshake: start the application and wait for it to accept or reject the connection.
+        """
+        self._put_to_app({'type': 'websocket.connect'})
+        self.__app_task = asyncio.create_task(self.app(self.scope, self.__receive, self.__send))
+        self.__app_task.add_done_callback(lambda _: self.__from_app.put_nowait(self._APP_EXITED))
+
+        message = await self.__next_from_app()
+        if message['type'] == 'websocket.accept':
+            self.state = self.OPEN
+            self.subprotocol = message.get('subprotocol')
+            for key, value in message.get('headers') or []:
+                self.response_headers[key.decode('latin-1')] = value.decode('latin-1')
+        elif message['type'] == 'websocket.http.response.start':
+            body = b''
+            while True:
+                body_message = await self.__next_from_app()
+                body += body_message.get('body', b'')
+                if not body_message.get('more_body', False):
+                    break
+            await self.__abort()
+            raise WebSocketRejected(message['status'], message.get('headers', []), body)
+        else:
+            await self.__abort()
+            raise WebSocketRejected(403, [], b'')
+
+    async def send(self, message: typing.Union[str, bytes]) -> None:
+        """
+        Send a text or binary frame to the application.
+        """
+        if self.state != self.OPEN:
+            raise ConnectionClosed(self.close_code or 1006, self.close_reason)
+        if isinstance(message, str):
+            self._put_to_app({'type': 'websocket.receive', 'text': message})
+        else:
+            self._put_to_app({'type': 'websocket.receive', 'bytes': bytes(message)})
+
+    async def send_json(self, data: typing.Any) -> None:
+        """
+        Serialize `data` with orjson and send it as a text frame.
+        """
+        await self.send(orjson.dumps(data).decode('utf-8'))
+
+    async def recv(self) -> typing.Union[str, bytes]:
+        """
+        Receive the next text or binary frame sent by the application.
+
+        Raises:
+        - ConnectionClosed: If the application closed the connection or returned.
+        """
+        if self.state == self.CLOSED and self.__from_app.empty():
+            raise ConnectionClosed(self.close_code or 1006, self.close_reason)
+        message = await self.__next_from_app()
+        if message['type'] == 'websocket.send':
+            text = message.get('text')
+            return text if text is not None else message.get('bytes')
+        if message['type'] == 'websocket.close':
+            self.close_code = message.get('code', 1000)
+            self.close_reason = message.get('reason') or ''
+            await self.__abort(code=self.close_code)
+        raise ConnectionClosed(self.close_code or 1006, self.close_reason)
+
+    async def receive_json(self) -> typing.Any:
+        """
+        Receive the next frame and decode it with orjson.
+        """
+        return orjson.loads(await self.recv())
+
+    async def close(self, code: int = 1000, reason: str = '') -> None:
+        """
+        Close the connection from the client side and wait for the application to finish.
+        """
+        if self.state == self.CLOSED:
+            return
+        self.close_code = code
+        self.close_reason = reason
+        await self.__abort(code=code, reason=reason)
+
+    def _put_to_app(self, message: typing.Dict[str, typing.Any]) -> None:
+        if self.__record_messages:
+            self.messages_to_app.append(message)
+        self.__to_app.put_nowait(message)
+
+    async def __receive(self) -> typing.Dict[str, typing.Any]:
+        return await self.__to_app.get()
+
+    async def __send(self, message: typing.Dict[str, typing.Any]) -> None:
+        if self.__record_messages:
+            self.messages_from_app.append(message)
+        self.__from_app.put_nowait(message)
+
+    async def __next_from_app(self) -> typing.Dict[str, typing.Any]:
+        message = await self.__from_app.get()
+        if message is self._APP_EXITED:
+            self.state = self.CLOSED
+            exception = self.__app_task.exception() if not self.__app_task.cancelled() else None
+            if exception is not None:
+                self.close_code = 1011
+                raise ConnectionClosed(1011, 'Application error') from exception
+            if self.close_code is None:
+                self.close_code = 1000
+            raise ConnectionClosed(self.close_code, self.close_reason)
+        return message
+
+    async def __abort(self, code: int = 1000, reason: str = '') -> None:
+        """
+        Deliver `websocket.disconnect` to the application and wait for it to return.
+        """
+        self.state = self.CLOSED
+        if self.__app_task is None or self.__app_task.done():
+            return
+        self._put_to_app({'type': 'websocket.disconnect', 'code': code, 'reason': reason})
+        try:
+            await self.__app_task
+        except Exception:
+            pass
+
+
+class InMemoryTestClient(TestClient):
+    """
+    Test client that drives the application in-process, without opening a socket or starting uvicorn.
+
+    Each connection is one call of the application's `__call__` wired to queue-backed `receive` and
+    `send` callables, which makes it cheap to run thousands of simulated clients in a single process
+    and to run tests in parallel.
+    """
+    def __init__(self, app: typing.Optional[Eventum] = None, record_messages: bool = True):
+        """
+        Initialize the InMemoryTestClient with the given application.
+
+        Parameters:
+        - app (Eventum): The application to test. A fresh `Eventum` instance is created if omitted.
+        - record_messages (bool): Whether connections keep the raw ASGI messages they exchange.
+        """
+        super().__init__(app if app is not None else Eventum())
+        self.record_messages = record_messages
+        self.connections: typing.List[InMemoryWebSocket] = []
+        self.__lifespan_task: typing.Optional[asyncio.Task] = None
+        self.__lifespan_receive: asyncio.Queue = asyncio.Queue()
+        self.__lifespan_send: asyncio.Queue = asyncio.Queue()
+        self.__lifespan_state: typing.Dict[str, typing.Any] = {}
+
+    async def __aenter__(self):
+        """
+        Run the application's lifespan startup.
+        """
+        scope = {'type': 'lifespan', 'asgi': {'version': '3.0', 'spec_version': '2.0'}, 'state': self.__lifespan_state}
+        self.__lifespan_task = asyncio.create_task(
+            self.app(scope, self.__lifespan_receive.get, self.__lifespan_send.put)
+        )
+        await self.__lifespan_step('lifespan.startup')
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        """
+        Close the remaining connections and run the application's lifespan shutdown.
+        """
+        for connection in self.connections:
+            await connection.close()
+        self.connections.clear()
+        if self.__lifespan_task is not None:
+            await self.__lifespan_step('lifespan.shutdown')
+            await self.__lifespan_task
+            self.__lifespan_task = None
+
+    async def __lifespan_step(self, message_type: str) -> None:
+        await self.__lifespan_receive.put({'type': message_type})
+        get_task = asyncio.ensure_future(self.__lifespan_send.get())
+        await asyncio.wait({get_task, self.__lifespan_task}, return_when=asyncio.FIRST_COMPLETED)
+        if not get_task.done():
+            get_task.cancel()
+            self.__lifespan_task.result()
+            raise RuntimeError(f'Application returned before completing {message_type}')
+        message = get_task.result()
+        if message['type'] != f'{message_type}.complete':
+            raise RuntimeError(message.get('message') or f'{message_type} failed')
+
+    async def connect(self,
+                      url: str = 'ws://testserver',
+                      path: str = '/',
+                      extra_headers: typing.Dict[str, str] = None,
+                      subprotocols: typing.List[str] = None
+                      ) -> InMemoryWebSocket:
+        """
+        Open an in-memory WebSocket connection to the application.
+
+        Parameters:
+        - url (str): The base URL, only used to fill the scope (`scheme`, `server`, `host` header).
+        - path (str): The path to connect to, optionally with a query string.
+        - extra_headers (typing.Dict[str, str]): Additional headers to send with the connection.
+        - subprotocols (typing.List[str]): The subprotocols offered by the client.
+
+        Raises:
+        - WebSocketRejected: If the application answers the handshake with an HTTP response.
+        """
+        scheme, _, netloc = url.partition('://')
+        host, _, port = netloc.rstrip('/').partition(':')
+        path, _, query_string = path.partition('?')
+        headers = [
+            (b'host', netloc.rstrip('/').encode()),
+            (b'upgrade', b'websocket'),
+            (b'connection', b'Upgrade'),
+            (b'sec-websocket-key', base64.b64encode(os.urandom(16))),
+            (b'sec-websocket-version', b'13'),
+        ]
+        for key, value in (extra_headers or {}).items():
+            headers.append((key.lower().encode('latin-1'), value.encode('latin-1')))
+        if subprotocols:
+            headers.append((b'sec-websocket-protocol', ', '.join(subprotocols).encode('latin-1')))
+
+        scope = {
+            'type': 'websocket',
+            'asgi': {'version': '3.0', 'spec_version': '2.3'},
+            'http_version': '1.1',
+            'scheme': scheme or 'ws',
+            'server': (host, int(port) if port else (443 if scheme == 'wss' else 80)),
+            'client': ('testclient', len(self.connections)),
+            'root_path': '',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': query_string.encode(),
+            'headers': headers,
+            'subprotocols': subprotocols or [],
+            'extensions': {'websocket.http.response': {}},
+            'state': dict(self.__lifespan_state),
+        }
+        connection = InMemoryWebSocket(self.app, scope, record_messages=self.record_messages)
+        await connection._open()
+        self.connections.append(connection)
+        return connection
@@ -123,4 +123,45 @@ It allows for dynamic routing and handling of various WebSocket events within th
   such as additional arguments (`args`), keyword arguments (`kwargs`), 
   or specific event-related configuration.
 
-"""
\ No newline at end of file
+"""
+Offload = typing.Optional[typing.Literal['thread', 'process']]
+"""
+Execution mode of an event handler.
+
+- **None**: Async handlers run directly on the event loop; synchronous handlers are detected at
+  registration and always run on the application's thread pool.
+- **'thread'**: The async handler wraps blocking code and runs on a worker thread's private event
+  loop, with its connection sends scheduled back on the application's loop.
+- **'process'**: The handler is a picklable synchronous function called as `handler(event_data)`
+  in the application's process pool. The connection stays in the main process and the returned
+  value is sent back to the client.
+"""
+
+
+Priority = typing.Literal['high', 'normal', 'low']
+"""
+Outbound lane of a frame on a connection with priority lanes enabled.
+
+- **'high'**: Acks, pings and error events. Sent before any queued frame of the other lanes.
+- **'normal'**: Default lane of every send.
+- **'low'**: Bulk traffic, sharing the socket with the normal lane by weight.
+"""
+
+
+class LifespanResource(typing.Protocol):
+    """
+    Protocol for components whose lifetime follows the application lifespan
+    (process pools, schedulers, background flushers, ...).
+    """
+
+    async def startup(self) -> None:
+        """
+        Acquire the resource. Called on `lifespan.startup`.
+        """
+        ...
+
+    async def shutdown(self) -> None:
+        """
+        Release the resource. Called on `lifespan.shutdown`.
+        """
+        ...
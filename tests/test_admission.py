@@ -0,0 +1,70 @@
+import pytest
+from eventum_asgi.admission import AdmissionController
+from eventum_asgi.app import Eventum
+from eventum_asgi.connection import WSConnection
+from eventum_asgi.testclient import InMemoryTestClient, WebSocketRejected
+
+
+def create_app(**kwargs) -> Eventum:
+    app = Eventum(**kwargs)
+
+    @app.handshake_route('/')
+    async def index(connection: WSConnection):
+        await connection.accept()
+
+    @app.handshake_route('/admin')
+    async def admin(connection: WSConnection):
+        await connection.accept()
+
+    return app
+
+
+@pytest.mark.asyncio
+async def test_connection_caps_reject_with_precomputed_503(monkeypatch):
+    """
+    Test that global and per-path caps reject handshakes before a connection is built.
+    """
+    app = create_app(max_connections=3, max_connections_per_path={'/admin': 1}, admission_retry_after=7)
+    built = []
+
+    class CountedConnection(WSConnection):
+        def __init__(self, *args, **kwargs):
+            built.append(self)
+            super().__init__(*args, **kwargs)
+
+    async with InMemoryTestClient(app) as client:
+        await client.connect(path='/admin')
+        with pytest.raises(WebSocketRejected) as e:
+            await client.connect(path='/admin')
+        assert e.value.status_code == 503
+        assert (b'retry-after', b'7') in e.value.headers
+
+        first = await client.connect(path='/')
+        await client.connect(path='/')
+        monkeypatch.setattr('eventum_asgi.app.WSConnection', CountedConnection)
+        with pytest.raises(WebSocketRejected):
+            await client.connect(path='/')
+        assert built == []
+
+        await first.close()
+        await client.connect(path='/')
+
+    metrics = app.metrics.snapshot()
+    assert metrics['admission.admitted'] == 4
+    assert metrics['admission.rejected'] == 2
+    assert metrics['admission.rejected_capacity'] == 2
+    assert metrics['admission.live'] == 0
+
+
+def test_handshake_token_bucket():
+    """
+    Test that the token bucket admits a burst and then the sustained rate.
+    """
+    now = [100.0]
+    admission = AdmissionController(handshake_rate=10, handshake_burst=2, clock=lambda: now[0])
+    assert admission.admit('/') and admission.admit('/')
+    assert not admission.admit('/')
+    now[0] += 0.2
+    assert admission.admit('/') and admission.admit('/')
+    assert not admission.admit('/')
+    assert admission.live == 4
@@ -0,0 +1,153 @@
+import asyncio
+import pytest
+from eventum_asgi import Depends, HandshakeAuthenticator, HandshakeAuthMiddleware
+from eventum_asgi.app import Eventum
+from eventum_asgi.cache import TTLCache, SingleFlight
+from eventum_asgi.connection import WSConnection
+from eventum_asgi.testclient import InMemoryTestClient, WebSocketRejected
+
+
+class AuthService:
+    def __init__(self):
+        self.calls = []
+
+    async def verify(self, token: str):
+        self.calls.append(token)
+        await asyncio.sleep(0.01)
+        return {'user': token.split('-')[0]} if token.endswith('-valid') else None
+
+
+@pytest.mark.asyncio
+async def test_middleware_caches_principals_and_shares_lookups():
+    """
+    Test that concurrent handshakes share one lookup, later ones hit the cache and bad tokens get 401.
+    """
+    service = AuthService()
+    app = Eventum()
+    auth = HandshakeAuthenticator(service.verify, metrics=app.metrics)
+    app.add_middleware(HandshakeAuthMiddleware, authenticator=auth)
+
+    @app.handshake_route('/')
+    async def index(connection: WSConnection):
+        await connection.accept()
+        await connection.send_json(connection.get_flag('principal'))
+
+    async with InMemoryTestClient(app) as client:
+        headers = {'Authorization': 'Bearer alice-valid'}
+        conns = await asyncio.gather(*(client.connect(path='/', extra_headers=headers) for _ in range(5)))
+        for conn in conns:
+            assert await conn.receive_json() == {'user': 'alice'}
+        conn = await client.connect(path='/', extra_headers=headers)
+        assert await conn.receive_json() == {'user': 'alice'}
+
+        for _ in range(2):
+            with pytest.raises(WebSocketRejected) as e:
+                await client.connect(path='/', extra_headers={'Authorization': 'Bearer mallory'})
+            assert e.value.status_code == 401
+        with pytest.raises(WebSocketRejected):
+            await client.connect(path='/')
+
+    assert service.calls == ['alice-valid', 'mallory']
+    metrics = app.metrics.snapshot()
+    assert metrics['auth.cache_misses'] == 6
+    assert metrics['auth.cache_hits'] == 2
+    assert metrics['auth.rejected'] == 3
+
+
+@pytest.mark.asyncio
+async def test_authenticator_as_route_dependency():
+    """
+    Test that the authenticator resolves the principal as a handshake dependency.
+    """
+    app = Eventum()
+    auth = HandshakeAuthenticator(lambda token: token.upper(), scheme=None, header='X-Token', flag='user')
+
+    @app.handshake_route('/', required_headers=['X-Token'])
+    async def index(connection: WSConnection, principal=Depends(auth, scope='connection')):
+        await connection.accept()
+        await connection.send_text(principal)
+
+    async with InMemoryTestClient(app) as client:
+        conn = await client.connect(path='/', extra_headers={'X-Token': 'bob'})
+        assert await conn.recv() == 'BOB'
+
+
+def test_ttl_cache_evicts_least_recently_used_and_expired():
+    """
+    Test the LRU bound and the per-entry TTL of TTLCache.
+    """
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    assert 'b' not in cache and cache.get('a') == 1 and cache.get('c') == 3
+    cache.set('d', 4, ttl=0)
+    assert cache.get('d', 'missing') == 'missing'
+    assert len(cache) == 1
+    cache.set('e', 5, ttl=0)
+    assert len(cache) == 1 and cache.values() == [3]
+    cache.set('f', 6, ttl=0)
+    assert cache.purge() == 1
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_errors():
+    """
+    Test that concurrent callers of a failing call all get its exception.
+    """
+    flights = SingleFlight()
+    calls = []
+
+    async def fail():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError('down')
+
+    results = await asyncio.gather(*(flights.do('key', fail) for _ in range(3)), return_exceptions=True)
+    assert calls == [1]
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert len(flights) == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_hands_over_to_followers():
+    """
+    Test that a follower of a call cancelled by its caller's disconnect runs the call itself
+    instead of being cancelled too.
+    """
+    flight = SingleFlight()
+    calls = []
+
+    async def load():
+        calls.append(len(calls))
+        await asyncio.sleep(0.02)
+        return len(calls)
+
+    leader = asyncio.ensure_future(flight.do('config', load))
+    await asyncio.sleep(0)
+    follower = asyncio.ensure_future(flight.do('config', load))
+    await asyncio.sleep(0)
+    leader.cancel()
+    assert await follower == 2
+    assert leader.cancelled()
+    assert len(flight) == 0
+
+
+@pytest.mark.asyncio
+async def test_dropped_handshake_does_not_fail_concurrent_lookups():
+    """
+    Test that cancelling the handshake running a shared lookup, e.g. because its client left,
+    hands the lookup over to the other handshakes waiting for the same token.
+    """
+    service = AuthService()
+    auth = HandshakeAuthenticator(service.verify)
+    leader = asyncio.ensure_future(auth.resolve('alice-valid'))
+    await asyncio.sleep(0)
+    followers = [asyncio.ensure_future(auth.resolve('alice-valid')) for _ in range(3)]
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await asyncio.gather(*followers) == [{'user': 'alice'}] * 3
+    assert leader.cancelled()
+    assert service.calls == ['alice-valid', 'alice-valid']
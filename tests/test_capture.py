@@ -0,0 +1,165 @@
+import asyncio
+import socket
+import orjson
+import pytest
+import uvicorn
+from eventum_asgi.app import Eventum
+from eventum_asgi.capture import TrafficCapture, read_capture, CONNECT, TEXT, BINARY, DISCONNECT
+from eventum_asgi.connection import WSConnection
+from eventum_asgi.middleware.capture_middleware import CaptureMiddleware
+from eventum_asgi.replay import replay, replay_file
+from eventum_asgi.testclient import InMemoryTestClient
+
+
+def make_app(received: list) -> Eventum:
+    app = Eventum()
+
+    @app.handshake_route('/chat')
+    async def index(connection: WSConnection):
+        await connection.accept()
+
+    @app.event('say')
+    async def say(connection: WSConnection, event: dict):
+        received.append((connection.request_headers.model_extra.get('x-room'), event['text']))
+        await connection.send_json({'event': 'said'})
+
+    return app
+
+
+@pytest.mark.asyncio
+async def test_capture_records_sampled_connections(tmp_path):
+    """
+    Test that the handshake, the frames and the disconnect of a connection are recorded,
+    with credentials redacted.
+    """
+    log = str(tmp_path / 'traffic.evcap')
+    app = make_app([])
+    capture = TrafficCapture(log, metrics=app.metrics)
+    app.add_middleware(CaptureMiddleware, capture=capture)
+    app.lifespan.add_resource(capture)
+
+    async with InMemoryTestClient(app) as client:
+        conn = await client.connect(path='/chat?v=2', extra_headers={'X-Room': 'a', 'Authorization': 'Bearer secret'})
+        await conn.send_json({'event': 'say', 'text': 'hi'})
+        await conn.recv()
+        await conn.send(b'\x00\x01')
+        await conn.close(code=4000)
+
+    records = list(read_capture(log))
+    assert [record.kind for record in records] == [CONNECT, TEXT, BINARY, DISCONNECT]
+    assert {record.connection for record in records} == {1}
+    assert [record.timestamp for record in records] == sorted(record.timestamp for record in records)
+    handshake = orjson.loads(records[0].payload)
+    assert handshake['path'] == '/chat' and handshake['query_string'] == 'v=2'
+    assert ['authorization', 'redacted'] in handshake['headers'] and ['x-room', 'a'] in handshake['headers']
+    assert orjson.loads(records[1].payload) == {'event': 'say', 'text': 'hi'}
+    assert records[2].payload == b'\x00\x01'
+    assert orjson.loads(records[3].payload) == 4000
+    assert app.metrics.snapshot()['capture.records'] == 4
+
+    sampled_out = TrafficCapture(str(tmp_path / 'none.evcap'), sample_rate=0)
+    assert not sampled_out.sample()
+    sampled_out.close()
+
+
+
+@pytest.mark.asyncio
+async def test_capture_stops_at_max_bytes_while_a_connection_is_recorded(tmp_path):
+    """
+    Test that the size bound is enforced on every record, not only when sampling connections.
+    """
+    log = str(tmp_path / 'traffic.evcap')
+    app = make_app([])
+    capture = TrafficCapture(log, max_bytes=1024, metrics=app.metrics)
+    app.add_middleware(CaptureMiddleware, capture=capture)
+    app.lifespan.add_resource(capture)
+
+    async with InMemoryTestClient(app) as client:
+        conn = await client.connect(path='/chat')
+        for index in range(50):
+            await conn.send_json({'event': 'say', 'text': f'message {index}'})
+            await conn.recv()
+        assert capture.closed
+        assert not capture.sample()
+
+    records = list(read_capture(log))
+    assert records[0].kind == CONNECT and 1 < len(records) < 50
+    assert capture.size <= 1024
+    assert app.metrics.snapshot()['capture.limit_reached'] == 1
+
+@pytest.mark.asyncio
+async def test_replay_in_process_at_max_and_scaled_speed(tmp_path):
+    """
+    Test that a captured log replays the same events per connection, as fast as possible
+    or with its timing scaled.
+    """
+    log = str(tmp_path / 'traffic.evcap')
+    captured = []
+    app = make_app(captured)
+    capture = TrafficCapture(log)
+    app.add_middleware(CaptureMiddleware, capture=capture)
+    app.lifespan.add_resource(capture)
+
+    async with InMemoryTestClient(app) as client:
+        first = await client.connect(path='/chat', extra_headers={'X-Room': 'a'})
+        second = await client.connect(path='/chat', extra_headers={'X-Room': 'b'})
+        for index in range(3):
+            for conn in (first, second):
+                await conn.send_json({'event': 'say', 'text': str(index)})
+                await conn.recv()
+            await asyncio.sleep(0.05)
+
+    replayed = []
+    report = await replay_file(log, app=make_app(replayed), speed=None)
+    assert report.connections == 2 and report.rejected == 0
+    assert report.messages == 6 and report.received == 6
+    assert sorted(replayed) == sorted(captured)
+    assert [text for room, text in replayed if room == 'a'] == ['0', '1', '2']
+
+    replayed.clear()
+    async with InMemoryTestClient(make_app(replayed), record_messages=False) as client:
+        async def open_connection(path, headers, subprotocols):
+            return await client.connect(path=path, extra_headers=headers)
+        report = await replay(read_capture(log), open_connection, speed=2)
+    assert report.duration >= 0.05
+    assert sorted(replayed) == sorted(captured)
+
+
+@pytest.mark.asyncio
+async def test_replay_over_loopback_to_a_server(tmp_path):
+    """
+    Test that a captured log replays through the `websockets` client against a uvicorn server.
+    """
+    log = str(tmp_path / 'traffic.evcap')
+    captured = []
+    app = make_app(captured)
+    capture = TrafficCapture(log)
+    app.add_middleware(CaptureMiddleware, capture=capture)
+    app.lifespan.add_resource(capture)
+
+    async with InMemoryTestClient(app) as client:
+        conn = await client.connect(path='/chat', extra_headers={'X-Room': 'a'})
+        for index in range(3):
+            await conn.send_json({'event': 'say', 'text': str(index)})
+            await conn.recv()
+        await asyncio.sleep(0.2)
+        await conn.close()
+
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    replayed = []
+    server = uvicorn.Server(uvicorn.Config(make_app(replayed), host='127.0.0.1', port=port, log_level='warning'))
+    serving = asyncio.ensure_future(server.serve())
+    try:
+        while not server.started:
+            assert not serving.done()
+            await asyncio.sleep(0.01)
+        report = await asyncio.wait_for(replay_file(log, url=f'ws://127.0.0.1:{port}'), 5)
+    finally:
+        server.should_exit = True
+        await serving
+
+    assert report.connections == 1 and report.rejected == 0
+    assert report.messages == 3
+    assert replayed == captured == [('a', '0'), ('a', '1'), ('a', '2')]
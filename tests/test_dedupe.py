@@ -0,0 +1,112 @@
+import asyncio
+import pytest
+from eventum_asgi.app import Eventum
+from eventum_asgi.connection import WSConnection
+from eventum_asgi.dedupe import Deduplicator
+from eventum_asgi.testclient import InMemoryTestClient
+
+
+@pytest.mark.asyncio
+async def test_duplicate_event_replays_cached_reply():
+    """
+    Test that a retried event gets the first reply again without running the handler.
+    """
+    app = Eventum(dedupe_window=2)
+    writes = []
+
+    @app.handshake_route('/')
+    async def index(connection: WSConnection):
+        await connection.accept()
+
+    @app.event('save', dedupe=True)
+    async def save(connection: WSConnection, event: dict):
+        writes.append(event['value'])
+        await connection.send_json({'saved': len(writes)})
+
+    async with InMemoryTestClient(app) as client:
+        conn = await client.connect(path='/')
+        for message_id, value in (('m1', 'a'), ('m1', 'a'), ('m2', 'b'), ('m3', 'c'), ('m1', 'a')):
+            await conn.send_json({'event': 'save', 'id': message_id, 'value': value})
+        replies = [await conn.receive_json() for _ in range(5)]
+        await conn.send_json({'event': 'save', 'value': 'no-id'})
+        await conn.receive_json()
+
+    assert writes == ['a', 'b', 'c', 'a', 'no-id']
+    assert replies == [{'saved': 1}, {'saved': 1}, {'saved': 2}, {'saved': 3}, {'saved': 4}]
+    metrics = app.metrics.snapshot()
+    assert metrics['dedupe.duplicates'] == 1
+    assert metrics['dedupe.replayed_messages'] == 1
+    assert metrics['dedupe.windows'] == 0
+
+
+@pytest.mark.asyncio
+async def test_per_user_window_survives_reconnect():
+    """
+    Test that a window keyed by a connection flag catches retries over a new socket.
+    """
+    app = Eventum()
+    writes = []
+
+    @app.handshake_route('/')
+    async def index(connection: WSConnection):
+        connection.add_flag('user_id', 'alice')
+        await connection.accept()
+
+    async def save(connection: WSConnection, event: dict):
+        writes.append(event['msg_id'])
+        await connection.send_text('ok')
+
+    app.add_event('save', save, dedupe=Deduplicator(id_field='msg_id', identity_flag='user_id'))
+
+    async with InMemoryTestClient(app) as client:
+        conn = await client.connect(path='/')
+        await conn.send_json({'event': 'save', 'msg_id': 1})
+        assert await conn.recv() == 'ok'
+        await conn.close()
+
+        conn = await client.connect(path='/')
+        await conn.send_json({'event': 'save', 'msg_id': 1})
+        assert await conn.recv() == 'ok'
+
+    assert writes == [1]
+
+
+@pytest.mark.asyncio
+async def test_reply_holds_only_the_frames_of_the_handler_call():
+    """
+    Test that message ids are scoped to their event and that frames sent to the connection by
+    a task spawned from the handler are not replayed as its reply.
+    """
+    app = Eventum()
+
+    @app.handshake_route('/')
+    async def index(connection: WSConnection):
+        await connection.accept()
+
+    async def notify(connection: WSConnection, sent: asyncio.Event):
+        await connection.send_json({'event': 'notification'})
+        sent.set()
+
+    @app.event('save', dedupe=True)
+    async def save(connection: WSConnection, event: dict):
+        sent = asyncio.Event()
+        connection.spawn(notify(connection, sent))
+        await sent.wait()
+        await connection.send_json({'event': 'saved'})
+
+    @app.event('delete', dedupe=True)
+    async def delete(connection: WSConnection, event: dict):
+        await connection.send_json({'event': 'deleted'})
+
+    async with InMemoryTestClient(app) as client:
+        conn = await client.connect(path='/')
+        await conn.send_json({'event': 'save', 'id': 1})
+        assert await conn.receive_json() == {'event': 'notification'}
+        assert await conn.receive_json() == {'event': 'saved'}
+
+        await conn.send_json({'event': 'save', 'id': 1})
+        assert await conn.receive_json() == {'event': 'saved'}
+        await conn.send_json({'event': 'delete', 'id': 1})
+        assert await conn.receive_json() == {'event': 'deleted'}
+
+    assert app.metrics.snapshot()['dedupe.duplicates'] == 1
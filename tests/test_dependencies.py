@@ -0,0 +1,114 @@
+import typing
+import pytest
+from eventum_asgi import Depends
+from eventum_asgi.app import Eventum
+from eventum_asgi.connection import WSConnection
+from eventum_asgi.testclient import InMemoryTestClient
+
+
+@pytest.mark.asyncio
+async def test_dependencies_are_cached_per_scope():
+    """
+    Test app, connection and event scoped dependencies in event and handshake handlers.
+    """
+    app = Eventum()
+    calls = {'settings': 0, 'user': 0, 'payload': 0}
+
+    def get_settings():
+        calls['settings'] += 1
+        return {'prefix': '>'}
+
+    async def get_user(connection: WSConnection):
+        calls['user'] += 1
+        return connection.get_flag('user')
+
+    def get_payload(event, settings=Depends(get_settings, scope='app')):
+        calls['payload'] += 1
+        return settings['prefix'] + event['text']
+
+    @app.handshake_route('/')
+    async def index(connection: WSConnection, settings=Depends(get_settings, scope='app')):
+        connection.add_flag('user', 'alice')
+        await connection.accept()
+
+    @app.event('say')
+    async def say(connection: WSConnection,
+                  event: dict,
+                  user: typing.Annotated[str, Depends(get_user, scope='connection')],
+                  payload: str = Depends(get_payload),
+                  again: str = Depends(get_payload)):
+        assert payload is again
+        await connection.send_text(f'{user}{payload}')
+
+    async with InMemoryTestClient(app) as client:
+        conn = await client.connect(path='/')
+        for text in ('a', 'b'):
+            await conn.send_json({'event': 'say', 'text': text})
+            assert await conn.recv() == f'alice>{text}'
+
+    assert calls == {'settings': 1, 'user': 1, 'payload': 2}
+
+
+@pytest.mark.asyncio
+async def test_dependencies_for_sync_handlers():
+    app = Eventum()
+
+    @app.handshake_route('/')
+    async def index(connection: WSConnection):
+        await connection.accept()
+
+    @app.event('double')
+    def double(connection: WSConnection, event: dict, factor: int = Depends(lambda: 2, scope='app')):
+        return event['value'] * factor
+
+    async with InMemoryTestClient(app) as client:
+        conn = await client.connect(path='/')
+        await conn.send_json({'event': 'double', 'value': 21})
+        assert await conn.recv() == '42'
+
+
+def test_unresolvable_dependency_fails_at_registration():
+    app = Eventum()
+
+    def needs_unknown(unknown):
+        return unknown
+
+    with pytest.raises(TypeError):
+        @app.event('bad')
+        async def bad(connection, event, value=Depends(needs_unknown)):
+            pass
+
+
+@pytest.mark.parametrize('scope', ['app', 'connection'])
+def test_dependency_on_narrower_scope_fails_at_registration(scope):
+    """
+    Test that a dependency cannot take values living shorter than its own scope.
+    """
+    app = Eventum()
+
+    def get_payload(event):
+        return event
+
+    def get_user(connection):
+        return connection
+
+    def get_greeting(payload=Depends(get_payload)):
+        return payload
+
+    with pytest.raises(TypeError):
+        @app.event('event')
+        async def uses_event(connection, event, value=Depends(get_payload, scope=scope)):
+            pass
+    with pytest.raises(TypeError):
+        @app.event('nested')
+        async def uses_nested(connection, event, value=Depends(get_greeting, scope=scope)):
+            pass
+    if scope == 'app':
+        with pytest.raises(TypeError):
+            @app.event('user')
+            async def uses_connection(connection, event, value=Depends(get_user, scope='app')):
+                pass
+    else:
+        @app.event('user')
+        async def uses_connection(connection, event, value=Depends(get_user, scope='connection')):
+            pass
@@ -1,10 +1,13 @@
+import asyncio
+import time
 import pytest
 import orjson
 from websockets.exceptions import ConnectionClosedOK, ConnectionClosedError
 from eventum_asgi.app import Eventum
 from eventum_asgi.events import Event
 from eventum_asgi.connection import WSConnection
-from eventum_asgi.testclient import TestClient
+from eventum_asgi.exceptions import DisconnectedException
+from eventum_asgi.testclient import TestClient, InMemoryTestClient
 
 
 @pytest.mark.asyncio
@@ -74,3 +77,154 @@ async def test_disconnect_server_with_error():
             await conn.recv()
             
 
+
+
+@pytest.mark.asyncio
+async def test_running_handler_is_cancelled_on_disconnect():
+    """
+    Test that a handler is cancelled as soon as its client disconnects, that frames sent
+    while a handler runs are still handled in order and that sends after the disconnect fail fast.
+    """
+    app = Eventum()
+    log = []
+    connections = []
+
+    @app.handshake_route('/')
+    async def index(connection: WSConnection):
+        await connection.accept()
+        connections.append(connection)
+        connection.add_disconnect_callback(lambda connection: log.append('disconnected'))
+
+    @app.event('slow')
+    async def slow(connection: WSConnection, event: dict):
+        try:
+            await asyncio.sleep(event['seconds'])
+            await connection.send_json({'event': 'slow', 'n': event['n']})
+        except asyncio.CancelledError:
+            log.append(f"cancelled {event['n']}")
+            raise
+
+    async with InMemoryTestClient(app) as client:
+        conn = await client.connect(path='/')
+        await conn.send_json({'event': 'slow', 'n': 1, 'seconds': 0.05})
+        await conn.send_json({'event': 'slow', 'n': 2, 'seconds': 0})
+        assert await conn.receive_json() == {'event': 'slow', 'n': 1}
+        assert await conn.receive_json() == {'event': 'slow', 'n': 2}
+
+        await conn.send_json({'event': 'slow', 'n': 3, 'seconds': 10})
+        await asyncio.sleep(0.01)
+        started = time.monotonic()
+        await conn.close()
+        while 'disconnected' not in log:
+            await asyncio.sleep(0.001)
+        assert time.monotonic() - started < 1
+        assert log == ['cancelled 3', 'disconnected']
+
+        connection = connections[0]
+        assert connection.disconnected
+        with pytest.raises(DisconnectedException):
+            await connection.send_json({'event': 'late'})
+        with pytest.raises(DisconnectedException):
+            await connection.send({'type': 'websocket.send', 'text': 'late'})
+        await connection.close()
+
+    snapshot = app.metrics.snapshot()
+    assert snapshot['events.cancelled_on_disconnect'] == 1
+    assert snapshot['connections.busy'] == 0
+
+
+@pytest.mark.asyncio
+async def test_handlers_run_to_completion_without_cancel_on_disconnect():
+    """
+    Test that handlers are not cancelled by a disconnect when `cancel_on_disconnect` is disabled.
+    """
+    app = Eventum(cancel_on_disconnect=False)
+    finished = asyncio.Event()
+
+    @app.handshake_route('/')
+    async def index(connection: WSConnection):
+        await connection.accept()
+
+    @app.event('slow')
+    async def slow(connection: WSConnection, event: dict):
+        await asyncio.sleep(0.05)
+        finished.set()
+
+    async with InMemoryTestClient(app) as client:
+        conn = await client.connect(path='/')
+        await conn.send_json({'event': 'slow'})
+        await asyncio.sleep(0.01)
+        await conn.close()
+        await asyncio.wait_for(finished.wait(), timeout=1)
+
+    assert 'events.cancelled_on_disconnect' not in app.metrics.snapshot()
+
+
+@pytest.mark.asyncio
+async def test_disconnect_behind_a_buffered_frame_cancels_the_handler():
+    """
+    Test that frames sent while a handler runs are buffered and that a disconnect arriving
+    after them still cancels the handler.
+    """
+    app = Eventum()
+    log = []
+
+    @app.handshake_route('/')
+    async def index(connection: WSConnection):
+        await connection.accept()
+        connection.add_disconnect_callback(lambda connection: log.append('disconnected'))
+
+    @app.event('slow')
+    async def slow(connection: WSConnection, event: dict):
+        try:
+            await asyncio.sleep(event['seconds'])
+            await connection.send_json({'event': 'slow', 'n': event['n']})
+        except asyncio.CancelledError:
+            log.append(f"cancelled {event['n']}")
+            raise
+
+    async with InMemoryTestClient(app) as client:
+        conn = await client.connect(path='/')
+        await conn.send_json({'event': 'slow', 'n': 1, 'seconds': 0.05})
+        for n in range(2, 5):
+            await conn.send_json({'event': 'slow', 'n': n, 'seconds': 0})
+        assert [(await conn.receive_json())['n'] for _ in range(4)] == [1, 2, 3, 4]
+
+        await conn.send_json({'event': 'slow', 'n': 5, 'seconds': 10})
+        await conn.send_json({'event': 'slow', 'n': 6, 'seconds': 0})
+        await asyncio.sleep(0.01)
+        await conn.close()
+        started = time.monotonic()
+        while 'disconnected' not in log and time.monotonic() - started < 1:
+            await asyncio.sleep(0.001)
+        assert log == ['cancelled 5', 'disconnected']
+
+
+@pytest.mark.asyncio
+async def test_close_marks_the_connection_disconnected():
+    """
+    Test that sends fail fast once the application closed the connection.
+    """
+    app = Eventum()
+    errors = []
+
+    @app.handshake_route('/')
+    async def index(connection: WSConnection):
+        await connection.accept()
+
+    @app.event('bye')
+    async def bye(connection: WSConnection, event: dict):
+        await connection.close()
+        assert connection.disconnected
+        try:
+            await connection.send_json({'event': 'late'})
+        except DisconnectedException as e:
+            errors.append(e)
+
+    async with InMemoryTestClient(app) as client:
+        conn = await client.connect(path='/')
+        await conn.send_json({'event': 'bye'})
+        started = time.monotonic()
+        while (not errors or app.event_loop.connections) and time.monotonic() - started < 1:
+            await asyncio.sleep(0.001)
+        assert len(errors) == 1 and not app.event_loop.connections
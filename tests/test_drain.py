@@ -0,0 +1,130 @@
+import asyncio
+import pytest
+from eventum_asgi.app import Eventum
+from eventum_asgi.connection import WSConnection
+from eventum_asgi.lanes import OutboundLanes
+from eventum_asgi.testclient import InMemoryTestClient, WebSocketRejected, ConnectionClosed
+
+
+@pytest.mark.asyncio
+async def test_drain_closes_connections_in_batches():
+    """
+    Test that draining waits for in-flight handlers, closes with 1001 and rejects new handshakes.
+    """
+    app = Eventum(drain_batch_size=2, drain_batch_interval=0.01, drain_timeout=5, drain_retry_after=7)
+    started = asyncio.Event()
+
+    @app.handshake_route('/')
+    async def index(connection: WSConnection):
+        await connection.accept()
+
+    @app.event('slow')
+    async def slow(connection: WSConnection, event: dict):
+        started.set()
+        await asyncio.sleep(0.05)
+        await connection.send_text('done')
+
+    async with InMemoryTestClient(app) as client:
+        conns = [await client.connect(path='/') for _ in range(5)]
+        await conns[0].send_json({'event': 'slow'})
+        await started.wait()
+        await app.drain()
+
+        assert await conns[0].recv() == 'done'
+        for conn in conns:
+            with pytest.raises(ConnectionClosed) as e:
+                await conn.recv()
+            assert e.value.code == 1001
+
+        with pytest.raises(WebSocketRejected) as e:
+            await client.connect(path='/')
+        assert e.value.status_code == 503
+        assert (b'Retry-After', b'7') in e.value.headers
+
+    metrics = app.metrics.snapshot()
+    assert metrics['drain.closed_connections'] == 5
+    assert metrics['drain.rejected_handshakes'] == 1
+    assert metrics['connections.live'] == 0
+
+
+@pytest.mark.asyncio
+async def test_busy_connection_does_not_hold_back_later_batches():
+    """
+    Test that idle connections are closed on schedule while a long handler runs, and that the
+    busy connection is closed once its grace period is over.
+    """
+    app = Eventum(drain_batch_size=1, drain_batch_interval=0.01, drain_timeout=5, drain_handler_grace=0.2)
+    started = asyncio.Event()
+
+    @app.handshake_route('/')
+    async def index(connection: WSConnection):
+        await connection.accept()
+
+    @app.event('hang')
+    async def hang(connection: WSConnection, event: dict):
+        started.set()
+        await asyncio.sleep(10)
+
+    async with InMemoryTestClient(app) as client:
+        conns = [await client.connect(path='/') for _ in range(4)]
+        await conns[0].send_json({'event': 'hang'})
+        await started.wait()
+        loop = asyncio.get_running_loop()
+        begin = loop.time()
+        drain = asyncio.ensure_future(app.drain())
+
+        for conn in conns[1:]:
+            with pytest.raises(ConnectionClosed) as e:
+                await conn.recv()
+            assert e.value.code == 1001
+        assert loop.time() - begin < 0.15
+        assert not drain.done()
+
+        with pytest.raises(ConnectionClosed) as e:
+            await conns[0].recv()
+        assert e.value.code == 1001
+        assert loop.time() - begin >= 0.2
+        await asyncio.wait_for(drain, timeout=1)
+
+    assert app.metrics.snapshot()['drain.closed_connections'] == 4
+
+
+@pytest.mark.asyncio
+async def test_slow_close_does_not_hold_the_drain_past_its_timeout(monkeypatch):
+    """
+    Test that a close stuck flushing the outbound lanes of a client that stopped reading is
+    abandoned at the drain deadline.
+    """
+    class StalledConnection(WSConnection):
+        def enable_priority_lanes(self, capacity=256, weights=None):
+            super().enable_priority_lanes(capacity, weights).close()
+            self.lanes = OutboundLanes(self.stall, capacity=capacity, weights=weights)
+            return self.lanes
+
+        @staticmethod
+        async def stall(message):
+            await asyncio.Event().wait()
+
+    monkeypatch.setattr('eventum_asgi.app.WSConnection', StalledConnection)
+    app = Eventum(priority_lanes=True, drain_timeout=0.2)
+    queued = asyncio.Event()
+
+    @app.handshake_route('/')
+    async def index(connection: WSConnection):
+        await connection.accept()
+
+    @app.event('push')
+    async def push(connection: WSConnection, event: dict):
+        await connection.send_text('stuck', priority='low')
+        queued.set()
+
+    async with InMemoryTestClient(app) as client:
+        conn = await client.connect(path='/')
+        await conn.send_json({'event': 'push'})
+        await queued.wait()
+        loop = asyncio.get_running_loop()
+        begin = loop.time()
+        await asyncio.wait_for(app.drain(), 1)
+        assert loop.time() - begin < 0.5
+
+    assert app.metrics.snapshot()['drain.close_timeouts'] == 1
@@ -1,4 +1,5 @@
-from eventum_asgi.events import Event, EventValidationException
+import pytest
+from eventum_asgi.events import Event, EventValidationException, FrozenEvent, cached_event
 
 def test_event_model():
     event = Event(event='test', data='test')
@@ -12,5 +13,27 @@ def test_event_model_with_invalid_data():
     assert event.message == 'test'
     assert event.to_json() == '{"event":"test","message":"test"}'
 
+
+def test_frozen_event_is_serialized_once():
+    event = FrozenEvent(EventValidationException(), code=42)
+    assert event.event == 'validation_error'
+    assert event.to_json() == '{"event":"validation_error","message":"Invalid data received","code":42}'
+    assert event.to_json() is event.to_json()
+    with pytest.raises(AttributeError):
+        event.code = 1
+
+
+def test_cached_event_factory():
+    calls = []
+
+    @cached_event(maxsize=2)
+    def room_full(room):
+        calls.append(room)
+        return Event(event='room_full', room=room)
+
+    assert room_full('a') is room_full('a')
+    assert room_full('b').to_json() == '{"event":"room_full","room":"b"}'
+    assert calls == ['a', 'b']
+
 if __name__ == "__main__":
     test_event_model()
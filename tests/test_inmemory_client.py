@@ -0,0 +1,124 @@
+import asyncio
+import pytest
+import orjson
+from eventum_asgi import HttpResponse
+from eventum_asgi.app import Eventum
+from eventum_asgi.connection import WSConnection
+from eventum_asgi.testclient import InMemoryTestClient, WebSocketRejected, ConnectionClosed
+
+
+@pytest.mark.asyncio
+async def test_inmemory_event_roundtrip():
+    """
+    Test that events are routed and answered without a socket.
+    """
+    app = Eventum()
+
+    @app.handshake_route('/')
+    async def index(connection: WSConnection):
+        await connection.accept()
+
+    @app.event('message')
+    async def on_message(connection: WSConnection, event: dict):
+        await connection.send_text('Hello, world!')
+
+    async with InMemoryTestClient(app) as client:
+        conn = await client.connect(path='/')
+        assert conn.state == conn.OPEN
+        await conn.send(orjson.dumps({'event': 'message', 'data': 'Hello, world!'}).decode('utf-8'))
+        assert await conn.recv() == 'Hello, world!'
+        assert conn.messages_to_app[0] == {'type': 'websocket.connect'}
+        assert conn.messages_from_app[0]['type'] == 'websocket.accept'
+        assert conn.messages_from_app[-1] == {'type': 'websocket.send', 'text': 'Hello, world!'}
+        await conn.close()
+        assert conn.state == conn.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_inmemory_handshake_rejected():
+    """
+    Test that HTTP responses and missing routes surface as WebSocketRejected.
+    """
+    app = Eventum()
+
+    @app.handshake_route('/', required_headers=['X-Custom-Header'])
+    async def index(connection: WSConnection):
+        await connection.accept()
+
+    @app.handshake_route('/teapot')
+    async def teapot(connection: WSConnection):
+        await connection.send_http_response(HttpResponse(code=418, body='teapot'))
+
+    async with InMemoryTestClient(app) as client:
+        with pytest.raises(WebSocketRejected) as e:
+            await client.connect(path='/nonexistent')
+        assert e.value.status_code == 404
+        with pytest.raises(WebSocketRejected) as e:
+            await client.connect(path='/')
+        assert e.value.status_code == 400
+        with pytest.raises(WebSocketRejected) as e:
+            await client.connect(path='/teapot')
+        assert (e.value.status_code, e.value.body) == (418, b'teapot')
+
+        conn = await client.connect(path='/', extra_headers={'X-Custom-Header': 'Value'})
+        assert conn.request_headers['X-Custom-Header'] == 'Value'
+
+
+@pytest.mark.asyncio
+async def test_inmemory_server_close_and_lifespan():
+    """
+    Test the lifespan hooks and a server-side close.
+    """
+    app = Eventum()
+    calls = []
+
+    @app.lifespan_event('startup')
+    async def on_startup():
+        calls.append('startup')
+
+    @app.lifespan_event('shutdown')
+    async def on_shutdown():
+        calls.append('shutdown')
+
+    @app.handshake_route('/')
+    async def index(connection: WSConnection):
+        await connection.accept()
+
+    @app.event('bye')
+    async def on_bye(connection: WSConnection, event: dict):
+        await connection.close(code=3000, reason='bye')
+
+    async with InMemoryTestClient(app) as client:
+        assert calls == ['startup']
+        conn = await client.connect(path='/')
+        await conn.send_json({'event': 'bye'})
+        with pytest.raises(ConnectionClosed) as e:
+            await conn.recv()
+        assert (e.value.code, e.value.reason) == (3000, 'bye')
+    assert calls == ['startup', 'shutdown']
+
+
+@pytest.mark.asyncio
+async def test_inmemory_many_clients():
+    """
+    Test that many simulated clients can run concurrently in one process.
+    """
+    app = Eventum()
+
+    @app.handshake_route('/')
+    async def index(connection: WSConnection):
+        await connection.accept()
+
+    @app.event('echo')
+    async def on_echo(connection: WSConnection, event: dict):
+        await connection.send_text(orjson.dumps(event).decode('utf-8'))
+
+    async with InMemoryTestClient(app, record_messages=False) as client:
+        conns = [await client.connect(path='/') for _ in range(500)]
+
+        async def roundtrip(index, conn):
+            await conn.send_json({'event': 'echo', 'index': index})
+            return (await conn.receive_json())['index']
+
+        results = await asyncio.gather(*(roundtrip(i, c) for i, c in enumerate(conns)))
+        assert results == list(range(500))
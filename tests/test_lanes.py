@@ -0,0 +1,146 @@
+import asyncio
+import pytest
+from eventum_asgi.app import Eventum
+from eventum_asgi.connection import WSConnection
+from eventum_asgi.exceptions import DisconnectedException
+from eventum_asgi.lanes import OutboundLanes
+from eventum_asgi.testclient import ConnectionClosed, InMemoryTestClient
+
+
+@pytest.mark.asyncio
+async def test_high_priority_waits_for_one_in_flight_frame_only():
+    """
+    Test that a high-priority frame is written right after the frame in flight and that
+    the normal and low lanes share the socket by weight.
+    """
+    written = []
+    release = asyncio.Event()
+
+    async def slow_send(message):
+        written.append(message['text'])
+        if len(written) == 1:
+            await release.wait()
+
+    lanes = OutboundLanes(slow_send, weights={'normal': 2, 'low': 1})
+    for i in range(4):
+        await lanes.put({'text': f'low{i}'}, 'low')
+    await asyncio.sleep(0)
+    for i in range(4):
+        await lanes.put({'text': f'normal{i}'}, 'normal')
+    await lanes.put({'text': 'ack'}, 'high')
+    assert lanes.depths() == {'high': 1, 'normal': 4, 'low': 3}
+
+    release.set()
+    while any(lanes.depths().values()):
+        await asyncio.sleep(0)
+    lanes.close()
+    assert written == ['low0', 'ack', 'normal0', 'normal1', 'low1', 'normal2', 'normal3', 'low2', 'low3']
+
+
+@pytest.mark.asyncio
+async def test_app_priority_lanes():
+    """
+    Test that with priority lanes enabled, a high-priority event overtakes queued bulk frames.
+    """
+    app = Eventum(priority_lanes=True)
+
+    @app.handshake_route('/')
+    async def index(connection: WSConnection):
+        await connection.accept()
+
+    @app.event('bulk')
+    async def bulk(connection: WSConnection, event: dict):
+        for i in range(10):
+            await connection.send_text(f'bulk{i}', priority='low')
+        await connection.send_json({'event': 'ack'}, priority='high')
+
+    async with InMemoryTestClient(app) as client:
+        conn = await client.connect(path='/')
+        await conn.send_json({'event': 'bulk'})
+        assert await conn.receive_json() == {'event': 'ack'}
+        assert [await conn.recv() for _ in range(10)] == [f'bulk{i}' for i in range(10)]
+        assert app.metrics.snapshot()['lanes.depth'] == {'high': 0, 'normal': 0, 'low': 0}
+
+
+@pytest.mark.asyncio
+async def test_failed_writer_releases_waiting_senders():
+    """
+    Test that a failing write is raised to the senders, including one waiting on a full lane.
+    """
+    release = asyncio.Event()
+
+    async def failing_send(message):
+        await release.wait()
+        raise OSError('socket closed')
+
+    lanes = OutboundLanes(failing_send, capacity=1)
+    await lanes.put({'text': 'first'})
+    await asyncio.sleep(0)
+    await lanes.put({'text': 'second'})
+    waiting = asyncio.ensure_future(lanes.put({'text': 'third'}))
+    await asyncio.sleep(0)
+    assert not waiting.done()
+
+    release.set()
+    with pytest.raises(OSError):
+        await asyncio.wait_for(waiting, 1)
+    with pytest.raises(OSError):
+        await lanes.put({'text': 'fourth'}, 'high')
+    assert lanes.depths() == {'high': 0, 'normal': 0, 'low': 0}
+
+
+@pytest.mark.asyncio
+async def test_close_is_written_after_queued_frames():
+    """
+    Test that closing a connection with priority lanes writes the queued frames before the
+    close message and refuses frames afterwards.
+    """
+    app = Eventum(priority_lanes=True)
+    refused = []
+
+    @app.handshake_route('/')
+    async def index(connection: WSConnection):
+        await connection.accept()
+
+    @app.event('bye')
+    async def bye(connection: WSConnection, event: dict):
+        for i in range(3):
+            await connection.send_text(f'bulk{i}', priority='low')
+        await connection.close(code=4000)
+        try:
+            await connection.send_text('late', priority='low')
+        except DisconnectedException:
+            refused.append(True)
+
+    async with InMemoryTestClient(app) as client:
+        conn = await client.connect(path='/')
+        await conn.send_json({'event': 'bye'})
+        assert [await conn.recv() for _ in range(3)] == ['bulk0', 'bulk1', 'bulk2']
+        with pytest.raises(ConnectionClosed) as e:
+            await conn.recv()
+        assert e.value.code == 4000
+    assert refused == [True]
+
+
+@pytest.mark.asyncio
+async def test_put_nowait_refuses_frames_on_a_full_lane():
+    """
+    Test that `put_nowait` queues frames until the lane is full and then raises `QueueFull`.
+    """
+    written = []
+    release = asyncio.Event()
+
+    async def slow_send(message):
+        await release.wait()
+        written.append(message['text'])
+
+    lanes = OutboundLanes(slow_send, capacity=1)
+    lanes.put_nowait({'text': 'first'})
+    await asyncio.sleep(0)
+    lanes.put_nowait({'text': 'second'})
+    with pytest.raises(asyncio.QueueFull):
+        lanes.put_nowait({'text': 'third'})
+    release.set()
+    await lanes.flush()
+    lanes.close()
+    assert written == ['first', 'second']
@@ -0,0 +1,195 @@
+import asyncio
+import contextlib
+import pytest
+from eventum_asgi.app import Eventum
+from eventum_asgi.connection import WSConnection
+from eventum_asgi.state import State
+from eventum_asgi.testclient import InMemoryTestClient
+
+
+class AppState(State):
+    pool: list
+
+
+@pytest.mark.asyncio
+async def test_multiple_and_concurrent_hooks():
+    """
+    Test that every registered hook runs, concurrent ones together, and that timings are recorded.
+    """
+    app = Eventum()
+    calls = []
+
+    @app.lifespan_event('startup')
+    async def first():
+        calls.append('first')
+
+    @app.lifespan_event('startup', concurrent=True)
+    async def second():
+        calls.append('second:start')
+        await asyncio.sleep(0.02)
+        calls.append('second:end')
+
+    @app.lifespan_event('startup', concurrent=True)
+    async def third():
+        calls.append('third:start')
+        await asyncio.sleep(0.01)
+        calls.append('third:end')
+
+    @app.lifespan_event('shutdown')
+    def sync_shutdown():
+        calls.append('shutdown')
+
+    async with InMemoryTestClient(app):
+        assert calls == ['first', 'second:start', 'third:start', 'third:end', 'second:end']
+        timings = app.metrics.snapshot()['lifespan.startup_seconds']
+        assert timings[f'{__name__}.test_multiple_and_concurrent_hooks.<locals>.second'] >= 0.02
+        assert 'resource:ProcessOffloader' in timings
+    assert calls[-1] == 'shutdown'
+
+
+@pytest.mark.asyncio
+async def test_context_lifespan_populates_state():
+    """
+    Test that the values yielded by the context lifespan reach app.state and connection.state.
+    """
+    events = []
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app: Eventum):
+        events.append('enter')
+        app.state.pool = ['conn']
+        yield {'settings': {'debug': True}}
+        events.append('exit')
+
+    app = Eventum(lifespan=lifespan, state=AppState())
+
+    @app.handshake_route('/')
+    async def index(connection: WSConnection):
+        connection.state.user = 'alice'
+        await connection.accept()
+
+    @app.event('info')
+    async def info(connection: WSConnection, event: dict):
+        await connection.send_text(f'{connection.state.settings["debug"]} {connection.state.user} '
+                                   f'{connection.app.state.pool[0]}')
+
+    async with InMemoryTestClient(app) as client:
+        assert isinstance(app.state, AppState)
+        assert app.state.settings == {'debug': True}
+        conn = await client.connect(path='/')
+        await conn.send_json({'event': 'info'})
+        assert await conn.recv() == 'True alice conn'
+    assert events == ['enter', 'exit']
+
+
+@pytest.mark.asyncio
+async def test_failing_startup_is_reported():
+    app = Eventum()
+
+    @app.lifespan_event('startup')
+    async def broken():
+        raise RuntimeError('database unavailable')
+
+    with pytest.raises(RuntimeError, match='database unavailable'):
+        async with InMemoryTestClient(app):
+            pass
+
+
+class Resource:
+    def __init__(self, name: str, events: list, fail: bool = False):
+        self.name = name
+        self.events = events
+        self.fail = fail
+
+    async def startup(self):
+        if self.fail:
+            raise RuntimeError(f'{self.name} failed')
+        self.events.append(f'start {self.name}')
+
+    async def shutdown(self):
+        self.events.append(f'stop {self.name}')
+        if self.fail:
+            raise RuntimeError(f'{self.name} failed to stop')
+
+
+@pytest.mark.asyncio
+async def test_failing_startup_unwinds_started_steps():
+    """
+    Test that a failing startup handler exits the context lifespan and shuts the started
+    resources down in reverse order.
+    """
+    events = []
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        events.append('enter')
+        try:
+            yield
+        finally:
+            events.append('exit')
+
+    app = Eventum(lifespan=lifespan)
+    app.lifespan.add_resource(Resource('a', events))
+    app.lifespan.add_resource(Resource('b', events))
+
+    @app.lifespan_event('startup')
+    async def broken():
+        raise RuntimeError('database unavailable')
+
+    with pytest.raises(RuntimeError, match='database unavailable'):
+        await app.lifespan.startup()
+    assert events == ['start a', 'start b', 'enter', 'exit', 'stop b', 'stop a']
+
+    events.clear()
+    app = Eventum()
+    app.lifespan.add_resource(Resource('a', events))
+    app.lifespan.add_resource(Resource('b', events, fail=True))
+    with pytest.raises(RuntimeError, match='b failed'):
+        await app.lifespan.startup()
+    assert events == ['start a', 'stop a']
+
+
+@pytest.mark.asyncio
+async def test_shutdown_releases_resources_when_context_exit_fails():
+    """
+    Test that the resources are shut down even if the context lifespan raises on exit.
+    """
+    events = []
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        yield
+        raise RuntimeError('flush failed')
+
+    app = Eventum(lifespan=lifespan)
+    app.lifespan.add_resource(Resource('a', events))
+    await app.lifespan.startup()
+    with pytest.raises(RuntimeError, match='flush failed'):
+        await app.lifespan.shutdown()
+    assert events == ['start a', 'stop a']
+
+
+@pytest.mark.asyncio
+async def test_failing_shutdown_hook_still_releases_context_and_resources():
+    """
+    Test that a raising shutdown hook does not keep the context lifespan entered nor the
+    resources started, and that its error is raised after they are released.
+    """
+    events = []
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        yield
+        events.append('exit context')
+
+    app = Eventum(lifespan=lifespan)
+    app.lifespan.add_resource(Resource('a', events))
+
+    @app.lifespan_event('shutdown')
+    async def fail():
+        raise RuntimeError('hook failed')
+
+    await app.lifespan.startup()
+    with pytest.raises(RuntimeError, match='hook failed'):
+        await app.lifespan.shutdown()
+    assert events == ['start a', 'exit context', 'stop a']
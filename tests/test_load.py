@@ -0,0 +1,75 @@
+import asyncio
+import time
+import pytest
+from eventum_asgi.app import Eventum
+from eventum_asgi.connection import WSConnection
+from eventum_asgi.load import LoopMonitor
+from eventum_asgi.testclient import InMemoryTestClient, WebSocketRejected
+
+
+def test_shedding_hysteresis():
+    """
+    Test that shedding starts above the shed threshold and stops only below the recover threshold.
+    """
+    monitor = LoopMonitor(shed_lag=0.1, recover_lag=0.02, smoothing=1.0, broadcast_slowdown=3.0)
+    monitor.record(0.05)
+    assert not monitor.shedding and monitor.broadcast_factor == 1.0
+    monitor.record(0.2)
+    assert monitor.shedding and monitor.broadcast_factor == 3.0
+    monitor.record(0.05)
+    assert monitor.shedding
+    monitor.record(0.01)
+    assert not monitor.shedding
+    assert monitor.max_lag == 0.2
+
+
+@pytest.mark.asyncio
+async def test_blocked_loop_sheds_handshakes_and_low_priority_events():
+    """
+    Test that a blocked loop is measured, and that while shedding new handshakes are rejected
+    and low-priority events are dropped, until the lag recovers.
+    """
+    app = Eventum(lag_sample_interval=0.01, shed_lag=0.05, recover_lag=0.01)
+    handled = []
+
+    @app.handshake_route('/')
+    async def index(connection: WSConnection):
+        await connection.accept()
+
+    @app.event('analytics', priority='low')
+    async def analytics(connection: WSConnection, event: dict):
+        handled.append('analytics')
+
+    @app.event('chat')
+    async def chat(connection: WSConnection, event: dict):
+        handled.append('chat')
+        await connection.send_json({'event': 'ok'})
+
+    async with InMemoryTestClient(app) as client:
+        conn = await client.connect(path='/')
+        await asyncio.sleep(0.02)
+        time.sleep(0.3)
+        await asyncio.sleep(0.015)
+        assert app.load_monitor.shedding
+
+        with pytest.raises(WebSocketRejected) as rejected:
+            await client.connect(path='/')
+        assert rejected.value.status_code == 503
+
+        await conn.send_json({'event': 'analytics'})
+        await conn.send_json({'event': 'chat'})
+        assert await conn.receive_json() == {'event': 'ok'}
+        assert handled == ['chat']
+
+        while app.load_monitor.shedding:
+            await asyncio.sleep(0.01)
+        await conn.send_json({'event': 'analytics'})
+        await conn.send_json({'event': 'chat'})
+        await conn.receive_json()
+        assert handled == ['chat', 'analytics', 'chat']
+
+    snapshot = app.metrics.snapshot()
+    assert snapshot['load.lag_max'] >= 0.25
+    assert snapshot['load.shed_periods'] == 1
+    assert snapshot['load.events_dropped'] == 1
+    assert snapshot['admission.rejected_overload'] == 1
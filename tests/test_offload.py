@@ -0,0 +1,219 @@
+import asyncio
+import os
+import threading
+import time
+import pytest
+from eventum_asgi.app import Eventum
+from eventum_asgi.connection import WSConnection
+from eventum_asgi.offload import ProcessOffloader, ThreadOffloader
+from eventum_asgi.streams import encode_chunk, FLAG_END
+from eventum_asgi.testclient import InMemoryTestClient
+
+
+async def accept(connection: WSConnection):
+    await connection.accept()
+
+
+@pytest.mark.asyncio
+async def test_sync_handler_runs_on_thread_pool():
+    """
+    Test that a plain `def` handler runs off the event loop and its result is sent back.
+    """
+    app = Eventum(thread_pool_size=2)
+    app.add_handshake_route('/', accept)
+    main_thread = threading.get_ident()
+
+    @app.event('compute')
+    def compute(connection: WSConnection, event: dict):
+        time.sleep(0.01)
+        return {'thread': threading.get_ident() != main_thread, 'user': connection.get_flag('user')}
+
+    async with InMemoryTestClient(app) as client:
+        conn = await client.connect(path='/')
+        await conn.send_json({'event': 'compute'})
+        assert await conn.receive_json() == {'thread': True, 'user': None}
+
+    metrics = app.metrics.snapshot()
+    assert metrics['thread_pool.max_workers'] == 2
+    assert metrics['thread_pool.completed'] == 1
+    assert metrics['thread_pool.active'] == 0
+
+
+@pytest.mark.asyncio
+async def test_async_handler_offloaded_to_thread():
+    """
+    Test that an async handler registered with offload='thread' can still send through its connection.
+    """
+    app = Eventum()
+    app.add_handshake_route('/', accept)
+    main_thread = threading.get_ident()
+
+    async def blocking(connection: WSConnection, event: dict):
+        time.sleep(0.01)
+        await connection.send_text('offloaded' if threading.get_ident() != main_thread else 'inline')
+
+    app.add_event('blocking', blocking, offload='thread')
+
+    async with InMemoryTestClient(app) as client:
+        conn = await client.connect(path='/')
+        await conn.send_json({'event': 'blocking'})
+        assert await conn.recv() == 'offloaded'
+
+
+@pytest.mark.asyncio
+async def test_thread_offloaded_async_handler_result_is_sent():
+    """
+    Test that the return value of an async handler run with offload='thread' is sent back,
+    like the one of a synchronous handler.
+    """
+    app = Eventum()
+    app.add_handshake_route('/', accept)
+
+    async def lookup(connection: WSConnection, event: dict):
+        time.sleep(0.01)
+        return {'event': 'lookup', 'key': event['key']}
+
+    app.add_event('lookup', lookup, offload='thread')
+
+    async with InMemoryTestClient(app) as client:
+        conn = await client.connect(path='/')
+        await conn.send_json({'event': 'lookup', 'key': 'a'})
+        assert await conn.receive_json() == {'event': 'lookup', 'key': 'a'}
+
+
+def test_thread_offloader_survives_event_loops():
+    """
+    Test that an offloader built outside any event loop serves calls from successive loops,
+    as an application does across lifespans.
+    """
+    offloader = ThreadOffloader(max_workers=1, max_pending=0)
+
+    async def serve() -> list:
+        await offloader.startup()
+        try:
+            return await asyncio.gather(*(offloader.run(time.sleep, 0.01) for _ in range(3)))
+        finally:
+            await offloader.shutdown()
+
+    assert asyncio.run(serve()) == [None] * 3
+    assert asyncio.run(serve()) == [None] * 3
+
+
+@pytest.mark.asyncio
+async def test_thread_offloader_rejects_calls_once_shut_down():
+    """
+    Test that calls arriving during or after shutdown are rejected instead of reaching a
+    stopped executor, including a call that was waiting for a slot.
+    """
+    offloader = ThreadOffloader(max_workers=1, max_pending=0)
+    await offloader.startup()
+    running = asyncio.ensure_future(offloader.run(time.sleep, 0.05))
+    await asyncio.sleep(0.01)
+    waiting = asyncio.ensure_future(offloader.run(time.sleep, 0))
+    await asyncio.sleep(0)
+    await offloader.shutdown()
+
+    assert await running is None
+    with pytest.raises(RuntimeError):
+        await waiting
+    with pytest.raises(RuntimeError):
+        await offloader.run(time.sleep, 0)
+    await offloader.startup()
+    assert await offloader.run(time.sleep, 0) is None
+    await offloader.shutdown()
+
+
+def test_unknown_offload_mode_rejected():
+    app = Eventum()
+    with pytest.raises(ValueError):
+        app.add_event('x', accept, offload='fiber')
+
+
+def word_count(event: dict):
+    return {'words': len(event['text'].split()), 'pid': os.getpid()}
+
+
+@pytest.mark.asyncio
+async def test_process_offload_sends_result():
+    """
+    Test that offload='process' runs the function in a worker process started by the lifespan.
+    """
+    app = Eventum(process_pool_size=1)
+    app.add_handshake_route('/', accept)
+    app.add_event('count', word_count, offload='process')
+
+    async with InMemoryTestClient(app) as client:
+        assert app.process_offloader.started
+        conn = await client.connect(path='/')
+        await conn.send_json({'event': 'count', 'text': 'one two three'})
+        response = await conn.receive_json()
+        assert response['words'] == 3
+        assert response['pid'] != os.getpid()
+    assert not app.process_offloader.started
+
+
+def checksum(payload):
+    return type(payload).__name__, sum(payload[::4096])
+
+
+def thumbnail(event: dict, payload):
+    return {'event': 'thumbnail', 'name': event['name'], 'type': type(payload).__name__,
+            'size': len(payload), 'checksum': sum(payload[::1000]), 'pid': os.getpid()}
+
+
+@pytest.mark.asyncio
+async def test_process_offload_shared_memory_payload():
+    """
+    Test that large binary arguments reach the worker as a memoryview over shared memory.
+    """
+    offloader = ProcessOffloader(max_workers=1, shared_memory_threshold=1024)
+    payload = bytes(range(256)) * 1024
+    try:
+        assert await offloader.run(checksum, payload) == ('memoryview', sum(payload[::4096]))
+        assert await offloader.run(checksum, payload[:512]) == ('bytes', sum(payload[:512][::4096]))
+    finally:
+        await offloader.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_process_route_receives_binary_stream_through_shared_memory():
+    """
+    Test that a process route registered with stream=True gets the uploaded stream as a
+    memoryview over shared memory, and that a stream above the limit is refused.
+    """
+    app = Eventum(process_pool_size=1, process_stream_max_bytes=100_000)
+    app.add_handshake_route('/', accept)
+    app.add_event('thumbnail', thumbnail, offload='process', stream=True)
+    payload = bytes(range(256)) * 200
+
+    async with InMemoryTestClient(app) as client:
+        conn = await client.connect(path='/')
+        await conn.send_json({'event': 'thumbnail', 'name': 'cat.png', 'stream': 3, 'size': len(payload)})
+        credit = 0
+        chunks = [payload[i:i + 10_000] for i in range(0, len(payload), 10_000)]
+        for seq, chunk in enumerate(chunks):
+            while credit == 0:
+                credit += (await conn.receive_json())['credit']
+            await conn.send(encode_chunk(3, seq, chunk, FLAG_END if seq == len(chunks) - 1 else 0))
+            credit -= 1
+        message = await conn.receive_json()
+        while message['event'] != 'thumbnail':
+            message = await conn.receive_json()
+        assert message == {'event': 'thumbnail', 'name': 'cat.png', 'type': 'memoryview', 'size': len(payload),
+                           'checksum': sum(payload[::1000]), 'pid': message['pid']}
+        assert message['pid'] != os.getpid()
+
+        await conn.send_json({'event': 'thumbnail', 'name': 'big.png', 'stream': 4, 'size': 200_000})
+        assert (await conn.receive_json())['event'] == 'validation_error'
+
+
+def test_process_stream_requires_process_offload():
+    app = Eventum()
+    with pytest.raises(ValueError):
+        app.add_event('x', thumbnail, stream=True)
+
+
+def test_process_offload_rejects_async_handler():
+    app = Eventum()
+    with pytest.raises(ValueError):
+        app.add_event('x', accept, offload='process')
@@ -0,0 +1,118 @@
+import asyncio
+import pytest
+from eventum_asgi.app import Eventum
+from eventum_asgi.connection import WSConnection
+from eventum_asgi.testclient import InMemoryTestClient
+
+
+@pytest.mark.asyncio
+async def test_presence_collapses_sockets_and_batches_diffs():
+    """
+    Test that sockets of one user count once and that changes are sent as one diff per interval.
+    """
+    app = Eventum(presence_batch_interval=0.02)
+
+    @app.handshake_route('/')
+    async def index(connection: WSConnection):
+        connection.add_flag('user_id', connection.request_headers.model_extra['x-user'])
+        await connection.accept()
+
+    @app.event('view')
+    async def view(connection: WSConnection, event: dict):
+        app.presence.join(connection, event['doc'])
+        await connection.send_json({'event': 'viewing', 'count': app.presence.count(event['doc'])})
+
+    async with InMemoryTestClient(app) as client:
+        alice = await client.connect(path='/', extra_headers={'X-User': 'alice'})
+        alice_tab = await client.connect(path='/', extra_headers={'X-User': 'alice'})
+        bob = await client.connect(path='/', extra_headers={'X-User': 'bob'})
+
+        for conn in (alice, alice_tab, bob):
+            await conn.send_json({'event': 'view', 'doc': 'doc-1'})
+            await conn.receive_json()
+        assert app.presence.count('doc-1') == 2
+
+        diff = await alice.receive_json()
+        assert diff['event'] == 'presence'
+        assert sorted(diff['joined']) == ['alice', 'bob']
+        assert diff['left'] == [] and diff['count'] == 2
+        assert await bob.receive_json() == diff
+
+        await alice_tab.close()
+        await bob.close()
+        assert await alice.receive_json() == {'event': 'presence', 'topic': 'doc-1',
+                                              'joined': [], 'left': ['bob'], 'count': 1}
+        assert app.presence.members('doc-1') == ['alice']
+
+    assert app.metrics.snapshot()['presence.diffs_sent'] == 2
+
+
+@pytest.mark.asyncio
+async def test_presence_leave_and_rejoin_within_interval_is_silent():
+    """
+    Test that a user leaving and joining again within one interval produces no diff.
+    """
+    app = Eventum(presence_batch_interval=10)
+    connections = []
+
+    @app.handshake_route('/')
+    async def index(connection: WSConnection):
+        connections.append(connection)
+        await connection.accept()
+
+    async with InMemoryTestClient(app) as client:
+        await client.connect(path='/')
+        connection = connections[0]
+        assert app.presence.join(connection, 'room') is True
+        assert app.presence.join(connection, 'room') is False
+        await app.presence.flush()
+        assert app.presence.leave(connection, 'room') is True
+        assert app.presence.join(connection, 'room') is True
+        await app.presence.flush()
+
+    assert app.metrics.snapshot()['presence.diffs_sent'] == 1
+
+
+@pytest.mark.asyncio
+async def test_presence_flush_does_not_wait_for_stalled_sockets(monkeypatch):
+    """
+    Test that a flush hands diffs off without waiting and that a socket falling behind is
+    counted and removed from its topics.
+    """
+    class StalledConnection(WSConnection):
+        async def send(self, message):
+            if self.get_flag('stalled') and '"presence"' in message.get('text', ''):
+                await asyncio.Event().wait()
+            await super().send(message)
+
+    monkeypatch.setattr('eventum_asgi.app.WSConnection', StalledConnection)
+    app = Eventum(presence_batch_interval=10)
+    app.presence.max_backlog = 1
+    connections = []
+
+    @app.handshake_route('/')
+    async def index(connection: WSConnection):
+        connection.add_flag('user_id', connection.request_headers.model_extra['x-user'])
+        connection.add_flag('stalled', connection.request_headers.model_extra['x-user'] == 'bob')
+        connections.append(connection)
+        await connection.accept()
+
+    async with InMemoryTestClient(app) as client:
+        alice = await client.connect(path='/', extra_headers={'X-User': 'alice'})
+        await client.connect(path='/', extra_headers={'X-User': 'bob'})
+        healthy, stalled = connections
+        app.presence.join(healthy, 'a')
+        for topic in ('a', 'b', 'c'):
+            app.presence.join(stalled, topic)
+        await asyncio.wait_for(app.presence.flush(), 1)
+
+        diff = await alice.receive_json()
+        assert diff['topic'] == 'a' and sorted(diff['joined']) == ['alice', 'bob']
+        assert app.presence.topics(stalled) == set()
+        assert app.presence.members('a') == ['alice']
+
+        await asyncio.wait_for(app.presence.flush(), 1)
+        assert await alice.receive_json() == {'event': 'presence', 'topic': 'a',
+                                              'joined': [], 'left': ['bob'], 'count': 1}
+
+    assert app.metrics.snapshot()['presence.send_failures'] == 1
@@ -0,0 +1,62 @@
+import asyncio
+import pytest
+from eventum_asgi.app import Eventum
+from eventum_asgi.connection import WSConnection
+from eventum_asgi.testclient import InMemoryTestClient
+
+
+@pytest.mark.asyncio
+async def test_async_for_ends_cleanly_on_disconnect():
+    """
+    Test that iterating over a connection yields every frame and stops on disconnect.
+    """
+    app = Eventum()
+    received = []
+    finished = asyncio.Event()
+
+    @app.handshake_route('/')
+    async def index(connection: WSConnection):
+        await connection.accept()
+        async for message in connection:
+            received.append(message)
+        finished.set()
+
+    async with InMemoryTestClient(app) as client:
+        conn = await client.connect(path='/')
+        await conn.send('a')
+        await conn.send(b'b')
+        await conn.close()
+        await asyncio.wait_for(finished.wait(), 1)
+
+    assert received == ['a', b'b']
+
+
+@pytest.mark.asyncio
+async def test_iter_batches_drains_available_frames():
+    """
+    Test that buffered frames are returned together, bounded by max_items.
+    """
+    app = Eventum()
+    batches = []
+    ready = asyncio.Event()
+    finished = asyncio.Event()
+
+    @app.handshake_route('/')
+    async def index(connection: WSConnection):
+        await connection.accept()
+        await ready.wait()
+        async for batch in connection.iter_batches(max_items=4):
+            batches.append(batch)
+        finished.set()
+
+    async with InMemoryTestClient(app) as client:
+        conn = await client.connect(path='/')
+        for i in range(6):
+            await conn.send(str(i))
+        ready.set()
+        await asyncio.sleep(0.01)
+        await conn.send('6')
+        await conn.close()
+        await asyncio.wait_for(finished.wait(), 1)
+
+    assert batches == [['0', '1', '2', '3'], ['4', '5'], ['6']]
@@ -0,0 +1,166 @@
+import asyncio
+import pytest
+from eventum_asgi.app import Eventum
+from eventum_asgi.connection import WSConnection
+from eventum_asgi.response_cache import ResponseCache
+from eventum_asgi.testclient import InMemoryTestClient
+
+
+@pytest.mark.asyncio
+async def test_identical_lookups_are_answered_from_cache():
+    """
+    Test that identical payloads get the memoized frames, keyed on the selected fields only,
+    and that invalidation makes the handler run again.
+    """
+    app = Eventum()
+    calls = []
+
+    @app.handshake_route('/')
+    async def index(connection: WSConnection):
+        await connection.accept()
+
+    @app.event('room_info', cache=True, cache_key=['room'])
+    async def room_info(connection: WSConnection, event: dict):
+        calls.append(event['room'])
+        await connection.send_json({'event': 'room_info', 'room': event['room'], 'version': len(calls)})
+
+    async with InMemoryTestClient(app) as client:
+        first = await client.connect(path='/')
+        second = await client.connect(path='/')
+        await first.send_json({'event': 'room_info', 'room': 'lobby', 'id': 1})
+        reply = await first.receive_json()
+        await second.send_json({'event': 'room_info', 'room': 'lobby', 'id': 2})
+        assert await second.receive_json() == reply
+        await second.send_json({'event': 'room_info', 'room': 'other'})
+        assert (await second.receive_json())['room'] == 'other'
+        assert calls == ['lobby', 'other']
+
+        app.response_cache.invalidate('room_info', {'room': 'lobby'})
+        await first.send_json({'event': 'room_info', 'room': 'lobby'})
+        assert (await first.receive_json())['version'] == 3
+        await first.send_json({'event': 'room_info', 'room': 'other'})
+        assert (await first.receive_json())['version'] == 2
+
+    snapshot = app.metrics.snapshot()
+    assert snapshot['cache.hits'] == 2 and snapshot['cache.misses'] == 3
+    assert snapshot['cache.routes']['room_info'] == {'hits': 2, 'misses': 3, 'hit_rate': 0.4, 'entries': 2}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_misses_run_the_handler_once():
+    """
+    Test that identical events arriving while the handler runs wait for its reply.
+    """
+    app = Eventum()
+    calls = []
+
+    @app.handshake_route('/')
+    async def index(connection: WSConnection):
+        await connection.accept()
+
+    @app.event('config', cache=ResponseCache(maxsize=8, ttl=0.05, metrics=app.metrics))
+    async def config(connection: WSConnection, event: dict):
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        await connection.send_json({'event': 'config', 'theme': 'dark'})
+
+    async with InMemoryTestClient(app) as client:
+        connections = [await client.connect(path='/') for _ in range(5)]
+        for conn in connections:
+            await conn.send_json({'event': 'config'})
+        replies = [await conn.receive_json() for conn in connections]
+        assert replies == [{'event': 'config', 'theme': 'dark'}] * 5
+        assert len(calls) == 1
+
+        await asyncio.sleep(0.06)
+        await connections[0].send_json({'event': 'config'})
+        await connections[0].receive_json()
+        assert len(calls) == 2
+    assert app.metrics.snapshot()['cache.coalesced'] == 4
+
+
+@pytest.mark.asyncio
+async def test_cache_keeps_only_the_frames_of_the_handler_call():
+    """
+    Test that a reply sent through a priority lane is cached, that a frame sent to the connection
+    by another task is not leaked to other clients, and that an empty reply is not cached.
+    """
+    app = Eventum(priority_lanes=True)
+    calls = []
+
+    @app.handshake_route('/')
+    async def index(connection: WSConnection):
+        await connection.accept()
+
+    async def notify(connection: WSConnection, sent: asyncio.Event):
+        await connection.send_json({'event': 'private', 'user': 'first'})
+        sent.set()
+
+    @app.event('config', cache=True)
+    async def config(connection: WSConnection, event: dict):
+        calls.append('config')
+        sent = asyncio.Event()
+        connection.spawn(notify(connection, sent))
+        await sent.wait()
+        await connection.send_json({'event': 'config', 'version': 1}, priority='high')
+
+    @app.event('status', cache=True)
+    async def status(connection: WSConnection, event: dict):
+        calls.append('status')
+        if len(calls) > 2:
+            await connection.send_json({'event': 'status'})
+
+    async with InMemoryTestClient(app) as client:
+        first = await client.connect(path='/')
+        second = await client.connect(path='/')
+        await first.send_json({'event': 'config'})
+        assert {(await first.receive_json())['event'] for _ in range(2)} == {'private', 'config'}
+        await second.send_json({'event': 'config'})
+        assert await second.receive_json() == {'event': 'config', 'version': 1}
+
+        await first.send_json({'event': 'status'})
+        await first.send_json({'event': 'status'})
+        assert await first.receive_json() == {'event': 'status'}
+        assert calls == ['config', 'status', 'status']
+
+    assert app.metrics.snapshot()['cache.hits'] == 1
+
+
+@pytest.mark.asyncio
+async def test_reply_computed_across_an_invalidation_is_not_kept():
+    """
+    Test that a reply started before an invalidation is sent but neither stored nor shared with
+    the events arriving after it.
+    """
+    app = Eventum()
+    started = asyncio.Event()
+    release = asyncio.Event()
+    calls = []
+
+    @app.handshake_route('/')
+    async def index(connection: WSConnection):
+        await connection.accept()
+
+    @app.event('settings', cache=True)
+    async def settings(connection: WSConnection, event: dict):
+        calls.append(1)
+        version = len(calls)
+        if version == 1:
+            started.set()
+            await release.wait()
+        await connection.send_json({'event': 'settings', 'version': version})
+
+    async with InMemoryTestClient(app) as client:
+        first = await client.connect(path='/')
+        second = await client.connect(path='/')
+        await first.send_json({'event': 'settings'})
+        await started.wait()
+        app.response_cache.invalidate('settings')
+        await second.send_json({'event': 'settings'})
+        assert await second.receive_json() == {'event': 'settings', 'version': 2}
+
+        release.set()
+        assert await first.receive_json() == {'event': 'settings', 'version': 1}
+        await first.send_json({'event': 'settings'})
+        assert await first.receive_json() == {'event': 'settings', 'version': 2}
+        assert len(calls) == 2
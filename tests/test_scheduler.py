@@ -0,0 +1,143 @@
+import asyncio
+import time
+import pytest
+from eventum_asgi.app import Eventum
+from eventum_asgi.connection import WSConnection
+from eventum_asgi.scheduler import Scheduler
+from eventum_asgi.testclient import InMemoryTestClient
+
+
+@pytest.mark.asyncio
+async def test_job_runs_once_per_tick_for_every_subscriber():
+    """
+    Test that a job runs once per tick and that its result is pushed to every subscriber.
+    """
+    app = Eventum()
+    calls = []
+
+    @app.every(0.02)
+    async def prices():
+        calls.append(1)
+        return {'event': 'prices', 'tick': len(calls)}
+
+    @app.handshake_route('/')
+    async def index(connection: WSConnection):
+        await connection.accept()
+        prices.subscribe(connection)
+
+    async with InMemoryTestClient(app) as client:
+        first = await client.connect(path='/')
+        second = await client.connect(path='/')
+        message = await first.receive_json()
+        assert message['event'] == 'prices'
+        while (await second.receive_json())['tick'] < message['tick']:
+            pass
+        assert len(calls) - message['tick'] <= 1
+
+        await second.close()
+        await asyncio.sleep(0.05)
+        assert len(prices.subscribers) == 1
+
+    stats = app.metrics.snapshot()['scheduler.jobs']['prices']
+    assert stats['runs'] == len(calls)
+    assert stats['subscribers'] == 0
+    assert stats['max_duration'] >= stats['mean_duration'] >= 0
+
+
+@pytest.mark.asyncio
+async def test_slow_job_skips_or_catches_up_missed_ticks():
+    """
+    Test the missed-tick policies of a job slower than its interval.
+    """
+    scheduler = Scheduler()
+    runs = {'skip': 0, 'catch_up': 0}
+
+    @scheduler.every(0.01, missed='skip')
+    async def skip():
+        runs['skip'] += 1
+        await asyncio.sleep(0.035)
+
+    @scheduler.every(0.01, missed='catch_up')
+    async def catch_up():
+        runs['catch_up'] += 1
+        await asyncio.sleep(0.035)
+
+    await scheduler.startup()
+    await asyncio.sleep(0.2)
+    await scheduler.shutdown()
+
+    assert skip.skipped > 0
+    assert runs['catch_up'] >= runs['skip'] > 0
+    assert catch_up.skipped == 0 and catch_up.backlog > 0
+
+
+@pytest.mark.asyncio
+async def test_schedule_does_not_drift():
+    """
+    Test that ticks stay on the interval grid when the job takes part of the interval
+    and when the loop is blocked.
+    """
+    scheduler = Scheduler()
+    loop = asyncio.get_running_loop()
+    ticks = []
+
+    @scheduler.every(0.02, jitter=0.01)
+    async def job():
+        ticks.append(loop.time())
+        await asyncio.sleep(0.01)
+
+    await scheduler.startup()
+    await asyncio.sleep(0.07)
+    time.sleep(0.05)
+    await asyncio.sleep(0.1)
+    await scheduler.shutdown()
+
+    phase = ticks[0] % 0.02
+    for tick in ticks:
+        offset = (tick - phase) % 0.02
+        assert min(offset, 0.02 - offset) < 0.01
+    assert job.skipped >= 1
+
+
+class FakeConnection:
+    lanes = None
+
+    def __init__(self, release: asyncio.Event):
+        self.release = release
+        self.received = []
+
+    def add_disconnect_callback(self, callback):
+        pass
+
+    async def send(self, message):
+        await self.release.wait()
+        self.received.append(message['text'])
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_does_not_hold_the_job():
+    """
+    Test that a subscriber stuck on a send misses results instead of delaying the other
+    subscribers and the next runs of the job.
+    """
+    scheduler = Scheduler()
+    ready = asyncio.Event()
+    ready.set()
+    fast, slow = FakeConnection(ready), FakeConnection(asyncio.Event())
+
+    @scheduler.every(0.01)
+    def tick():
+        return 'tick'
+
+    tick.subscribe(fast)
+    tick.subscribe(slow)
+    await scheduler.startup()
+    await asyncio.sleep(0.1)
+    assert len(fast.received) >= 5 and slow.received == []
+    assert tick.skipped == 0 and tick.dropped >= 4
+
+    slow.release.set()
+    await asyncio.sleep(0)
+    await scheduler.shutdown()
+    assert slow.received == ['tick']
+    assert tick.stats()['dropped'] == tick.dropped
@@ -0,0 +1,70 @@
+import orjson
+import pydantic
+import pytest
+from eventum_asgi.app import Eventum
+from eventum_asgi.connection import WSConnection
+from eventum_asgi.events import Event, TypedEvent
+from eventum_asgi.testclient import InMemoryTestClient
+
+
+class UserJoined(TypedEvent):
+    event: str = 'user_joined'
+    user_id: int
+    name: str
+
+
+class AdminJoined(UserJoined):
+    event = 'admin_joined'
+    level: int = 1
+
+
+class Profile(pydantic.BaseModel):
+    user_id: int
+    name: str
+
+
+def test_typed_event_is_slotted_and_serializes():
+    joined = UserJoined(user_id=1, name='alice')
+    assert not hasattr(joined, '__dict__')
+    assert joined.to_json() == '{"event":"user_joined","user_id":1,"name":"alice"}'
+    assert orjson.loads(AdminJoined(user_id=2, name='bob').to_json_bytes()) == {
+        'event': 'admin_joined', 'user_id': 2, 'name': 'bob', 'level': 1
+    }
+    with pytest.raises(TypeError):
+        UserJoined(user_id=1)
+    with pytest.raises(ValueError):
+        class Broken(TypedEvent):
+            tags: list = []
+
+
+@pytest.mark.asyncio
+async def test_send_json_and_send_model():
+    app = Eventum()
+
+    @app.handshake_route('/')
+    async def index(connection: WSConnection):
+        await connection.accept()
+
+    @app.event('send')
+    async def send(connection: WSConnection, event: dict):
+        await connection.send_json({'a': 1})
+        await connection.send_json(UserJoined(user_id=1, name='alice'), binary=True)
+        await connection.send_json(Event(event='plain'))
+        await connection.send_model(Profile(user_id=2, name='bob'))
+        await connection.send_text(UserJoined(user_id=3, name='carol'))
+
+    def profile(connection: WSConnection, event: dict):
+        return Profile(user_id=4, name='dave')
+
+    app.add_event('profile', profile)
+
+    async with InMemoryTestClient(app) as client:
+        conn = await client.connect(path='/')
+        await conn.send_json({'event': 'send'})
+        assert await conn.recv() == '{"a":1}'
+        assert await conn.recv() == b'{"event":"user_joined","user_id":1,"name":"alice"}'
+        assert await conn.recv() == '{"event":"plain"}'
+        assert await conn.recv() == '{"user_id":2,"name":"bob"}'
+        assert await conn.recv() == '{"event":"user_joined","user_id":3,"name":"carol"}'
+        await conn.send_json({'event': 'profile'})
+        assert await conn.recv() == '{"user_id":4,"name":"dave"}'
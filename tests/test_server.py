@@ -0,0 +1,108 @@
+import asyncio
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import orjson
+import pytest
+import uvicorn
+import websockets
+from eventum_asgi import Eventum, WSConnection
+from eventum_asgi.server import WorkerServer, bind_socket, import_app
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+app = Eventum()
+
+
+@app.handshake_route('/')
+async def index(connection: WSConnection):
+    await connection.accept()
+
+
+@app.event('whoami')
+async def whoami(connection: WSConnection, event: dict):
+    await connection.send_json({'event': 'whoami', 'pid': os.getpid()})
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def test_import_app():
+    """
+    Test that applications are imported from 'module:attribute' strings.
+    """
+    assert import_app(f'{__name__}:app') is app
+    with pytest.raises(ValueError):
+        import_app(__name__)
+
+
+def test_reuse_port_sockets_share_an_address():
+    """
+    Test that several SO_REUSEPORT sockets bind the same address, and that plain sockets do not.
+    """
+    port = free_port()
+    first = bind_socket('127.0.0.1', port)
+    second = bind_socket('127.0.0.1', port)
+    try:
+        assert first.getsockname() == second.getsockname()
+        with pytest.raises(OSError):
+            bind_socket('127.0.0.1', port, reuse_port=False)
+    finally:
+        first.close()
+        second.close()
+
+
+@pytest.mark.asyncio
+async def test_worker_recycles_after_max_connections_or_memory():
+    """
+    Test that the worker server asks to stop once a threshold is crossed.
+    """
+    async def noop_app(scope, receive, send):
+        pass
+
+    server = WorkerServer(uvicorn.Config(app=app), max_connections=2)
+    counting_app = server.count_connections(noop_app)
+    await counting_app({'type': 'lifespan'}, None, None)
+    await counting_app({'type': 'websocket'}, None, None)
+    assert not await server.on_tick(1)
+    await counting_app({'type': 'websocket'}, None, None)
+    assert await server.on_tick(2)
+    assert server.recycle_reason == 'served 2 connections'
+
+    server = WorkerServer(uvicorn.Config(app=app), max_memory=1)
+    assert not await server.on_tick(1)
+    assert await server.on_tick(10)
+
+
+@pytest.mark.asyncio
+async def test_supervisor_serves_with_workers_and_replaces_recycled_ones():
+    """
+    Test the `eventum` command: two workers serve the application, recycled workers are
+    replaced and SIGTERM stops everything.
+    """
+    port = free_port()
+    process = subprocess.Popen([sys.executable, '-m', 'eventum_asgi.cli', 'tests.test_server:app',
+                                '--port', str(port), '--workers', '2', '--max-connections', '2',
+                                '--log-level', 'warning'], cwd=ROOT)
+    try:
+        pids = []
+        deadline = time.monotonic() + 10
+        while len(pids) < 8 and time.monotonic() < deadline:
+            try:
+                async with websockets.connect(f'ws://127.0.0.1:{port}/') as ws:
+                    await ws.send(orjson.dumps({'event': 'whoami'}).decode('utf-8'))
+                    pids.append(orjson.loads(await ws.recv())['pid'])
+            except (OSError, websockets.exceptions.ConnectionClosed):
+                pass
+            await asyncio.sleep(0.15)
+        assert len(pids) == 8
+        assert len(set(pids)) > 2
+    finally:
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(timeout=10) == 0
@@ -0,0 +1,145 @@
+import asyncio
+import orjson
+import pytest
+from eventum_asgi.app import Eventum
+from eventum_asgi.connection import WSConnection
+from eventum_asgi.sessions import ReplayBuffer
+from eventum_asgi.testclient import InMemoryTestClient, ConnectionClosed
+
+
+def create_app(**kwargs) -> Eventum:
+    app = Eventum(**kwargs)
+
+    @app.handshake_route('/')
+    async def index(connection: WSConnection):
+        await connection.accept(resumable=True)
+
+    @app.event('publish')
+    async def publish(connection: WSConnection, event: dict):
+        for value in event['values']:
+            await connection.send_resumable({'event': 'value', 'value': value})
+
+    return app
+
+
+@pytest.mark.asyncio
+async def test_resume_replays_missed_events():
+    """
+    Test that a reconnecting client gets exactly the events sent after its last sequence number.
+    """
+    app = create_app()
+    async with InMemoryTestClient(app) as client:
+        conn = await client.connect(path='/')
+        hello = await conn.receive_json()
+        assert hello == {'event': 'session', 'token': hello['token'], 'resumed': False, 'seq': 0}
+        assert conn.response_headers['x-eventum-session'] == hello['token']
+
+        await conn.send_json({'event': 'publish', 'values': [1, 2, 3]})
+        received = [await conn.receive_json() for _ in range(3)]
+        assert [event['seq'] for event in received] == [1, 2, 3]
+        await conn.close()
+
+        conn = await client.connect(path='/', extra_headers={'X-Eventum-Session': hello['token'],
+                                                             'X-Eventum-Last-Seq': '1'})
+        assert await conn.receive_json() == {'event': 'session', 'token': hello['token'], 'resumed': True, 'seq': 3}
+        assert await conn.receive_json() == {'event': 'value', 'value': 2, 'seq': 2}
+        assert await conn.receive_json() == {'event': 'value', 'value': 3, 'seq': 3}
+        await conn.close()
+
+        conn = await client.connect(path=f'/?session={hello["token"]}&last_seq=3')
+        assert (await conn.receive_json())['resumed'] is True
+
+    metrics = app.metrics.snapshot()
+    assert metrics['sessions.created'] == 1
+    assert metrics['sessions.resumed'] == 2
+
+
+@pytest.mark.asyncio
+async def test_evicted_or_expired_session_starts_over():
+    """
+    Test that a gap in the replay buffer or an expired session issues a new session.
+    """
+    app = create_app(session_max_events=2, session_ttl=0)
+    async with InMemoryTestClient(app) as client:
+        conn = await client.connect(path='/')
+        token = (await conn.receive_json())['token']
+        await conn.send_json({'event': 'publish', 'values': [1, 2, 3]})
+        for _ in range(3):
+            await conn.receive_json()
+
+        assert app.sessions.sessions[token].buffer.since(0) is None
+        assert app.sessions.sessions[token].buffer.since(1) is not None
+        await conn.close()
+
+        conn = await client.connect(path=f'/?session={token}&last_seq=1')
+        hello = await conn.receive_json()
+        assert hello['resumed'] is False
+        assert hello['token'] != token
+        assert token not in app.sessions.sessions
+
+    assert app.metrics.snapshot()['sessions.expired'] >= 1
+
+
+
+@pytest.mark.asyncio
+async def test_token_does_not_take_over_attached_session():
+    """
+    Test that presenting the token of a session attached to a live connection starts a new session.
+    """
+    app = create_app()
+    async with InMemoryTestClient(app) as client:
+        owner = await client.connect(path='/')
+        token = (await owner.receive_json())['token']
+
+        intruder = await client.connect(path=f'/?session={token}&last_seq=0')
+        hello = await intruder.receive_json()
+        assert hello['resumed'] is False
+        assert hello['token'] != token
+
+        await owner.send_json({'event': 'publish', 'values': [1]})
+        assert await owner.receive_json() == {'event': 'value', 'value': 1, 'seq': 1}
+        assert app.sessions.sessions[token].connection is not None
+        await intruder.close()
+        await owner.close()
+
+    metrics = app.metrics.snapshot()
+    assert metrics['sessions.rejected_attached'] == 1
+    assert 'sessions.resumed' not in metrics
+
+def test_replay_buffer_bounds():
+    """
+    Test that the replay buffer is bounded by bytes as well as by count.
+    """
+    buffer = ReplayBuffer(max_events=100, max_bytes=10)
+    for value in range(5):
+        seq = buffer.next_seq()
+        buffer.append(seq, orjson.dumps({'v': value}).decode())
+    assert buffer.size <= 10
+    assert len(buffer.frames) == 1
+    assert buffer.since(4) == ['{"v":4}']
+    assert buffer.since(5) == []
+    assert buffer.since(6) is None
+
+
+@pytest.mark.asyncio
+async def test_failed_handshake_detaches_and_idle_sessions_expire():
+    """
+    Test that a handshake cancelled after `accept`, never reaching the event loop, detaches its
+    session and that the lifespan timer frees expired sessions without any new connection.
+    """
+    app = Eventum(session_ttl=0.05, session_sweep_interval=0.01)
+
+    @app.handshake_route('/')
+    async def index(connection: WSConnection):
+        await connection.accept(resumable=True)
+        raise asyncio.CancelledError()
+
+    async with InMemoryTestClient(app) as client:
+        conn = await client.connect(path='/')
+        assert (await conn.receive_json())['event'] == 'session'
+        with pytest.raises(ConnectionClosed):
+            await conn.recv()
+        assert app.metrics.snapshot()['sessions.detached'] == 1
+        await asyncio.sleep(0.1)
+        assert app.sessions.sessions == {}
+        assert app.metrics.snapshot()['sessions.expired'] == 1
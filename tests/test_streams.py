@@ -0,0 +1,86 @@
+import asyncio
+import io
+import pytest
+from eventum_asgi.app import Eventum
+from eventum_asgi.connection import WSConnection
+from eventum_asgi.streams import encode_chunk, decode_chunk, FLAG_END
+from eventum_asgi.testclient import InMemoryTestClient
+
+
+@pytest.mark.asyncio
+async def test_send_stream_with_credit_and_interleaved_events():
+    """
+    Test that a stream waits for client credit and lets regular events through meanwhile.
+    """
+    app = Eventum()
+    payload = bytes(range(256)) * 40
+
+    @app.handshake_route('/')
+    async def index(connection: WSConnection):
+        await connection.accept()
+
+    @app.event('download')
+    async def download(connection: WSConnection, event: dict):
+        stream = connection.streams.send(io.BytesIO(payload), chunk_size=1000, window=2)
+        await connection.send_json({'event': 'download', 'stream': stream.stream_id})
+
+    @app.event('ping')
+    async def ping(connection: WSConnection, event: dict):
+        await connection.send_text('pong')
+
+    async with InMemoryTestClient(app) as client:
+        conn = await client.connect(path='/')
+        await conn.send_json({'event': 'download'})
+        stream_id = (await conn.receive_json())['stream']
+
+        chunks = [decode_chunk(await conn.recv()) for _ in range(2)]
+        await conn.send_json({'event': 'ping'})
+        assert await conn.recv() == 'pong'
+
+        while not chunks[-1][2] & FLAG_END:
+            await conn.send_json({'event': 'stream.credit', 'stream': stream_id, 'credit': 1})
+            chunks.append(decode_chunk(await conn.recv()))
+
+        assert [seq for _, seq, _, _ in chunks] == list(range(11))
+        assert all(sid == stream_id for sid, _, _, _ in chunks)
+        assert b''.join(bytes(view) for _, _, _, view in chunks) == payload
+
+
+@pytest.mark.asyncio
+async def test_receive_stream_into_file():
+    """
+    Test that an uploaded stream is granted credit as it is consumed and written to a file.
+    """
+    app = Eventum()
+    done = asyncio.Event()
+    result = io.BytesIO()
+
+    @app.handshake_route('/')
+    async def index(connection: WSConnection):
+        await connection.accept()
+
+    @app.event('upload')
+    async def upload(connection: WSConnection, event: dict):
+        stream = await connection.streams.receive(event['stream'], window=4)
+
+        async def consume():
+            await stream.to_file(result)
+            done.set()
+        asyncio.ensure_future(consume())
+
+    async with InMemoryTestClient(app) as client:
+        conn = await client.connect(path='/')
+        await conn.send_json({'event': 'upload', 'stream': 7})
+        credit = (await conn.receive_json())['credit']
+        assert credit == 4
+
+        parts = [bytes([i]) * 100 for i in range(10)]
+        for seq, part in enumerate(parts):
+            while credit == 0:
+                credit += (await conn.receive_json())['credit']
+            flags = FLAG_END if seq == len(parts) - 1 else 0
+            await conn.send(encode_chunk(7, seq, part, flags))
+            credit -= 1
+
+        await asyncio.wait_for(done.wait(), 1)
+        assert result.getvalue() == b''.join(parts)
@@ -0,0 +1,115 @@
+import asyncio
+import copy
+import pytest
+from eventum_asgi.app import Eventum
+from eventum_asgi.connection import WSConnection
+from eventum_asgi.sync import json_diff, apply_patch
+from eventum_asgi.testclient import InMemoryTestClient
+
+
+def test_json_diff_round_trip():
+    """
+    Test that applying the computed patch to the old document yields the new one.
+    """
+    old = {'title': 'Doc', 'tags': ['a', 'b', 'c'], 'meta': {'a/b': 1, 'gone': True}, 'n': 1}
+    new = {'title': 'Doc 2', 'tags': ['a', 'x'], 'meta': {'a/b': 2}, 'n': True, 'added': [1]}
+    patch = json_diff(old, new)
+    assert {'op': 'replace', 'path': '/meta/a~1b', 'value': 2} in patch
+    assert apply_patch(copy.deepcopy(old), patch) == new
+    assert json_diff(new, copy.deepcopy(new)) == []
+
+
+@pytest.mark.asyncio
+async def test_sync_channel_snapshot_then_shared_deltas():
+    """
+    Test that subscribers get a snapshot, then deltas serialized once, and that a lagging
+    subscriber is paused and caught up when it acknowledges.
+    """
+    app = Eventum(sync_max_unacked=2, sync_history=2)
+    channel = app.sync.channel('doc', {'text': '', 'rev': 0})
+
+    @app.handshake_route('/')
+    async def index(connection: WSConnection):
+        await connection.accept()
+        await channel.subscribe(connection)
+
+    async with InMemoryTestClient(app) as client:
+        fast = await client.connect(path='/')
+        slow = await client.connect(path='/')
+        states = {}
+        for name, conn in (('fast', fast), ('slow', slow)):
+            snapshot = await conn.receive_json()
+            assert snapshot == {'event': 'sync.snapshot', 'channel': 'doc', 'version': 0,
+                                'state': {'text': '', 'rev': 0}}
+            states[name] = snapshot['state']
+
+        for rev in range(1, 4):
+            await channel.set({'text': 'x' * rev, 'rev': rev})
+            delta = await fast.receive_json()
+            assert (delta['from'], delta['version']) == (rev - 1, rev)
+            states['fast'] = apply_patch(states['fast'], delta['patch'])
+            await fast.send_json({'event': 'sync.ack', 'channel': 'doc', 'version': rev})
+        assert states['fast'] == channel.state
+
+        frames = [m['text'] for m in fast.messages_from_app[-3:]]
+        assert [m['text'] for m in slow.messages_from_app[-2:]] == frames[:2]
+
+        await slow.send_json({'event': 'sync.ack', 'channel': 'doc', 'version': 1})
+        for expected in ((0, 1), (1, 2)):
+            delta = await slow.receive_json()
+            assert (delta['from'], delta['version']) == expected
+            states['slow'] = apply_patch(states['slow'], delta['patch'])
+        catch_up = await slow.receive_json()
+        assert (catch_up['from'], catch_up['version']) == (2, 3)
+        assert apply_patch(states['slow'], catch_up['patch']) == channel.state
+
+        for rev in range(4, 8):
+            await channel.set({'text': 'y' * rev, 'rev': rev})
+        await slow.send_json({'event': 'sync.ack', 'channel': 'doc', 'version': 3})
+        snapshot = await asyncio.wait_for(slow.receive_json(), 1)
+        assert snapshot['event'] == 'sync.snapshot'
+        assert snapshot['version'] == 7 and snapshot['state'] == {'text': 'y' * 7, 'rev': 7}
+
+    metrics = app.metrics.snapshot()
+    assert metrics['sync.diffs_computed'] == 7
+
+
+@pytest.mark.asyncio
+async def test_sync_set_does_not_wait_for_a_stalled_subscriber(monkeypatch):
+    """
+    Test that a subscriber still receiving a delta does not hold up `set` and is caught up with
+    one delta once the pending frame is delivered.
+    """
+    gate = asyncio.Event()
+
+    class StalledConnection(WSConnection):
+        async def send(self, message):
+            if '"sync.delta"' in message.get('text', ''):
+                await gate.wait()
+            await super().send(message)
+
+    monkeypatch.setattr('eventum_asgi.app.WSConnection', StalledConnection)
+    app = Eventum()
+    channel = app.sync.channel('doc', {'rev': 0})
+
+    @app.handshake_route('/')
+    async def index(connection: WSConnection):
+        await connection.accept()
+        await channel.subscribe(connection)
+
+    async with InMemoryTestClient(app) as client:
+        conn = await client.connect(path='/')
+        state = (await conn.receive_json())['state']
+        for rev in range(1, 4):
+            await asyncio.wait_for(channel.set({'rev': rev}), 1)
+
+        gate.set()
+        first = await asyncio.wait_for(conn.receive_json(), 1)
+        assert (first['from'], first['version']) == (0, 1)
+        catch_up = await asyncio.wait_for(conn.receive_json(), 1)
+        assert (catch_up['from'], catch_up['version']) == (1, 3)
+        assert apply_patch(apply_patch(state, first['patch']), catch_up['patch']) == channel.state
+
+    metrics = app.metrics.snapshot()
+    assert metrics['sync.paused'] == 2
+    assert metrics['sync.deltas_sent'] == 2
@@ -0,0 +1,87 @@
+import asyncio
+import pytest
+from eventum_asgi.app import Eventum
+from eventum_asgi.connection import WSConnection
+from eventum_asgi.exceptions import DisconnectedException
+from eventum_asgi.testclient import InMemoryTestClient
+
+
+@pytest.mark.asyncio
+async def test_spawned_tasks_are_cancelled_on_disconnect():
+    """
+    Test that tasks spawned by a connection run in the background, are counted per connection
+    and are cancelled before the disconnect callbacks when the client leaves.
+    """
+    app = Eventum()
+    order = []
+    started = asyncio.Event()
+    connections = []
+
+    @app.handshake_route('/')
+    async def index(connection: WSConnection):
+        await connection.accept()
+        connections.append(connection)
+        connection.add_disconnect_callback(lambda connection: order.append('callback'))
+
+    async def ticker(connection: WSConnection):
+        started.set()
+        try:
+            while True:
+                await connection.send_json({'event': 'tick'})
+                await asyncio.sleep(0.01)
+        finally:
+            order.append('cancelled')
+
+    @app.event('subscribe')
+    async def subscribe(connection: WSConnection, event: dict):
+        connection.spawn(ticker(connection), name='ticker')
+        connection.spawn(asyncio.sleep(10))
+
+    async with InMemoryTestClient(app) as client:
+        conn = await client.connect(path='/')
+        await conn.send_json({'event': 'subscribe'})
+        assert await conn.receive_json() == {'event': 'tick'}
+        await started.wait()
+        assert app.metrics.snapshot()['connections.tasks'] == {'live': 2, 'max_per_connection': 2}
+        await conn.close()
+        await asyncio.sleep(0.05)
+
+        assert order == ['cancelled', 'callback']
+        assert connections[0].task_count == 0
+        snapshot = app.metrics.snapshot()
+        assert snapshot['connections.tasks'] == {'live': 0, 'max_per_connection': 0}
+        assert snapshot['connections.tasks_cancelled'] == 2
+
+        coro = asyncio.sleep(1)
+        with pytest.raises(DisconnectedException):
+            connections[0].spawn(coro)
+        assert coro.cr_frame is None
+
+
+@pytest.mark.asyncio
+async def test_finished_tasks_leave_the_group():
+    """
+    Test that tasks finishing on their own, or failing, are dropped from the group.
+    """
+    app = Eventum()
+
+    @app.handshake_route('/')
+    async def index(connection: WSConnection):
+        await connection.accept()
+
+    async def fail():
+        raise RuntimeError('background failure')
+
+    @app.event('work')
+    async def work(connection: WSConnection, event: dict):
+        await asyncio.gather(connection.spawn(asyncio.sleep(0)), return_exceptions=True)
+        await asyncio.gather(connection.spawn(fail()), return_exceptions=True)
+        await asyncio.sleep(0)
+        await connection.send_json({'event': 'done', 'tasks': connection.task_count})
+
+    async with InMemoryTestClient(app) as client:
+        conn = await client.connect(path='/')
+        await conn.send_json({'event': 'work'})
+        assert await conn.receive_json() == {'event': 'done', 'tasks': 0}
+
+    assert 'connections.tasks_cancelled' not in app.metrics.snapshot()
@@ -0,0 +1,78 @@
+import asyncio
+import pytest
+from eventum_asgi.app import Eventum
+from eventum_asgi.connection import WSConnection
+from eventum_asgi.testclient import InMemoryTestClient, ConnectionClosed
+
+
+@pytest.mark.asyncio
+async def test_hung_handler_is_cancelled_and_connection_keeps_working():
+    """
+    Test that a handler past its route timeout is cancelled, its cleanup runs, a timeout
+    event is sent and the next events of the connection are handled.
+    """
+    app = Eventum()
+    cleaned_up = []
+
+    @app.handshake_route('/')
+    async def index(connection: WSConnection):
+        await connection.accept()
+
+    @app.event('hang', timeout=0.05)
+    async def hang(connection: WSConnection, event: dict):
+        try:
+            await asyncio.sleep(10)
+        finally:
+            cleaned_up.append(event['n'])
+
+    @app.event('ping')
+    async def ping(connection: WSConnection, event: dict):
+        await connection.send_json({'event': 'pong'})
+
+    async with InMemoryTestClient(app) as client:
+        conn = await client.connect(path='/')
+        await conn.send_json({'event': 'hang', 'n': 1})
+        assert await conn.receive_json() == {'event': 'timeout_error', 'message': 'Event handling timed out'}
+        assert cleaned_up == [1]
+        await conn.send_json({'event': 'ping'})
+        assert await conn.receive_json() == {'event': 'pong'}
+
+    assert app.metrics.snapshot()['events.timeouts'] == 1
+
+
+@pytest.mark.asyncio
+async def test_default_timeout_and_handler_timeout_errors():
+    """
+    Test that the application timeout applies to routes without their own, that a route
+    timeout overrides it and that a TimeoutError raised by the handler is not reported as a timeout.
+    """
+    app = Eventum(event_timeout=0.05)
+
+    @app.handshake_route('/')
+    async def index(connection: WSConnection):
+        await connection.accept()
+
+    @app.event('slow')
+    async def slow(connection: WSConnection, event: dict):
+        await asyncio.sleep(10)
+
+    @app.event('patient', timeout=1)
+    async def patient(connection: WSConnection, event: dict):
+        await asyncio.sleep(0.1)
+        await connection.send_json({'event': 'done'})
+
+    @app.event('fails')
+    async def fails(connection: WSConnection, event: dict):
+        raise TimeoutError('downstream')
+
+    async with InMemoryTestClient(app) as client:
+        conn = await client.connect(path='/')
+        await conn.send_json({'event': 'slow'})
+        assert (await conn.receive_json())['event'] == 'timeout_error'
+        await conn.send_json({'event': 'patient'})
+        assert await conn.receive_json() == {'event': 'done'}
+        await conn.send_json({'event': 'fails'})
+        with pytest.raises(ConnectionClosed):
+            await conn.recv()
+
+    assert app.metrics.snapshot()['events.timeouts'] == 1